@@ -50,6 +50,32 @@ def find_origin_col(cols):
             return c
     return None
 
+def norm_frame(df: pd.DataFrame, cols) -> pd.DataFrame:
+    """Valores comparables por columna: NaN → "", resto str(v).strip()."""
+    out = {}
+    for c in cols:
+        s = df[c]
+        out[c] = s.astype(str).str.strip().where(s.notna(), "")
+    return pd.DataFrame(out, index=df.index)
+
+def ark_diffs(df: pd.DataFrame, arks, cols) -> pd.DataFrame:
+    """
+    Para esos arkId (con >1 fila): matriz booleana ark × columna (más de un valor distinto),
+    en una sola pasada groupby.nunique; diff_cols/diff_count salen de la matriz.
+    Orden de filas = el de arks.
+    """
+    block = df.loc[df["_ark"].isin(arks), cols].astype(str)
+    if block.empty:
+        return pd.DataFrame(columns=["arkId", "diff_cols", "diff_count"])
+    differs = block.groupby(df["_ark"], sort=False).nunique(dropna=False).gt(1).reindex(list(arks))
+    names = np.array([f"{c}, " for c in cols], dtype=object)
+    joined = pd.Series(differs.to_numpy().astype(object) @ names, index=differs.index)
+    return pd.DataFrame({
+        "arkId": differs.index,
+        "diff_cols": joined.str[:-2].to_numpy(),  # quita la última ", "
+        "diff_count": differs.sum(axis=1).to_numpy(),
+    })
+
 def main():
     if not SRC.exists():
         print(f"[ERROR] No existe {SRC}. Ejecuta antes find_zamacona_in_non_green.py.", file=sys.stderr)
@@ -72,15 +98,8 @@ def main():
     if "status" in cols_for_exact and not keep_status:
         cols_for_exact.remove("status")
 
-    # Usa stringificación estable para comparar NaN vs vacío:
-    def _norm_val(v):
-        if pd.isna(v):
-            return ""
-        return str(v).strip()
-
-    exact_key = df[cols_for_exact].applymap(_norm_val).astype(str).agg("||".join, axis=1)
-    df["_exact_key"] = exact_key
-    dup_mask_exact = df.duplicated(subset=["_exact_key"], keep="first")
+    # Comparación por columnas (sin clave concatenada): NaN ≡ vacío, sin espacios en los bordes
+    dup_mask_exact = norm_frame(df, cols_for_exact).duplicated(keep="first")
     full_dupes = df[dup_mask_exact].copy()
     full_dupes.to_csv(OUT / "full_row_dupes.tsv", sep="\t", index=False, encoding="utf-8")
 
@@ -109,21 +128,9 @@ def main():
         )
 
     # — 4) Qué columnas difieren por arkId (>1 fila) —
-    # Para cada ark con >1 fila, marcamos qué columnas tienen más de 1 valor distinto
-    diff_rows = []
     multi_arks = ark_summary.loc[ark_summary["row_count"] > 1, "arkId"].astype(str).tolist()
     candidate_cols = [c for c in df.columns if not c.startswith("_")]  # exclude internal
-
-    for ark in multi_arks:
-        block = df[df["_ark"] == ark]
-        diffs = []
-        for c in candidate_cols:
-            nuniq = block[c].astype(str).nunique(dropna=False)
-            if nuniq > 1:
-                diffs.append(c)
-        diff_rows.append({"arkId": ark, "diff_cols": ", ".join(diffs), "diff_count": len(diffs)})
-
-    pd.DataFrame(diff_rows).sort_values(["diff_count"], ascending=False).to_csv(
+    ark_diffs(df, multi_arks, candidate_cols).sort_values(["diff_count"], ascending=False).to_csv(
         OUT / "ark_diff_cols.tsv", sep="\t", index=False, encoding="utf-8"
     )
 
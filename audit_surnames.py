@@ -1,22 +1,35 @@
 #!/usr/bin/env python3
 # Audita y normaliza apellidos (__surn1/__surn2) contra un canon vasco.
 # - Lee out/Zamacona_normalized.xlsx
-# - Usa data/whitelist_surnames.txt (canónicos) y data/surname_synonyms.csv (variant,canonical)
+# - Usa data/whitelist_surnames.txt (canónicos) y data/surname_synonyms.csv (variant,canonical),
+#   cargados vía rulepack.py (out/rulepack.pkl)
 # - Clasifica variantes observadas: OK / NEAR (<=2) / REJECT
+# - Variantes ortográficas (v/b, y/i, c/z/s/ç, ch/tx, h muda, dobles) por clave fonética
+#   (phonetic.py): columna 'key' precalculada y búsqueda O(1) en el índice del rulepack →
+#   NEAR con reason 'phonetic'; la distancia de edición contra todo el canon queda para el resto
 # - Señala apellidos que parecen "nombres de pila"
+# - Cuenta variantes con name_stats.py (kind 'surname_norm': split/explode/value_counts vectorizado,
+#   mismo tokenizador que el campo 'surnames' de token_index.py), cacheado por sha1 del xlsx
+# - --jobs N: la búsqueda NEAR (edit distance contra todo el canon) se reparte en un pool de
+#   procesos; variantes y canon viajan por memoria compartida (shm_columns.py) y el mejor
+#   candidato/distancia vuelven en arrays compartidos (mismo resultado que en serie)
 # Salidas en out/:
 #   surnames_ok.tsv, surnames_near.tsv, surnames_reject.tsv, surnames_looks_like_given.tsv
-#   surnames_suggestions.csv  (variant, count, best_match, dist, class)
+#   surnames_suggestions.csv  (variant, count, best_match, dist, class, key)
 
+import os
 import re
+import sys
 import unicodedata
 from pathlib import Path
 import pandas as pd
 
+import name_stats
+import phonetic
+import rulepack
+
 IN_XLSX = Path("out/Zamacona_normalized.xlsx")
 OUT_DIR = Path("out")
-WL_FILE = Path("data/whitelist_surnames.txt")
-SYN_FILE = Path("data/surname_synonyms.csv")  # puede tener comentarios y filas con >2 columnas
 
 OUT_OK   = OUT_DIR / "surnames_ok.tsv"
 OUT_NEAR = OUT_DIR / "surnames_near.tsv"
@@ -25,6 +38,7 @@ OUT_LIKE_GIVEN = OUT_DIR / "surnames_looks_like_given.tsv"
 OUT_SUGG = OUT_DIR / "surnames_suggestions.csv"
 
 NEAR_DIST = 2  # umbral de distancia de edición
+CHUNK_VARIANTS = 200  # variantes por tarea con --jobs
 
 # Nombres de pila frecuentes para detectar "colados" en apellidos
 GIVEN_COMMON = {
@@ -58,65 +72,77 @@ def edit_distance(a: str, b: str) -> int:
 
 def load_whitelist():
     """
-    Devuelve:
+    Devuelve (del rulepack, ver rulepack.py):
       - wl_lower: set de canónicos en minúsculas/normalizados (para comparar)
       - wl_map:   dict lower -> forma original (con mayúsculas/ñ) para reportar
     """
-    wl_lower = set()
-    wl_map = {}
-    if WL_FILE.exists():
-        for line in WL_FILE.read_text(encoding="utf-8").splitlines():
-            orig = line.strip()
-            if not orig:
-                continue
-            low = norm_token(orig).lower()
-            if low:
-                wl_lower.add(low)
-                wl_map.setdefault(low, orig)
-    return wl_lower, wl_map
+    return rulepack.load()["audit_whitelist"]
 
 def load_synonyms() -> dict:
     """
-    Carga robusta de sinónimos desde CSV (con tolerancia a:
-    - comentarios (#) y comentarios en línea,
-    - filas con más de dos columnas: A,B,C -> (A->B) y (B->C),
-    - líneas vacías o sucias).
+    Sinónimos de data/surname_synonyms.csv ya parseados por el rulepack
+    (comentarios, cabecera y cadenas A,B,C -> (A->B) y (B->C)).
     Retorna: dict variant(lower normalizado) -> canonical (con forma tal cual en el fichero).
     """
-    syn = {}
-    if not SYN_FILE.exists():
-        return syn
-
-    with open(SYN_FILE, "r", encoding="utf-8") as f:
-        for lineno, raw in enumerate(f, 1):
-            line = raw.strip()
-            if not line:
-                continue
-            # quitar comentario en línea
-            if "#" in line:
-                line = line.split("#", 1)[0].strip()
-                if not line:
-                    continue
-            # separar por comas
-            parts = [p.strip() for p in line.split(",")]
-            # saltar cabecera si aparece
-            if parts and parts[0].lower() == "variant":
-                continue
-            # eliminar vacíos
-            parts = [p for p in parts if p]
-            if len(parts) < 2:
-                continue
-            # cadena A,B,C,... -> A->B, B->C, ...
-            prev = parts[0]
-            for nxt in parts[1:]:
-                v = norm_token(prev).lower()
-                c = nxt.strip()
-                if v and c:
-                    syn[v] = c
-                prev = nxt
-    return syn
+    return rulepack.load()["audit_synonyms"]
+
+def load_phonetic_index() -> dict:
+    """Clave fonética → canónico (whitelist + sinónimos; claves ambiguas fuera), del rulepack."""
+    return rulepack.load()["phonetic_index"]
+
+def best_near(vlow: str, wl_order):
+    """(mejor canónico en minúsculas, distancia) recorriendo el canon en el orden dado."""
+    best_key = None; best_dist = 999
+    for low_canon in wl_order:
+        d = edit_distance(vlow, low_canon)
+        if d < best_dist:
+            best_dist = d; best_key = low_canon
+            if d == 0:
+                break
+    return best_key, best_dist
+
+def _near_chunk(task):
+    """Tarea del pool: mejor canónico (posición en el canon) y distancia para variantes [start, stop)."""
+    import shm_columns
+    handle, start, stop = task
+    view = shm_columns.attach(handle)
+    wl = view.strings("canon")
+    pos = {k: i for i, k in enumerate(wl)}
+    best_i, best_d = view.array("best_i"), view.array("best_d")
+    for k, vlow in enumerate(view.strings("variants", start, stop), start=start):
+        key, dist = best_near(vlow, wl)
+        best_i[k] = pos[key] if key is not None else -1
+        best_d[k] = dist
+
+def near_matches_parallel(variants: list, wl_order: list, jobs: int) -> dict:
+    """{variante en minúsculas: (mejor canónico, distancia)} calculado en un pool de procesos."""
+    from concurrent.futures import ProcessPoolExecutor
+    import shm_columns
+    n = len(variants)
+    with shm_columns.SharedColumns() as sc:
+        sc.put_strings("variants", variants)
+        sc.put_strings("canon", wl_order)   # mismo orden que la pasada en serie (desempates iguales)
+        best_i = sc.alloc("best_i", n, "int32")
+        best_d = sc.alloc("best_d", n, "int32")
+        tasks = [(sc.handle, i, min(i + CHUNK_VARIANTS, n)) for i in range(0, n, CHUNK_VARIANTS)]
+        with ProcessPoolExecutor(max_workers=jobs) as ex:
+            list(ex.map(_near_chunk, tasks))
+        return {v: (wl_order[i] if i >= 0 else None, int(d))
+                for v, i, d in zip(variants, best_i.tolist(), best_d.tolist())}
+
+def arg_int(flag: str, default: int) -> int:
+    """Valor entero de '--flag N' o '--flag=N' en sys.argv."""
+    for i, a in enumerate(sys.argv):
+        if a == flag and i + 1 < len(sys.argv):
+            return int(sys.argv[i + 1])
+        if a.startswith(flag + "="):
+            return int(a.split("=", 1)[1])
+    return default
 
 def main():
+    jobs = arg_int("--jobs", 1)
+    if jobs <= 0:
+        jobs = os.cpu_count() or 1
     if not IN_XLSX.exists():
         raise SystemExit(f"No encuentro {IN_XLSX}")
 
@@ -128,36 +154,43 @@ def main():
     if not cols:
         raise SystemExit("No encuentro columnas __surn1/__surn2. Ejecuta primero el normalizador.")
 
-    # recoge todas las variantes con conteo
-    ser = pd.Series(dtype=str)
-    for c in cols:
-        ser = pd.concat([ser, df[c].fillna("").astype(str)])
-    tokens = []
-    for cell in ser:
-        for part in str(cell).split(";"):
-            t = norm_token(part)
-            if t:
-                tokens.append(t)
+    # recoge todas las variantes con conteo (de mayor a menor; empates en orden de aparición)
+    freq = name_stats.artifact_frequencies(IN_XLSX, ["surname_norm"], "all", df)["surname_norm"]
+    freq = freq.sort_values(ascending=False)
+    tokens = freq.index.tolist()
 
     if not tokens:
         pd.DataFrame(columns=["variant","count","best_match","reason"]).to_csv(OUT_OK, sep="\t", index=False)
         pd.DataFrame(columns=["variant","count","best_match","dist"]).to_csv(OUT_NEAR, sep="\t", index=False)
         pd.DataFrame(columns=["variant","count","looks_like_given"]).to_csv(OUT_REJ, sep="\t", index=False)
         pd.DataFrame(columns=["variant","count","class"]).to_csv(OUT_LIKE_GIVEN, sep="\t", index=False)
-        pd.DataFrame(columns=["variant","count","class","best_match","dist","reason","looks_like_given"]).to_csv(OUT_SUGG, index=False)
+        pd.DataFrame(columns=["variant","count","class","best_match","dist","reason","looks_like_given","key"]).to_csv(OUT_SUGG, index=False)
         print("[OK] No hay apellidos que auditar (todas las celdas vacías).")
         return
 
-    vc = pd.Series(tokens).value_counts().reset_index()
+    vc = freq.reset_index()
     vc.columns = ["variant","count"]
 
     # carga canon y sinónimos
     WL_LOWER, WL_MAP = load_whitelist()   # set lower + mapa lower->original
     SYN = load_synonyms()                 # variant(lower) -> canonical(str)
+    PHON = load_phonetic_index()          # clave fonética -> canonical(str)
+
+    # clave fonética por variante (una vez por valor distinto) y canónico por índice
+    vc["key"] = phonetic.key_column(vc["variant"])
+    phon_hit = vc["key"].map(PHON).fillna("")
+
+    # NEAR en paralelo (solo variantes que no son sinónimo, canon exacto ni acierto fonético)
+    wl_order = list(WL_LOWER)
+    near = {}
+    if jobs > 1:
+        pending = sorted({v.lower() for v in vc.loc[phon_hit == "", "variant"]} - set(SYN) - WL_LOWER)
+        if len(pending) > CHUNK_VARIANTS:
+            near = near_matches_parallel(pending, wl_order, jobs)
 
     # clasificar
     rows = []
-    for _, row in vc.iterrows():
+    for (_, row), phon in zip(vc.iterrows(), phon_hit):
         var = row["variant"]
         cnt = int(row["count"])
         vlow = var.lower()
@@ -170,15 +203,13 @@ def main():
         elif vlow in WL_LOWER:
             canon = WL_MAP.get(vlow, var)
             cls = "OK"; dist = 0; reason = "whitelist"
+        # 3) misma clave fonética que un canónico
+        elif phon:
+            canon = phon
+            cls = "NEAR"; dist = edit_distance(vlow, norm_token(phon).lower()); reason = "phonetic"
         else:
-            # 3) near match contra el whitelist
-            best_key = None; best_dist = 999
-            for low_canon in WL_LOWER:
-                d = edit_distance(vlow, low_canon)
-                if d < best_dist:
-                    best_dist = d; best_key = low_canon
-                    if d == 0:
-                        break
+            # 4) near match contra el whitelist
+            best_key, best_dist = near[vlow] if vlow in near else best_near(vlow, wl_order)
             if best_key is not None and best_dist <= NEAR_DIST:
                 canon = WL_MAP.get(best_key, best_key)
                 cls = "NEAR"; dist = best_dist; reason = "near"
@@ -194,7 +225,8 @@ def main():
             "best_match": canon,
             "dist":    dist,
             "reason":  reason,
-            "looks_like_given": looks_like_given
+            "looks_like_given": looks_like_given,
+            "key":     row["key"],
         })
 
     out = pd.DataFrame(rows)
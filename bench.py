@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+bench.py
+
+Benchmarks del pipeline sobre corpus sintéticos (bench_corpus.py).
+
+1) Etapas: por cada tamaño (10k, 100k, 1m…) se prepara una copia aislada del
+   proyecto en out/bench/work/<size>/ (scripts + data/, out/ vacío) y se lanza
+   cada etapa del orden de run_pipeline.py midiendo con stage_metrics
+   (wall, CPU user/sys, RSS pico, bytes y filas de E/S, filas/s).
+2) Funciones clave (en este proceso, sobre nombres del mismo generador):
+   normalize_person_item, split_person, edit_distance, should_force,
+   contains_regex_blacklist (µs por llamada y llamadas/s; mejor de --repeat, y los
+   tiempos de cada repetición en runs_s para que perf_gate.py use la mediana).
+
+Resultado: JSON en out/bench/results/<fecha>_<commit>.json (+ out/bench/latest.json),
+con metadatos (commit, Python, plataforma, hash de reglas) para comparar entre commits.
+
+Uso:
+  python3 bench.py                                   # 10k, todas las etapas + funciones
+  python3 bench.py --sizes 10k,100k --stages consolidate_raw.py,prepare_columns.py,normalize_names.py
+  python3 bench.py --sizes 1m --no-funcs             # solo etapas
+  python3 bench.py --stages none --func-samples 50000  # solo funciones
+  python3 bench.py --warm                            # no vacía out/ de la copia (mide el camino con caché)
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import platform
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import bench_corpus
+import stage_metrics
+
+ROOT = Path(__file__).resolve().parent
+PY = sys.executable
+BENCH_DIR = ROOT / "out" / "bench"
+WORK_DIR = BENCH_DIR / "work"
+RESULTS_DIR = BENCH_DIR / "results"
+LATEST = BENCH_DIR / "latest.json"
+
+FUNCS = ["normalize_person_item", "split_person", "edit_distance", "should_force", "contains_regex_blacklist"]
+
+# ---------------------------
+# Metadatos
+# ---------------------------
+
+def git_commit() -> str:
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=str(ROOT),
+                             capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=str(ROOT),
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return rev + ("-dirty" if dirty else "")
+    except Exception:
+        return "unknown"
+
+def run_meta() -> dict:
+    import rulepack
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": __import__("os").cpu_count(),
+        "rules_hash": rulepack.load()["hash"],
+    }
+
+# ---------------------------
+# Etapas
+# ---------------------------
+
+def default_stages() -> List[str]:
+    import run_pipeline
+    return run_pipeline.build_order(with_patches=False, mode_apply=False)
+
+def prepare_workdir(size: str, warm: bool) -> Path:
+    """Copia aislada del proyecto: *.py + data/ (out/ vacío salvo --warm)."""
+    wd = WORK_DIR / size
+    wd.mkdir(parents=True, exist_ok=True)
+    for p in ROOT.glob("*.py"):
+        shutil.copy2(p, wd / p.name)
+    if (ROOT / "data").exists():
+        shutil.copytree(ROOT / "data", wd / "data", dirs_exist_ok=True)
+    if not warm and (wd / "out").exists():
+        shutil.rmtree(wd / "out")
+    (wd / "out").mkdir(exist_ok=True)
+    return wd
+
+def stage_cmd(script: str, wd: Path, corpus: Path) -> List[str]:
+    cmd = [PY, str(wd / script)]
+    if script in ("consolidate_raw.py", "watch_raw.py"):
+        cmd += ["--dir", str(corpus), "--glob", "zamacona_*.xlsx"]
+    elif script == "count_raw.py":
+        cmd += ["--dir", str(corpus)]
+    return cmd
+
+def bench_stages(size: str, stages: List[str], warm: bool, verbose: bool) -> List[dict]:
+    corpus = bench_corpus.ensure_corpus(size)
+    raw = sorted(corpus.glob("zamacona_*.xlsx"))
+    wd = prepare_workdir(size, warm)
+    run_id = "bench-" + time.strftime("%Y%m%d-%H%M%S")
+    out: List[dict] = []
+    for script in stages:
+        if not (wd / script).exists():
+            print(f"… (saltado) {script} no existe.")
+            continue
+        inputs = raw if script in ("consolidate_raw.py", "count_raw.py") else None
+        cmd = stage_cmd(script, wd, corpus)
+        if verbose:
+            rc, rec = stage_metrics.measure_stage(script, cmd, run_id, wd, inputs)
+        else:
+            # la salida de las etapas es muy verbosa: a un log fuera de out/ (no cuenta como salida)
+            with open(wd / f"bench_{script}.log", "w", encoding="utf-8") as log:
+                rc, rec = stage_metrics.measure_stage(script, cmd, run_id, wd, inputs, log)
+        rows = rec.get("rows_in") or rec.get("rows_out") or 0
+        rec["rows_per_s"] = round(rows / rec["wall_s"], 1) if rows and rec["wall_s"] else None
+        out.append(rec)
+        flag = "[OK]  " if rc == 0 else "✖     "
+        rps = f"{rec['rows_per_s']:>10.0f} filas/s" if rec["rows_per_s"] else " " * 17
+        print(f"{flag} {size:>5} {script:<34} {rec['wall_s']:8.2f}s {rps}  rss {rec.get('max_rss_mb', 0):6.0f} MB")
+    return out
+
+# ---------------------------
+# Funciones clave
+# ---------------------------
+
+def _time_runs(fn: Callable, args: list, repeat: int) -> List[float]:
+    runs = []
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        for a in args:
+            fn(a)
+        runs.append(time.perf_counter() - t0)
+    return runs
+
+def bench_functions(n: int, repeat: int, names: List[str]) -> Dict[str, dict]:
+    import normalize_names as nn
+    import find_zamacona_in_non_green as fz
+    import rulepack
+    nn.load_surname_whitelist()
+    people = bench_corpus.person_strings(n)
+    normed = [nn.normalize_person_item(p) for p in people]
+    tokens = [t for p in people for t in nn.strip_accents(p).lower().split()][:n]
+    pack = rulepack.load()
+    strong, blacklist = set(pack["zam_strong_syns"]), fz.build_blacklist()
+    fz_inputs = [fz.norm(p) for p in people]
+    cases = {
+        "normalize_person_item": (nn.normalize_person_item, people),
+        "split_person":          (nn.split_person, normed),
+        "edit_distance":         (lambda t: nn.edit_distance(t, "zamacona"), tokens),
+        "should_force":          (lambda s: fz.should_force(s, strong, blacklist), fz_inputs),
+        "contains_regex_blacklist": (nn.contains_regex_blacklist, people),
+    }
+    out: Dict[str, dict] = {}
+    for name in names:
+        fn, args = cases[name]
+        runs = _time_runs(fn, args, repeat)
+        best = min(runs)
+        out[name] = {"calls": len(args), "best_s": round(best, 5), "runs_s": [round(t, 5) for t in runs],
+                     "us_per_call": round(best / len(args) * 1e6, 3) if args else None,
+                     "calls_per_s": round(len(args) / best, 1) if best else None}
+        print(f"[OK]  {name:<26} {out[name]['us_per_call']:10.2f} µs/llamada  "
+              f"{out[name]['calls_per_s']:>12.0f} llamadas/s  ({len(args)} llamadas, mejor de {repeat})")
+    return out
+
+# ---------------------------
+# Main
+# ---------------------------
+
+def save_results(res: dict, path: Optional[Path] = None) -> Path:
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    if path is None:
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = RESULTS_DIR / f"{stamp}_{res['meta']['commit']}.json"
+    text = json.dumps(res, ensure_ascii=False, indent=2)
+    path.write_text(text, encoding="utf-8")
+    LATEST.write_text(text, encoding="utf-8")
+    return path
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Benchmarks de etapas y funciones clave sobre corpus sintéticos.")
+    ap.add_argument("--sizes", default="10k", help="Tamaños separados por comas (10k,100k,1m o nº de filas)")
+    ap.add_argument("--stages", default="all", help="'all', 'none' o lista de scripts separados por comas")
+    ap.add_argument("--no-funcs", action="store_true", help="No medir las funciones clave")
+    ap.add_argument("--funcs", default=",".join(FUNCS), help="Funciones a medir (por defecto todas)")
+    ap.add_argument("--func-samples", type=int, default=20000, help="Nombres para los micro-benchmarks")
+    ap.add_argument("--repeat", type=int, default=3, help="Repeticiones de los micro-benchmarks (mejor)")
+    ap.add_argument("--warm", action="store_true", help="Conserva out/ de la copia entre ejecuciones (cachés)")
+    ap.add_argument("--verbose", action="store_true", help="Muestra la salida de las etapas")
+    ap.add_argument("--out", default=None, help="Ruta del JSON (por defecto out/bench/results/<fecha>_<commit>.json)")
+    args = ap.parse_args()
+
+    sizes = [s.strip().lower() for s in args.sizes.split(",") if s.strip()]
+    if args.stages == "all":
+        stages = default_stages()
+    elif args.stages == "none":
+        stages = []
+    else:
+        stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+
+    res = {"meta": run_meta(), "corpora": {}, "stages": {}, "functions": {}}
+    res["meta"]["warm"] = args.warm
+    for size in sizes if stages else []:
+        corpus = bench_corpus.ensure_corpus(size)
+        files = sorted(corpus.glob("zamacona_*.xlsx"))
+        res["corpora"][size] = {"rows": bench_corpus.parse_size(size), "files": len(files),
+                                "bytes": sum(p.stat().st_size for p in files), "seed": bench_corpus.SEED}
+        res["stages"][size] = bench_stages(size, stages, args.warm, args.verbose)
+
+    if not args.no_funcs:
+        names = [f.strip() for f in args.funcs.split(",") if f.strip()]
+        unknown = [f for f in names if f not in FUNCS]
+        if unknown:
+            raise SystemExit(f"Funciones desconocidas: {', '.join(unknown)} (válidas: {', '.join(FUNCS)})")
+        res["functions"] = bench_functions(args.func_samples, args.repeat, names)
+
+    path = save_results(res, Path(args.out) if args.out else None)
+    print(f"[OK] Resultados → {path}")
+    failed = [r["stage"] for recs in res["stages"].values() for r in recs if r.get("rc")]
+    if failed:
+        print(f"[WARN] Etapas con error: {', '.join(sorted(set(failed)))} (logs en out/bench/work/<size>/bench_*.log)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
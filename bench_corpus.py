@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+bench_corpus.py
+
+Generador de exportaciones sintéticas de FamilySearch (zamacona_*.xlsx) para benchmarks.
+
+- Mismo formato que los RAW reales: 5 filas de preámbulo, cabecera en la fila 6
+  (score, arkId, ..., fullName, fatherFullName, motherFullName, spouseFullName,
+  childrenFullNames, otherFullNames...) y una fila por registro.
+- Nombres con variantes tipo OCR sacadas de las propias tablas de reglas (vía rulepack):
+  claves de GIVEN_MAP, WHITELIST_TOKENS, BLACKLIST_TOKENS, PROTECTED_NEAR, SURNAME_SYNONYMS,
+  sinónimos débiles y blacklist de find_zamacona, whitelist de apellidos, compuestos…
+  más ruido de transcripción (z/s/ç, c/k, i/y, v/b/u, ph/f, letras caídas o dobles, '?').
+- Incluye duplicados: mismo arkId con otra transcripción y filas repetidas tal cual.
+- Determinista (semilla) y escalable (10k, 100k, 1M): se parte en ficheros de
+  --rows-per-file filas y se escribe con openpyxl en modo write_only (memoria constante).
+- person_strings(n, seed) da los mismos nombres sin pasar por Excel (micro-benchmarks).
+
+Uso:
+  python3 bench_corpus.py --size 10k                    # out/bench/corpus/10k/zamacona_*.xlsx
+  python3 bench_corpus.py --size 1m --rows-per-file 100000
+  python3 bench_corpus.py --size 25000 --seed 7 --out /tmp/raw
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+import rulepack
+
+ROOT = Path(__file__).resolve().parent
+CORPUS_DIR = ROOT / "out" / "bench" / "corpus"
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+ROWS_PER_FILE = 50_000
+SEED = 1234
+CORPUS_VERSION = 1  # súbelo si cambia la forma de generar (invalida los corpus cacheados)
+
+PREAMBLE = [
+    ["FamilySearch Historical Records"],
+    ["Search: surname=Zamacona"],
+    [],
+    ["Exported"],
+    [],
+]
+COLUMNS = [
+    "score", "arkId", "sourceMediaType", "roleInRecord", "fullName", "sex",
+    "birthLikeDate", "birthLikePlaceText", "chrDate", "chrPlace", "deathLikeDate", "deathLikePlaceText",
+    "marriageLikeDate", "marriageLikePlaceText", "residenceDate", "residencePlaceText", "relationshipToHead",
+    "fatherFullName", "motherFullName", "spouseFullName", "childrenFullNames", "parentFullNames",
+    "otherFullNames", "otherEvents",
+]
+PLACES = ["Bilbao, Vizcaya, España", "Abando, Vizcaya, España", "Begoña, Vizcaya, España",
+          "Deusto, Vizcaya, España", "Durango, Vizcaya, España", "Gernika, Vizcaya, España",
+          "Mexico City, Distrito Federal, Mexico", "La Habana, Cuba", "Vitoria, Álava, España"]
+MEDIA = ["Image", "Image", "Image", "Text"]
+ROLES = ["Principal", "Principal", "Father", "Mother", "Spouse", "Child"]
+
+# (buscar, reemplazo) para ruido de transcripción
+OCR_SUBS = [("z", "s"), ("z", "ç"), ("c", "k"), ("c", "z"), ("i", "y"), ("v", "b"), ("b", "v"),
+            ("u", "v"), ("f", "ph"), ("t", "th"), ("ll", "l"), ("rr", "r"), ("a", "o"), ("n", "m")]
+
+class NameSampler:
+    """Muestrea nombres de persona con la mezcla de variantes que ve el pipeline."""
+
+    def __init__(self, rng: random.Random, pack: Optional[dict] = None):
+        pack = pack or rulepack.load()
+        t = pack["tables"]
+        self.rng = rng
+        title = lambda xs: sorted({x.title() for x in xs if x})
+        self.given_canon = title(set(t["GIVEN_COMMON"]) | set(t["GIVEN_MAP"].values()))
+        self.given_variants = title(t["GIVEN_MAP"])
+        self.second = title(t["SECOND_NAME_LIKE"])
+        self.compounds = [" ".join(seq).title() for seq in sorted(set(t["COMPOUND_2"]) | set(t["COMPOUND_3"]))]
+        self.surn_canon = title(pack["surname_canon"]) or ["Garcia"]
+        self.surn_syn = title(t["SURNAME_SYNONYMS"])
+        self.zam_ocr = title(set(t["WHITELIST_TOKENS"]) | set(pack["zam_weak_syns"]))
+        self.bad = title(set(t["BLACKLIST_TOKENS"]) | set(t["PROTECTED_NEAR"]) | set(pack["zam_blacklist"]))
+        self.titles = title(t["TITLE_TOKENS"])
+
+    def ocr(self, word: str) -> str:
+        r = self.rng
+        x = r.random()
+        if x < 0.55 and len(word) > 3:
+            a, b = r.choice(OCR_SUBS)
+            low = word.lower()
+            i = low.find(a)
+            if i >= 0:
+                out = word[:i] + b + word[i + len(a):]
+                return out[:1].upper() + out[1:] if i == 0 else out
+        if x < 0.8 and len(word) > 4:
+            i = r.randrange(1, len(word))
+            return word[:i] + word[i + 1:]          # letra caída
+        if len(word) > 2:
+            i = r.randrange(1, len(word))
+            return word[:i] + word[i] + word[i:]    # letra doble
+        return word
+
+    def given(self) -> str:
+        r = self.rng.random()
+        if r < 0.18:
+            g = self.rng.choice(self.compounds)
+        elif r < 0.40:
+            g = self.rng.choice(self.given_variants)
+        else:
+            g = self.rng.choice(self.given_canon)
+        if self.rng.random() < 0.12:
+            g += " " + self.rng.choice(self.second)
+        return g
+
+    def surname(self, zam_bias: float = 0.35) -> str:
+        r = self.rng.random()
+        if r < zam_bias:
+            return "Zamacona"
+        r = (r - zam_bias) / (1 - zam_bias)
+        if r < 0.15:
+            return self.rng.choice(self.zam_ocr) if self.rng.random() < 0.5 else self.ocr("Zamacona")
+        if r < 0.27:
+            return self.rng.choice(self.bad)
+        if r < 0.45:
+            return self.rng.choice(self.surn_syn)
+        s = self.rng.choice(self.surn_canon)
+        return self.ocr(s) if self.rng.random() < 0.1 else s
+
+    def person(self, zam_bias: float = 0.35) -> str:
+        rng = self.rng
+        parts = [self.given()]
+        if rng.random() < 0.03:
+            parts.insert(0, rng.choice(self.titles))
+        parts.append(("de " if rng.random() < 0.08 else "") + self.surname(zam_bias))
+        if rng.random() < 0.72:
+            parts.append(("y " if rng.random() < 0.05 else "") + self.surname(zam_bias * 0.6))
+        s = " ".join(parts)
+        x = rng.random()
+        if x < 0.03:
+            s += "?"
+        elif x < 0.05:
+            s = s.upper()
+        elif x < 0.06:
+            s = s.replace(" ", "  ", 1)
+        return s
+
+    def people(self, k: int, zam_bias: float = 0.2) -> str:
+        return "; ".join(self.person(zam_bias) for _ in range(k))
+
+def iter_rows(n: int, seed: int = SEED, dup_rate: float = 0.03, pack: Optional[dict] = None) -> Iterator[list]:
+    """Filas de datos (en el orden de COLUMNS)."""
+    rng = random.Random(seed)
+    names = NameSampler(rng, pack)
+    recent: List[list] = []
+    for i in range(n):
+        x = rng.random()
+        if recent and x < dup_rate / 3:
+            yield list(rng.choice(recent))                      # fila repetida tal cual
+            continue
+        if recent and x < dup_rate:
+            row = list(rng.choice(recent))                       # mismo arkId, otra transcripción
+            row[COLUMNS.index("fullName")] = names.person()
+            row[COLUMNS.index("score")] = f"{rng.uniform(1, 5):.2f}"
+            yield row
+            continue
+        year = rng.randint(1650, 1900)
+        place = rng.choice(PLACES)
+        row = [
+            f"{rng.uniform(1, 5):.2f}",
+            f"ark:/61903/1:1:{rng.randrange(36 ** 4):04X}-{i:07X}",
+            rng.choice(MEDIA), rng.choice(ROLES), names.person(),
+            rng.choice(["Male", "Female"]),
+            str(year) if rng.random() < 0.5 else "", place if rng.random() < 0.5 else "",
+            f"{rng.randint(1, 28)} {rng.choice(['Jan', 'Mar', 'Jun', 'Oct'])} {year}" if rng.random() < 0.6 else "",
+            place if rng.random() < 0.6 else "",
+            str(year + rng.randint(1, 80)) if rng.random() < 0.2 else "", "",
+            str(year + rng.randint(18, 40)) if rng.random() < 0.3 else "", place if rng.random() < 0.3 else "",
+            "", "", "",
+            names.person(0.5) if rng.random() < 0.8 else "",
+            names.person(0.2) if rng.random() < 0.8 else "",
+            names.person(0.2) if rng.random() < 0.3 else "",
+            names.people(rng.randint(1, 4)) if rng.random() < 0.25 else "",
+            "",
+            names.people(rng.randint(1, 3)) if rng.random() < 0.1 else "",
+            "",
+        ]
+        if len(recent) < 2000:
+            recent.append(row)
+        elif rng.random() < 0.01:
+            recent[rng.randrange(len(recent))] = row
+        yield row
+
+def person_strings(n: int, seed: int = SEED, pack: Optional[dict] = None) -> List[str]:
+    """n nombres de persona sueltos (mismo muestreador que el corpus)."""
+    names = NameSampler(random.Random(seed), pack)
+    return [names.person() for _ in range(n)]
+
+def write_corpus(out_dir: Path, n: int, seed: int = SEED, rows_per_file: int = ROWS_PER_FILE,
+                 dup_rate: float = 0.03) -> List[Path]:
+    from openpyxl import Workbook
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for old in out_dir.glob("zamacona_*.xlsx"):
+        old.unlink()
+    files: List[Path] = []
+    rows = iter_rows(n, seed, dup_rate)
+    n_files = max(1, -(-n // rows_per_file))
+    for k in range(n_files):
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Sheet1")
+        for pre in PREAMBLE:
+            ws.append(pre)
+        ws.append(COLUMNS)
+        for _ in range(min(rows_per_file, n - k * rows_per_file)):
+            ws.append([v if v != "" else None for v in next(rows)])
+        path = out_dir / f"zamacona_{k:03d}.xlsx"
+        wb.save(path)
+        files.append(path)
+    meta = {"version": CORPUS_VERSION, "rows": n, "seed": seed, "rows_per_file": rows_per_file,
+            "dup_rate": dup_rate, "rules_hash": rulepack.load()["hash"], "files": [p.name for p in files]}
+    (out_dir / "corpus.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    return files
+
+def parse_size(s: str) -> int:
+    s = s.strip().lower()
+    if s in SIZES:
+        return SIZES[s]
+    mult = {"k": 1_000, "m": 1_000_000}.get(s[-1:], 1)
+    return int(float(s[:-1] if mult > 1 else s) * mult)
+
+def ensure_corpus(size: str, seed: int = SEED, rows_per_file: int = ROWS_PER_FILE,
+                  base: Path = CORPUS_DIR) -> Path:
+    """Carpeta del corpus (lo genera si falta o si cambió el generador/las reglas)."""
+    n = parse_size(size)
+    out_dir = base / size.lower()
+    meta_path = out_dir / "corpus.json"
+    if meta_path.exists():
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        if meta.get("version") == CORPUS_VERSION and meta.get("rows") == n and meta.get("seed") == seed \
+                and meta.get("rows_per_file") == rows_per_file and meta.get("rules_hash") == rulepack.load()["hash"] \
+                and all((out_dir / f).exists() for f in meta.get("files", [])):
+            return out_dir
+    t0 = time.perf_counter()
+    files = write_corpus(out_dir, n, seed, rows_per_file)
+    print(f"[OK] corpus {size}: {n} filas en {len(files)} ficheros → {out_dir} ({time.perf_counter() - t0:.1f}s)")
+    return out_dir
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Genera exportaciones sintéticas zamacona_*.xlsx.")
+    ap.add_argument("--size", default="10k", help="10k | 100k | 1m | nº de filas (p.ej. 25000, 250k)")
+    ap.add_argument("--seed", type=int, default=SEED)
+    ap.add_argument("--rows-per-file", type=int, default=ROWS_PER_FILE)
+    ap.add_argument("--dup-rate", type=float, default=0.03, help="Fracción de filas duplicadas (arkId o fila entera)")
+    ap.add_argument("--out", default=None, help="Carpeta destino (por defecto out/bench/corpus/<size>)")
+    args = ap.parse_args()
+    n = parse_size(args.size)
+    out_dir = Path(args.out) if args.out else CORPUS_DIR / args.size.lower()
+    t0 = time.perf_counter()
+    files = write_corpus(out_dir, n, args.seed, args.rows_per_file, args.dup_rate)
+    print(f"[OK] {n} filas en {len(files)} ficheros → {out_dir} ({time.perf_counter() - t0:.1f}s)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,50 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+"""
+canonicalize_strict_dupes.py
+
+Colapsa copias estrictas (mismo contenido salvo __source_file/status) en una fila
+canónica con __sources_agg (fuentes unidas) y support_n (nº de fuentes distintas).
+
+Las claves de contenido se guardan entre ejecuciones en out/dedup_store.sqlite
+(dedup_store.py): un lote nuevo se cruza con el histórico por hash, sin recargar
+filas antiguas, y __sources_agg/support_n suman las fuentes ya vistas.
+
+Modo --consensus: una fila por arkId aunque las copias difieran en algún campo.
+Las columnas dependientes se votan JUNTAS (field_groups): X/X__work/X__given/
+X__surn1/X__surn2 de cada nombre y blacklistFlag/reviewFlag/blacklistReason/status;
+el resto, cada una por separado. Cada copia vota con el hash de su tupla de valores
+en el grupo (una tupla toda vacía no vota) y el grupo entero se copia de la fila
+ganadora, vacíos incluidos: la fila canónica nunca mezcla el nombre de una copia
+con el split de otra. Mayoría; empates por prioridad de fuente (--priority
+a.csv,b.csv; el resto por orden de aparición) y después por la primera fila. Todo
+en una pasada vectorizada: los grupos se apilan en formato largo (arkId, grupo,
+hash) y un groupby + sort + drop_duplicates da la fila ganadora de cada
+(arkId, grupo), sin lambdas por grupo. Añade __group_n (copias),
+__fields_contested (grupos sin unanimidad) y __min_support (votos/votantes del
+grupo más disputado); el detalle por grupo disputado va a
+out/canonical_field_support.tsv. Este modo no usa el histórico.
+
+Uso:
+  python3 canonicalize_strict_dupes.py
+  python3 canonicalize_strict_dupes.py --no-store      # solo el lote actual (sin histórico)
+  python3 canonicalize_strict_dupes.py --reset-store   # vacía el histórico antes de fusionar
+  python3 canonicalize_strict_dupes.py --consensus [--priority fuente1.csv,fuente2.csv]
+"""
+
 from __future__ import annotations
 from pathlib import Path
 import sys
+import numpy as np
 import pandas as pd
 
+import dedup_store
+
 ROOT = Path(__file__).resolve().parent
 OUT  = ROOT / "out"
+OUT_STORE = OUT / "dedup_store.sqlite"
+OUT_SUPPORT = OUT / "canonical_field_support.tsv"
 
 # Orden de preferencia del input
 CAND = [
@@ -24,6 +61,141 @@ def pick_input() -> Path | None:
             return p
     return None
 
+def arg_str(flag: str, default: str = "") -> str:
+    """Valor de '--flag X' o '--flag=X' en sys.argv."""
+    for i, a in enumerate(sys.argv):
+        if a == flag and i + 1 < len(sys.argv):
+            return sys.argv[i + 1]
+        if a.startswith(flag + "="):
+            return a.split("=", 1)[1]
+    return default
+
+# ---------------------------
+# Consenso por arkId
+# ---------------------------
+
+def source_rank(src: pd.Series, priority: list) -> np.ndarray:
+    """Rango por fila (0 = más prioritaria): primero las de --priority, luego por aparición."""
+    order = [p for p in priority if p] + [s for s in pd.unique(src) if s not in priority]
+    return src.map({s: i for i, s in enumerate(order)}).to_numpy(dtype=np.int64)
+
+NAME_PARTS = ("__work", "__given", "__surn1", "__surn2")
+FLAG_GROUP = ("blacklistFlag", "reviewFlag", "blacklistReason", "status")
+
+def field_groups(fields: list) -> list:
+    """Columnas que se votan juntas, en orden de primera columna: X + X__work/__given/__surn1/__surn2,
+    las de flags/status, y el resto de una en una."""
+    bases = {c[:-len(p)] for c in fields for p in NAME_PARTS if c.endswith(p)}
+    key = {}
+    for c in fields:
+        base = next((c[:-len(p)] for p in NAME_PARTS if c.endswith(p)), c)
+        if base in bases:
+            key[c] = "name:" + base
+        elif c in FLAG_GROUP:
+            key[c] = "flags"
+        else:
+            key[c] = "col:" + c
+    groups: dict = {}
+    for c in fields:
+        groups.setdefault(key[c], []).append(c)
+    return list(groups.values())
+
+def consensus_frame(df: pd.DataFrame, priority: list) -> tuple:
+    """
+    Una fila por arkId (filas sin arkId: cada una la suya), en orden de primera aparición.
+    Devuelve (canon, contested): contested = una fila por (arkId, grupo de columnas) sin
+    unanimidad con los valores elegidos, votos y votantes.
+    """
+    n = len(df)
+    pos = np.arange(n)
+    ark = df["arkId"].fillna("").astype(str).str.strip() if "arkId" in df.columns else pd.Series("", index=df.index)
+    gkey = ark.where(ark != "", "__row" + pd.Series(pos, index=df.index).astype(str))
+    gcode, gkeys = pd.factorize(gkey)
+    ng = len(gkeys)
+    src = df["__source_file"].fillna("").astype(str) if "__source_file" in df.columns else pd.Series("", index=df.index)
+    prio = source_rank(src, priority)
+    fields = [c for c in df.columns if c not in ("arkId", "__source_file")]
+    groups = field_groups(fields)
+    nq = len(groups)
+
+    # voto de cada fila en cada grupo: hash de la tupla de valores (texto sin espacios, vacío = "")
+    text = df[fields].astype(object).where(df[fields].notna(), "").astype(str).apply(lambda s: s.str.strip())
+    keys = np.empty((nq, n), dtype=np.uint64)
+    blank = np.empty((nq, n), dtype=bool)
+    for j, cols in enumerate(groups):
+        keys[j] = pd.util.hash_pandas_object(text[cols], index=False).to_numpy()
+        blank[j] = (text[cols] == "").all(axis=1).to_numpy()
+
+    full = pd.DataFrame({
+        "g": np.tile(gcode, nq), "q": np.repeat(np.arange(nq), n),
+        "k": keys.ravel(), "p": np.tile(prio, nq), "r": np.tile(pos, nq),
+    })
+    long = full[~blank.ravel()]
+
+    agg = (long.groupby(["g", "q", "k"], sort=False)
+               .agg(votes=("r", "size"), p=("p", "min"), r=("r", "min"))
+               .reset_index())
+    voters = long.groupby(["g", "q"], sort=False).size().rename("voters")
+    win = (agg.sort_values(["g", "q", "votes", "p", "r"], ascending=[True, True, False, True, True], kind="stable")
+              .drop_duplicates(["g", "q"])
+              .join(voters, on=["g", "q"]))
+
+    # fila ganadora por (arkId, grupo); todas las columnas del grupo salen de ella
+    g, q, r = win["g"].to_numpy(), win["q"].to_numpy(), win["r"].to_numpy()
+    winner = np.full((ng, nq), -1, dtype=np.int64)
+    winner[g, q] = r
+    data = {}
+    for j, cols in enumerate(groups):
+        rows = winner[:, j]
+        has = rows >= 0
+        for c in cols:
+            col = np.full(ng, np.nan, dtype=object)
+            col[has] = df[c].to_numpy(dtype=object)[rows[has]]
+            data[c] = col
+    canon = pd.DataFrame(data, columns=fields).infer_objects()
+
+    # arkId y fuente de la fila más prioritaria del grupo
+    first = pd.DataFrame({"g": gcode, "p": prio, "r": pos}).sort_values(["g", "p", "r"]).drop_duplicates("g")["r"]
+    if "arkId" in df.columns:
+        canon["arkId"] = df["arkId"].to_numpy()[first.to_numpy()]
+    if "__source_file" in df.columns:
+        canon["__source_file"] = src.to_numpy()[first.to_numpy()]
+        lot = dedup_store.union_sources(pd.DataFrame({"h": gcode, "sources": src.to_numpy()}))
+        canon["__sources_agg"] = lot["sources"].to_numpy()
+        canon["support_n"] = lot["support_n"].to_numpy()
+    canon = canon[[c for c in df.columns] + [c for c in canon.columns if c not in df.columns]]
+
+    # soporte por grupo
+    win["contested"] = win["votes"] < win["voters"]
+    canon["__group_n"] = np.bincount(gcode, minlength=ng)
+    canon["__fields_contested"] = np.bincount(g, weights=win["contested"].to_numpy(), minlength=ng).astype(np.int64)
+    ratio = pd.Series(win["votes"].to_numpy() / win["voters"].to_numpy()).groupby(g).min()
+    canon["__min_support"] = ratio.reindex(range(ng)).fillna(1.0).round(3).to_numpy()
+
+    c = win[win["contested"]]
+    labels = np.asarray(["/".join(cols) for cols in groups], dtype=object)
+    tv = text.to_numpy()
+    gpos = [[fields.index(col) for col in cols] for cols in groups]
+    contested = pd.DataFrame({
+        "arkId": np.asarray(gkeys)[c["g"].to_numpy()],
+        "field": labels[c["q"].to_numpy()],
+        "value": [" / ".join(tv[rr, gpos[j]]) for j, rr in zip(c["q"].to_numpy(), c["r"].to_numpy())],
+        "votes": c["votes"].to_numpy(),
+        "voters": c["voters"].to_numpy(),
+    })
+    return canon, contested
+
+def main_consensus(df: pd.DataFrame):
+    priority = [p.strip() for p in arg_str("--priority").split(",") if p.strip()]
+    canon, contested = consensus_frame(df, priority)
+    canon.to_excel(OUT / "Zamacona_canonical.xlsx", index=False)
+    canon.to_csv  (OUT / "Zamacona_canonical.csv",  index=False, encoding="utf-8")
+    contested.to_csv(OUT_SUPPORT, sep="\t", index=False, encoding="utf-8")
+    multi = int((canon["__group_n"] > 1).sum())
+    print(f"[OK] Canonical (consenso por arkId): {len(canon)} filas de {len(df)}; "
+          f"{multi} arkIds con varias copias, {int((canon['__fields_contested'] > 0).sum())} con campos en desacuerdo.")
+    print(f"[OK] {OUT_SUPPORT} ({len(contested)} campos disputados)")
+
 def main():
     src = pick_input()
     if not src:
@@ -33,54 +205,57 @@ def main():
     OUT.mkdir(exist_ok=True)
     df = pd.read_excel(src)
 
+    if "--consensus" in sys.argv:
+        main_consensus(df)
+        return
+
     has_src = "__source_file" in df.columns
     # columnas para COMPARAR contenido (ignorando IGNORE)
     compare_cols = [c for c in df.columns if c not in IGNORE]
 
     # clave de contenido (normalización ligera para evitar falsos diffs por espacios)
     key = df[compare_cols].astype(str).apply(lambda s: s.str.strip()).agg("||".join, axis=1)
-    df["_k"] = key
+    df["_k"] = dedup_store.content_hashes(key)
 
     # ¿hay grupos repetidos?
-    sizes = df["_k"].value_counts()
-    multi_keys = sizes[sizes > 1].index.tolist()
-
-    if not multi_keys:
-        # no-op: copiamos como canonical
-        canon = df.copy()
-        if has_src:
-            # cada fila proviene de 1 origen -> soporte 1
-            canon["__sources_agg"] = canon["__source_file"].astype(str)
-            canon["support_n"] = 1
-        canon.drop(columns=["_k"], inplace=True, errors="ignore")
-        canon.to_excel(OUT / "Zamacona_canonical.xlsx", index=False)
-        canon.to_csv  (OUT / "Zamacona_canonical.csv",  index=False, encoding="utf-8")
-        print(f"[OK] Sin duplicados estrictos. Canonical = {len(canon)} filas (copia 1:1).")
-        return
+    multi = df["_k"].duplicated().any()
 
-    # Hay repetidos estrictos: colapsamos
     # 1) Filas ganadoras = primera por cada clave
     winners = df.drop_duplicates(subset=["_k"], keep="first").copy()
 
-    # 2) Agregamos fuentes y soporte
+    # 2) Fuentes y soporte del lote (unión ordenada por clave)
     if has_src:
-        agg = (
-            df.groupby("_k")["__source_file"]
-              .agg(lambda s: "|".join(sorted(set(map(str, s)))))
-              .rename("__sources_agg")
-              .reset_index()
-        )
-        winners = winners.merge(agg, on="_k", how="left")
-        winners["support_n"] = winners["__sources_agg"].apply(lambda x: len(x.split("|")) if isinstance(x, str) and x else 1)
-    else:
+        lot = dedup_store.union_sources(pd.DataFrame({"h": df["_k"], "sources": df["__source_file"].astype(str)}))
+        winners["__sources_agg"] = winners["_k"].map(lot["sources"])
+        winners["support_n"] = winners["_k"].map(lot["support_n"])
+    elif multi:
         winners["__sources_agg"] = ""
         winners["support_n"] = 1
 
-    # 3) Limpieza y escritura
+    # 3) Fusión con el histórico de ejecuciones anteriores
+    if "--no-store" not in sys.argv:
+        with dedup_store.DedupStore(OUT_STORE, compare_cols) as store:
+            if store.stale_reason:
+                print(f"[INFO] Histórico de duplicados vaciado: {store.stale_reason}.")
+            if "--reset-store" in sys.argv:
+                store.reset()
+            ark = winners["arkId"].astype(str) if "arkId" in winners.columns else pd.Series("", index=winners.index)
+            sources = winners["__sources_agg"] if "__sources_agg" in winners.columns else pd.Series("", index=winners.index)
+            merged = store.merge(pd.DataFrame({"h": winners["_k"], "arkId": ark, "sources": sources}))
+            if "__sources_agg" in winners.columns:
+                winners["__sources_agg"] = winners["_k"].map(merged["sources"])
+                winners["support_n"] = winners["_k"].map(merged["support_n"])
+            print(f"[INFO] Histórico: {store.seen} de {len(winners)} filas ya vistas en ejecuciones anteriores; "
+                  f"{store.ark_changed} arkIds vistos con otro contenido; {len(store)} claves en {OUT_STORE.name}.")
+
+    # 4) Limpieza y escritura
     winners.drop(columns=["_k"], inplace=True, errors="ignore")
     winners.to_excel(OUT / "Zamacona_canonical.xlsx", index=False)
     winners.to_csv  (OUT / "Zamacona_canonical.csv",  index=False, encoding="utf-8")
 
+    if not multi:
+        print(f"[OK] Sin duplicados estrictos. Canonical = {len(winners)} filas (copia 1:1).")
+        return
     collapsed = len(df) - len(winners)
     print(f"[OK] Canonical creado: {len(winners)} filas. Colapsadas {collapsed} copias estrictas.")
 
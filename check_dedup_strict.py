@@ -1,5 +1,11 @@
 #!/usr/bin/env python3
+# Duplicados estrictos (todas las columnas / sin __source_file) y diferencias dentro de cada arkId.
+# Todo sale de hashes: hash por fila para los duplicados y la igualdad dentro de cada arkId
+# (nunique == 1), y hash por celda para las columnas que difieren (nunique por columna > 1).
+# --jobs N: los hashes por fila se calculan en un pool de procesos sobre columnas en memoria
+#           compartida (shm_columns.py); mismos valores que en serie (hash por fila, por trozos).
 import os
+import sys
 import pandas as pd
 
 IN_FILE = "out/Zamacona_all_raw.xlsx"
@@ -9,23 +15,85 @@ OUT_EXACT_NOSRC = os.path.join(OUT_DIR, "dupes_exact_no_source.tsv")
 OUT_ARK_SUM = os.path.join(OUT_DIR, "ark_dupe_summary.tsv")
 OUT_ARK_DIFF = os.path.join(OUT_DIR, "ark_diff_cols.tsv")
 
-def norm_cell(x):
-    if x is None: return ""
-    s = str(x)
-    # normalización muy ligera para evitar “falsos” distintos por espacios
-    s = " ".join(s.split())
-    return s
+def norm_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Normalización muy ligera por celda para evitar “falsos” distintos por espacios
+    (" ".join(s.split()), vectorizado por columna; df ya viene con dtype=str y sin NaN)."""
+    return pd.DataFrame({c: df[c].astype(str).str.split().str.join(" ") for c in df.columns},
+                        index=df.index, columns=df.columns)
 
-def rows_equal(df_subset):
-    """Devuelve True si todas las filas del subset son idénticas en todas sus columnas."""
-    if len(df_subset) <= 1:
-        return True
-    # comparamos contra la primera fila normalizada
-    first = df_subset.iloc[0].apply(norm_cell)
-    return df_subset.applymap(norm_cell).eq(first, axis=1).all(axis=1).all()
+def col_hashes(df_norm: pd.DataFrame) -> pd.DataFrame:
+    """Hash uint64 por celda (una columna de hashes por columna de datos)."""
+    return pd.DataFrame({c: pd.util.hash_pandas_object(df_norm[c], index=False).to_numpy() for c in df_norm.columns},
+                        index=df_norm.index, columns=df_norm.columns)
+
+def ark_audit(df: pd.DataFrame, rowhash_no_src: pd.Series, cols_no_src: list):
+    """
+    (resumen por arkId, arks con diferencias internas) a partir de hashes:
+      - all_equal_no_source: nunique del hash de fila (sin __source_file) == 1
+      - diff_cols: columnas cuyo hash por celda tiene nunique > 1 dentro del ark
+    """
+    ark = df["arkId"]
+    g = rowhash_no_src.groupby(ark, dropna=False)
+    summary = pd.DataFrame({"rows": g.size(), "all_equal_no_source": g.nunique().eq(1)})
+    summary = summary.rename_axis("arkId").reset_index()
+
+    # solo arks con >1 fila y filas no idénticas: hashes por celda de ese bloque
+    unequal = summary.loc[(summary["rows"] > 1) & ~summary["all_equal_no_source"], "arkId"]
+    block = ark.isin(unequal)
+    diff_cols = ["arkId", "rows", "diff_cols"]
+    if not block.any():
+        return summary, pd.DataFrame(columns=diff_cols)
+    differs = col_hashes(norm_frame(df.loc[block, cols_no_src])).groupby(ark[block], dropna=False).nunique().gt(1)
+    differs = differs[differs.any(axis=1)]
+    differs = differs & (differs.cumsum(axis=1) <= 100)  # como antes: como mucho 100 columnas
+    names = pd.Series([f"{c}, " for c in cols_no_src], dtype=object).to_numpy()
+    diff_df = pd.DataFrame({
+        "arkId": differs.index,
+        "rows": summary.set_index("arkId")["rows"].reindex(differs.index).to_numpy(),
+        "diff_cols": pd.Series(differs.to_numpy().astype(object) @ names).str[:-2].to_numpy(),
+    })
+    return summary, diff_df.sort_values(["rows", "arkId"], ascending=[False, True])
+
+def arg_int(flag: str, default: int) -> int:
+    """Valor entero de '--flag N' o '--flag=N' en sys.argv."""
+    for i, a in enumerate(sys.argv):
+        if a == flag and i + 1 < len(sys.argv):
+            return int(sys.argv[i + 1])
+        if a.startswith(flag + "="):
+            return int(a.split("=", 1)[1])
+    return default
+
+CHUNK_ROWS = 20000  # filas por tarea con --jobs
+
+def _hash_chunk(task):
+    """Tarea del pool: hashes de las filas [start, stop) → arrays compartidos __h_all / __h_no_src."""
+    import shm_columns
+    handle, cols, cols_no_src, start, stop = task
+    view = shm_columns.attach(handle)
+    part = norm_frame(view.frame(cols, start, stop))
+    view.array("__h_all")[start:stop] = pd.util.hash_pandas_object(part, index=False).to_numpy()
+    view.array("__h_no_src")[start:stop] = pd.util.hash_pandas_object(part[cols_no_src], index=False).to_numpy()
+
+def row_hashes_parallel(df: pd.DataFrame, cols_no_src: list, jobs: int):
+    """(hash de todas las columnas, hash sin __source_file) por fila, como Series con el índice de df."""
+    from concurrent.futures import ProcessPoolExecutor
+    import shm_columns
+    n, cols = len(df), list(df.columns)
+    with shm_columns.SharedColumns() as sc:
+        sc.put_frame(df, cols)
+        h_all = sc.alloc("__h_all", n, "uint64")
+        h_no_src = sc.alloc("__h_no_src", n, "uint64")
+        tasks = [(sc.handle, cols, cols_no_src, i, min(i + CHUNK_ROWS, n)) for i in range(0, n, CHUNK_ROWS)]
+        with ProcessPoolExecutor(max_workers=jobs) as ex:
+            list(ex.map(_hash_chunk, tasks))
+        return (pd.Series(h_all.copy(), index=df.index, dtype="uint64"),
+                pd.Series(h_no_src.copy(), index=df.index, dtype="uint64"))
 
 def main():
     os.makedirs(OUT_DIR, exist_ok=True)
+    jobs = arg_int("--jobs", 1)
+    if jobs <= 0:
+        jobs = os.cpu_count() or 1
     df = pd.read_excel(IN_FILE, dtype=str).fillna("")
     # Asegura nombres de cols sin espacios “raros”
     df.columns = [ " ".join(str(c).split()) for c in df.columns ]
@@ -41,8 +109,13 @@ def main():
 
     # --- 1) Duplicados estricto: TODAS las columnas iguales ---
     # Clave: hash de la fila completa
-    df_norm = df.applymap(norm_cell)
-    full_hash = pd.util.hash_pandas_object(df_norm, index=False)
+    cols_no_src = [c for c in df.columns if c != "__source_file"]
+    if jobs > 1 and len(df) > CHUNK_ROWS:
+        full_hash, rowhash_no_src = row_hashes_parallel(df, cols_no_src, jobs)
+    else:
+        df_norm = norm_frame(df)
+        full_hash = pd.util.hash_pandas_object(df_norm, index=False)
+        rowhash_no_src = pd.util.hash_pandas_object(df_norm[cols_no_src], index=False)
     df1 = df.copy()
     df1["__rowhash_all"] = full_hash
     mask_dup_all = df1.duplicated(subset=["__rowhash_all"], keep=False)
@@ -53,9 +126,6 @@ def main():
     print(f"Duplicados ESTRICTOS (todas las columnas): {dupes_all.shape[0]} filas en {dupes_all['__rowhash_all'].nunique()} grupos")
 
     # --- 2) Duplicados estrictos ignorando __source_file ---
-    cols_no_src = [c for c in df.columns if c != "__source_file"]
-    df_norm2 = df_norm[cols_no_src]
-    rowhash_no_src = pd.util.hash_pandas_object(df_norm2, index=False)
     df2 = df.copy()
     df2["__rowhash_no_src"] = rowhash_no_src
     mask_dup_no_src = df2.duplicated(subset=["__rowhash_no_src"], keep=False)
@@ -66,34 +136,9 @@ def main():
 
     # --- 3) Mismo arkId pero con diferencias ---
     if "arkId" in df.columns:
-        # resumen por arkId
-        grp = df.groupby("arkId", dropna=False)
-        rows_per_ark = grp.size().rename("rows").reset_index()
-        # ¿todas las filas del ark son idénticas si ignoro __source_file?
-        def equal_block(block):
-            if len(block) <= 1:
-                return True
-            return rows_equal(block[cols_no_src])
-
-        same_all = grp.apply(equal_block).rename("all_equal_no_source").reset_index()
-        summary = rows_per_ark.merge(same_all, on="arkId", how="left")
+        # resumen por arkId (¿filas idénticas si ignoro __source_file?) y columnas que difieren
+        summary, diff_df = ark_audit(df, rowhash_no_src, cols_no_src)
         summary.to_csv(OUT_ARK_SUM, sep="\t", index=False)
-
-        # columnas que difieren dentro de cada ark (si hay diferencias)
-        diff_records = []
-        for ark, block in grp:
-            if len(block) <= 1:
-                continue
-            nb = block[cols_no_src].applymap(norm_cell)
-            # columnas con más de un valor distinto
-            diff_cols = [c for c in nb.columns if nb[c].nunique(dropna=False) > 1]
-            if diff_cols:
-                diff_records.append({
-                    "arkId": ark,
-                    "rows": len(block),
-                    "diff_cols": ", ".join(diff_cols[:100])
-                })
-        diff_df = pd.DataFrame(diff_records).sort_values(["rows","arkId"], ascending=[False, True])
         diff_df.to_csv(OUT_ARK_DIFF, sep="\t", index=False)
         print(f"ARK con diferencias internas (ign. __source_file): {len(diff_df)}")
         print(f"[OK] {OUT_ARK_SUM}")
@@ -7,6 +7,9 @@ consolidate_raw.py  (modo estricto compatible con tu consolidación original)
 - Escanea ficheros RAW (por defecto 'zamacona_*.xlsx' en la carpeta indicada).
 - Para Excel:
     * Lee la hoja (primera por defecto o la indicada con --sheet).
+      Vía rápida (xlsx_stream.py): strings compartidos + XML de la hoja en streaming,
+      directo a arrays por columna. Si el libro tiene algo inusual (fórmulas, fechas,
+      estilos numéricos, .xls…) cae a openpyxl como siempre. --no-fast la desactiva.
     * Detecta la FILA DE CABECERA buscando 'arkId' (case-insensitive) en
       las primeras 30 filas; si no encuentra, usa fila 6 (index 5).
     * Construye cabeceras desde esa fila, quita columnas Unnamed, normaliza
@@ -28,7 +31,9 @@ import argparse
 from pathlib import Path
 import sys
 import re
+import numpy as np
 import pandas as pd
+from xlsx_stream import read_sheet_columns
 
 ROOT = Path(__file__).resolve().parent
 OUT_DIR = ROOT / "out"
@@ -54,6 +59,8 @@ def parse_args():
                    help="Nombre/índice de hoja a leer en Excel. Si se omite, se usa la PRIMERA hoja.")
     p.add_argument("--limit", type=int, default=None,
                    help="Leer como máximo N ficheros (útil para pruebas).")
+    p.add_argument("--no-fast", action="store_true",
+                   help="Desactiva la lectura rápida del XML y usa siempre openpyxl.")
     return p.parse_args()
 
 def normalize_colnames(cols):
@@ -85,11 +92,29 @@ def detect_header_row(sheet_df: pd.DataFrame) -> int:
     # fallback a tu fila habitual (6 -> index 5)
     return 5
 
-def read_excel_strict(path: Path, sheet_name, canonical_cols: list[str] | None):
+def read_sheet_fast(path: Path, sheet_name) -> pd.DataFrame:
+    """Hoja completa sin cabecera vía xlsx_stream: como xls.parse(header=None, dtype=str), con el
+    mismo tratamiento de NA por defecto de pandas y el mismo texto para los números."""
+    n_rows, cols = read_sheet_columns(path, sheet_name, fill=np.nan)
+    if not cols:
+        return pd.DataFrame(index=range(n_rows))
+    return pd.DataFrame(dict(enumerate(cols)), columns=range(len(cols)))
+
+def read_sheet_openpyxl(path: Path, sheet_name) -> pd.DataFrame:
     # Abre libro y selecciona hoja
     xls = pd.ExcelFile(path, engine="openpyxl")
     target_sheet = sheet_name if sheet_name is not None else xls.sheet_names[0]
-    tmp = xls.parse(target_sheet, header=None, dtype=str)
+    return xls.parse(target_sheet, header=None, dtype=str)
+
+def read_excel_strict(path: Path, sheet_name, canonical_cols: list[str] | None, fast: bool = True):
+    tmp = None
+    if fast and path.suffix.lower() == ".xlsx":
+        try:
+            tmp = read_sheet_fast(path, sheet_name)
+        except Exception as e:
+            print(f"[INFO] {path.name}: lectura rápida no aplicable ({e}); uso openpyxl.", file=sys.stderr)
+    if tmp is None:
+        tmp = read_sheet_openpyxl(path, sheet_name)
 
     # Detecta fila de cabecera
     hdr_row = detect_header_row(tmp)
@@ -140,11 +165,11 @@ def read_csv_or_tsv(path: Path) -> pd.DataFrame:
     df["__source_file"] = path.name
     return df
 
-def read_one(path: Path, sheet_name, canonical_cols):
+def read_one(path: Path, sheet_name, canonical_cols, fast: bool = True):
     ext = path.suffix.lower()
     if ext in {".xlsx", ".xls"}:
         try:
-            return read_excel_strict(path, sheet_name, canonical_cols)
+            return read_excel_strict(path, sheet_name, canonical_cols, fast)
         except Exception as e:
             # Intenta listar hojas para ayudar
             try:
@@ -193,7 +218,7 @@ def main() -> int:
 
     for i, f in enumerate(files, 1):
         try:
-            df, header = read_one(f, args.sheet, canonical_cols)
+            df, header = read_one(f, args.sheet, canonical_cols, fast=not args.no_fast)
         except Exception as e:
             print(f"[WARN] {e}", file=sys.stderr)
             continue
@@ -1,8 +1,23 @@
 #!/usr/bin/env python3
-import os, glob
-import pandas as pd
+# Recuento rápido de registros en los RAW (raw/*.xlsx).
+# - Motor rápido: lee el XML de la hoja dentro del zip en streaming (xlsx_stream.py),
+#   localiza la cabecera por los marcadores score/arkId y cuenta filas de datos no vacías
+#   sin construir objetos celda. Los ficheros se escanean en paralelo.
+# - Si el libro no encaja (hoja rara, XML corrupto…) cae al recuento con pandas de siempre.
+#
+# Uso:
+#   python3 count_raw.py                 # raw/, todos los núcleos
+#   python3 count_raw.py --jobs 1        # secuencial
+#   python3 count_raw.py --slow          # fuerza el recuento con pandas (para comparar)
+
+from __future__ import annotations
+import os, glob, argparse, zipfile
+from concurrent.futures import ProcessPoolExecutor
+from xlsx_stream import sheet_member, load_shared_strings, iter_sheet_rows
 
 RAW_DIR = "raw"
+HEADER_PROBE = 12
+HEADER_MARKERS = {"score", "arkid"}
 
 def detect_header_row(df: pd.DataFrame) -> int:
     for i in range(min(12, len(df))):
@@ -11,7 +26,33 @@ def detect_header_row(df: pd.DataFrame) -> int:
             return i
     return 5
 
+def count_rows_fast(path: str) -> int:
+    """Mismo criterio que count_rows (cabecera score+arkId en las 12 primeras filas, si no fila 6),
+    pero directamente sobre el XML de la primera hoja."""
+    with zipfile.ZipFile(path) as zf:
+        member = sheet_member(zf)
+        shared = load_shared_strings(zf)
+        hdr_row = None
+        n = 0
+        seen = []  # filas previas a la cabecera (si no aparece, se recuentan desde la fila 6)
+        for r, vals in iter_sheet_rows(zf, member, shared):
+            if hdr_row is None:
+                if r < HEADER_PROBE:
+                    if HEADER_MARKERS <= {v.strip().lower() for v in vals.values()}:
+                        hdr_row = r
+                    else:
+                        seen.append(r)
+                    continue
+                hdr_row = 5
+                n = sum(1 for x in seen if x > hdr_row)
+            if r > hdr_row:
+                n += 1
+        if hdr_row is None:
+            n = sum(1 for x in seen if x > 5)
+        return n
+
 def count_rows(path: str) -> int:
+    import pandas as pd  # solo en el recuento lento (arrancar sin pandas ahorra ~0.3 s)
     try:
         xl = pd.ExcelFile(path)
         sheet = xl.sheet_names[0]
@@ -25,15 +66,36 @@ def count_rows(path: str) -> int:
         print(f"[WARN] error leyendo {os.path.basename(path)}: {e}")
         return 0
 
+def count_one(path: str, slow: bool = False) -> int:
+    if not slow:
+        try:
+            return count_rows_fast(path)
+        except Exception as e:
+            print(f"[INFO] {os.path.basename(path)}: lectura rápida no aplicable ({e}); uso pandas.")
+    return count_rows(path)
+
 def main():
-    files = sorted(glob.glob(os.path.join(RAW_DIR, "*.xlsx")))
+    ap = argparse.ArgumentParser(description="Cuenta registros en los RAW.")
+    ap.add_argument("--dir", default=RAW_DIR, help="Carpeta de RAW (por defecto: raw/)")
+    ap.add_argument("--jobs", type=int, default=None, help="Procesos en paralelo (por defecto: nº de CPUs)")
+    ap.add_argument("--slow", action="store_true", help="Recuento con pandas (sin lectura rápida)")
+    args = ap.parse_args()
+
+    files = sorted(f for f in glob.glob(os.path.join(args.dir, "*.xlsx"))
+                   if not os.path.basename(f).startswith("~$"))
     if not files:
-        print("No hay .xlsx en raw/")
+        print(f"No hay .xlsx en {args.dir}/")
         return
 
+    jobs = args.jobs or os.cpu_count() or 1
+    if jobs > 1 and len(files) > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(files))) as ex:
+            counts = list(ex.map(count_one, files, [args.slow] * len(files), chunksize=4))
+    else:
+        counts = [count_one(f, args.slow) for f in files]
+
     total = 0
-    for f in files:
-        n = count_rows(f)
+    for f, n in zip(files, counts):
         total += n
         print(f"{os.path.basename(f):40s} {n:5d} registros")
     print("-" * 55)
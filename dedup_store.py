@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+dedup_store.py
+
+Almacén persistente (SQLite) de duplicados estrictos entre ejecuciones, para
+canonicalize_strict_dupes.py: cada lote nuevo se compara con el histórico sin
+volver a cargar las filas de lotes anteriores.
+
+Por clave de contenido (hash 64 bits de las columnas comparadas, ver content_hashes)
+se guarda: arkId, fuentes vistas ('a|b|c', ordenadas), support_n (nº de fuentes
+distintas) y primera/última vez vista. merge() cruza el lote con la tabla por clave
+primaria (una tabla temporal + JOIN: coste proporcional al lote, no al histórico),
+une las fuentes y hace upsert de __sources_agg/support_n. Volver a pasar el mismo
+lote no cambia nada (las fuentes son un conjunto).
+
+El almacén va sellado con la lista de columnas comparadas: si cambia, los hashes
+no son comparables y se vacía (stale_reason lo explica).
+
+Fichero:
+  - out/dedup_store.sqlite   (tablas rows y meta)
+
+Uso (desde canonicalize_strict_dupes.py):
+  with DedupStore(OUT_STORE, compare_cols) as store:
+      merged = store.merge(batch)   # batch: h, arkId, sources (de este lote)
+"""
+
+from __future__ import annotations
+import json
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List
+
+import pandas as pd
+
+STORE_VERSION = 1  # súbelo si cambia el esquema o cómo se calcula el hash
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS rows (
+    h          TEXT PRIMARY KEY,
+    arkId      TEXT NOT NULL,
+    sources    TEXT NOT NULL,
+    support_n  INTEGER NOT NULL,
+    first_seen TEXT NOT NULL,
+    last_seen  TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS rows_ark ON rows (arkId);
+"""
+
+def content_hashes(keys: pd.Series) -> pd.Series:
+    """Clave de contenido (texto ya normalizado) → hash 64 bits en hex (vectorizado)."""
+    return pd.util.hash_pandas_object(keys.astype(str), index=False).map("{:016x}".format)
+
+def union_sources(parts: pd.DataFrame) -> pd.DataFrame:
+    """
+    parts: columnas h, sources ('a|b', varias filas por h) → una fila por h con
+    sources = unión ordenada y support_n = nº de fuentes (1 si no hay ninguna).
+    """
+    src = parts.assign(src=parts["sources"].fillna("").astype(str).str.split("|")).explode("src")
+    src = src[src["src"] != ""].drop_duplicates(["h", "src"]).sort_values(["h", "src"])
+    g = src.groupby("h", sort=False)["src"]
+    out = pd.DataFrame({"sources": g.agg("|".join), "support_n": g.size()})
+    out = out.reindex(pd.unique(parts["h"]))
+    out["sources"] = out["sources"].fillna("")
+    out["support_n"] = out["support_n"].fillna(1).astype("int64")
+    return out
+
+class DedupStore:
+    def __init__(self, path: Path, compare_cols: List[str]):
+        self.path = Path(path)
+        self.compare_cols = list(compare_cols)
+        self.con: sqlite3.Connection = None
+        self.stale_reason = ""
+        # último merge (para los mensajes del script)
+        self.seen = 0             # claves del lote que ya estaban en el almacén
+        self.ark_changed = 0      # arkIds del lote ya vistos con OTRO contenido
+
+    # ---------- persistencia ----------
+    def open(self) -> "DedupStore":
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.con = sqlite3.connect(self.path)
+        self.con.executescript(_SCHEMA)
+        sig = json.dumps({"version": STORE_VERSION, "columns": self.compare_cols}, ensure_ascii=False)
+        row = self.con.execute("SELECT v FROM meta WHERE k = 'signature'").fetchone()
+        if row is not None and row[0] != sig:
+            self.stale_reason = "cambiaron las columnas comparadas (o la versión del almacén)"
+            self.con.execute("DELETE FROM rows")
+        self.con.execute("INSERT OR REPLACE INTO meta (k, v) VALUES ('signature', ?)", (sig,))
+        self.con.commit()
+        return self
+
+    def reset(self):
+        self.con.execute("DELETE FROM rows")
+        self.con.commit()
+
+    def close(self):
+        if self.con is not None:
+            self.con.close()
+            self.con = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.con.execute("SELECT COUNT(*) FROM rows").fetchone()[0]
+
+    # ---------- uso ----------
+    def merge(self, batch: pd.DataFrame) -> pd.DataFrame:
+        """
+        batch: una fila por clave de contenido con columnas h, arkId, sources (fuentes
+        de ESTE lote, 'a|b'). Une con el histórico, guarda y devuelve (índice h, orden del
+        lote) sources, support_n y seen (la clave ya estaba en el almacén).
+        """
+        con = self.con
+        batch = batch[["h", "arkId", "sources"]].astype(str)
+        con.execute("CREATE TEMP TABLE IF NOT EXISTS batch (h TEXT PRIMARY KEY, arkId TEXT) WITHOUT ROWID")
+        con.execute("DELETE FROM batch")
+        con.executemany("INSERT OR IGNORE INTO batch (h, arkId) VALUES (?, ?)",
+                        zip(batch["h"].tolist(), batch["arkId"].tolist()))
+
+        old = pd.read_sql_query("SELECT r.h, r.sources FROM batch b JOIN rows r ON r.h = b.h", con)
+        self.seen = len(old)
+        self.ark_changed = con.execute(
+            "SELECT COUNT(DISTINCT r.arkId) FROM batch b JOIN rows r ON r.arkId = b.arkId "
+            "WHERE b.arkId != '' AND r.h NOT IN (SELECT h FROM batch)").fetchone()[0]
+
+        merged = union_sources(pd.concat([batch[["h", "sources"]], old], ignore_index=True))
+        merged = merged.reindex(pd.unique(batch["h"]))
+        merged["seen"] = merged.index.isin(old["h"])
+
+        now = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        ark = dict(zip(batch["h"], batch["arkId"]))
+        con.executemany(
+            "INSERT INTO rows (h, arkId, sources, support_n, first_seen, last_seen) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (h) DO UPDATE SET sources = excluded.sources, support_n = excluded.support_n, "
+            "last_seen = excluded.last_seen",
+            ((h, ark[h], s, int(n), now, now) for h, s, n in
+             zip(merged.index, merged["sources"], merged["support_n"])))
+        con.execute("DELETE FROM batch")
+        con.commit()
+        return merged
@@ -1,11 +1,30 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+"""
+drop_rejects.py
+
+Quita del dataset final las filas rechazadas:
+  - por arkId (data/reject_arkids.txt): hash join (isin) contra el set normalizado 'ark:/…',
+  - por tokens (data/reject_surnames.txt), coincidencia parcial sin distinguir mayúsculas en
+    fullName__work/__surn1/__surn2. Los tokens sin espacios se buscan en el vocabulario del
+    índice invertido (token_index, campo 'words'); los que llevan espacios, en los valores
+    distintos de las tres columnas. En ambos casos con multi_match.SubstringMatcher
+    (str.contains con una regex para listas cortas, Aho-Corasick para listas largas).
+
+Uso:
+  python3 drop_rejects.py [--in out/Zamacona_final.xlsx] [--reject-ark-list …] [--reject-surnames …]
+"""
+
 from __future__ import annotations
 from pathlib import Path
 import argparse, re
+import numpy as np
 import pandas as pd
 
+import token_index
+from multi_match import SubstringMatcher
+
 ROOT = Path(__file__).resolve().parent
 OUT  = ROOT / "out"
 
@@ -71,34 +90,33 @@ def main():
             df[col] = ""
 
     # 1) Rechazo por ARK
-    ark_rejects = set(load_list(Path(args.reject_ark_list)))
-    def norm_ark(s: str) -> str:
-        s = (s or "").strip()
-        return s if (not s) or s.startswith("ark:/") else f"ark:/{s}"
+    ark_rejects = pd.Series(load_list(Path(args.reject_ark_list)), dtype=str)
+    def norm_ark(s: pd.Series) -> pd.Series:
+        s = s.astype(str).str.strip()
+        return s.where((s == "") | s.str.startswith("ark:/"), "ark:/" + s)
 
-    mask_ark = df["arkId"].astype(str).map(norm_ark).isin({norm_ark(a) for a in ark_rejects}) if ark_rejects else pd.Series([False]*len(df))
+    mask_ark = df["arkId"].pipe(norm_ark).isin(set(norm_ark(ark_rejects))) if len(ark_rejects) else pd.Series([False]*len(df))
 
     # 2) Rechazo por tokens (Zamacola, Zamolla, Zamalloa, etc.)
+    # palabra parcial (case-insensitive): 'zamacola' también caza 'de zamacola' o 'zamacolas'
     tokens = [t.lower() for t in load_list(Path(args.reject_surnames))]
-    tokens_pattern = None
+
+    # Coincidencia parcial sin espacios → basta con mirar el vocabulario del índice invertido
+    # (campo 'words': palabras de fullName__work/__surn1/__surn2) y no cada fila.
+    # Los tokens con espacios (p.ej. 'de zamacola') se buscan en los valores distintos de las columnas.
+    mask_tokens = pd.Series([False]*len(df))
     if tokens:
-        # palabra parcial, pero en límites de letras (case-insensitive)
-        # ej: 'zamacola' también cazará 'de zamacola' o 'zamacolas'
-        tokens_pattern = re.compile("|".join(map(re.escape, tokens)), flags=re.IGNORECASE)
-
-    def contains_token(s: str) -> bool:
-        if not tokens_pattern:
-            return False
-        return bool(tokens_pattern.search(s or ""))
-
-    mask_tokens = df.apply(
-        lambda r: (
-            contains_token(str(r.get("fullName__work",""))) or
-            contains_token(str(r.get("fullName__surn1",""))) or
-            contains_token(str(r.get("fullName__surn2","")))
-        ),
-        axis=1
-    ) if tokens_pattern else pd.Series([False]*len(df))
+        simple = SubstringMatcher(t for t in tokens if not re.search(r"\s", t))
+        spaced = SubstringMatcher(t for t in tokens if re.search(r"\s", t))
+        if simple:
+            idx = token_index.open_index(inp, ["words"], df=df)
+            vocab = pd.Series(idx.vocabulary("words"), dtype=object)
+            hit = np.zeros(len(df), dtype=bool)
+            hit[idx.rows_any("words", vocab[simple.contains(vocab)].tolist())] = True
+            mask_tokens = pd.Series(hit)
+        if spaced:
+            for col in ["fullName__work", "fullName__surn1", "fullName__surn2"]:
+                mask_tokens = mask_tokens | spaced.contains(df[col])
 
     # combinación
     mask_drop = mask_ark | mask_tokens
@@ -18,9 +18,6 @@ from __future__ import annotations
 from pathlib import Path
 import sys
 import pandas as pd
-from openpyxl import load_workbook
-from openpyxl.styles import PatternFill
-from openpyxl.utils import get_column_letter
 
 ROOT = Path(__file__).resolve().parent
 OUT  = ROOT / "out"
@@ -30,10 +27,10 @@ IN_NORMAL  = OUT / "Zamacona_normalized.xlsx"
 OUT_XLSX = OUT / "Zamacona_final.xlsx"
 OUT_CSV  = OUT / "Zamacona_final.csv"  # si no lo quieres, comenta la línea correspondiente
 
-# Colores (mismos que normalize_names.py)
-FILL_GREEN  = PatternFill(fill_type="solid", start_color="C6EFCE", end_color="C6EFCE")
-FILL_YELLOW = PatternFill(fill_type="solid", start_color="FFF2CC", end_color="FFF2CC")
-FILL_GRAY   = PatternFill(fill_type="solid", start_color="E7E6E6", end_color="E7E6E6")
+# Colores (mismos que normalize_names.py; openpyxl se importa al repintar)
+COLOR_GREEN  = "C6EFCE"
+COLOR_YELLOW = "FFF2CC"
+COLOR_GRAY   = "E7E6E6"
 
 def pick_input() -> Path:
     if IN_PATCHED.exists():
@@ -44,6 +41,7 @@ def pick_input() -> Path:
     sys.exit(1)
 
 def add_ark_hyperlinks(ws) -> int:
+    from openpyxl.utils import get_column_letter
     # Busca cabecera 'arkId' y crea links
     headers = {cell.value: idx for idx, cell in enumerate(ws[1], start=1)}
     cidx = headers.get("arkId")
@@ -81,6 +79,9 @@ def infer_status_from_flags(df: pd.DataFrame) -> pd.Series:
 
 def paint_rows(ws) -> tuple[int,int,int]:
     # Decide colores usando 'status' si existe; si no, con flags
+    from openpyxl.styles import PatternFill
+    FILL_GREEN, FILL_YELLOW, FILL_GRAY = (PatternFill(fill_type="solid", start_color=c, end_color=c)
+                                          for c in (COLOR_GREEN, COLOR_YELLOW, COLOR_GRAY))
     headers = {cell.value: idx for idx, cell in enumerate(ws[1], start=1)}
     c_status = headers.get("status")
     c_black  = headers.get("blacklistFlag")
@@ -93,6 +94,7 @@ def paint_rows(ws) -> tuple[int,int,int]:
             return ""
 
     green = yellow = gray = 0
+    ncols = ws.max_column  # max_column recorre todas las celdas: una vez, no por fila
     for r in range(2, ws.max_row + 1):
         fill = FILL_GREEN
         if c_status:
@@ -113,7 +115,7 @@ def paint_rows(ws) -> tuple[int,int,int]:
             else:
                 fill = FILL_GREEN; green += 1
 
-        for c in range(1, ws.max_column + 1):
+        for c in range(1, ncols + 1):
             ws.cell(row=r, column=c).fill = fill
     return green, yellow, gray
 
@@ -125,6 +127,7 @@ def main() -> int:
     # CSV opcional (sin estilos)
     df.to_csv(OUT_CSV, index=False)
 
+    from openpyxl import load_workbook
     wb = load_workbook(OUT_XLSX, data_only=False)
     ws = wb.active
     g, y, gr = paint_rows(ws)
@@ -10,6 +10,9 @@ Promueve a 'green' filas NO green cuando:
 y NO hay términos de blacklist, ni ambigüedad (p.ej. 'zamacona' y 'zamacola' a la vez).
 
 Preserva filas ya green. Colores se aplican al final según columna 'status'.
+Los términos (zamacona, sinónimos, blacklist) se buscan en el índice invertido del
+artefacto (token_index.py, campo 'fullname') en vez de con una regex por fila y término;
+solo las filas sin fullName__work (nombre reconstruido) se miran con regex.
 Genera:
   - out/Zamacona_normalized_patched.xlsx
   - out/Zamacona_normalized_patched.csv
@@ -22,24 +25,26 @@ import os
 import sys
 import re
 import csv
+import importlib.util
 import unicodedata
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 
-try:
-    from openpyxl import load_workbook
-    from openpyxl.styles import PatternFill
-except Exception as e:
+import rulepack
+import token_index
+
+# openpyxl solo hace falta para colorear el XLSX: se comprueba sin importarlo (se importa al exportar)
+HAS_OPENPYXL = importlib.util.find_spec("openpyxl") is not None
+if not HAS_OPENPYXL:
     print("[WARN] openpyxl no disponible para colorear. Se seguirá sin color.", file=sys.stderr)
-    load_workbook = None
 
 # ---------------------------
 # Config / paths
 # ---------------------------
 
 ROOT = Path(__file__).resolve().parent
-DATA_DIRS = [ROOT / "data", ROOT]  # buscamos primero en data/
 OUT_DIR = ROOT / "out"
 OUT_DIR.mkdir(exist_ok=True)
 
@@ -47,18 +52,8 @@ OUT_DIR.mkdir(exist_ok=True)
 BASE_NORMALIZED = OUT_DIR / "Zamacona_normalized.xlsx"  # generado por normalize_names.py
 BASE_PATCHED_PREV = OUT_DIR / "Zamacona_normalized_patched.xlsx"  # si existe, lo usamos para heredar 'status'
 
-# ficheros auxiliares (opcionales)
-SURNAME_SYNS_CSV = None
-WHITELIST_TXT = None
-REJECT_TXT = None
-
-for d in DATA_DIRS:
-    if (d / "surname_synonyms.csv").exists() and SURNAME_SYNS_CSV is None:
-        SURNAME_SYNS_CSV = d / "surname_synonyms.csv"
-    if (d / "whitelist_surnames.txt").exists() and WHITELIST_TXT is None:
-        WHITELIST_TXT = d / "whitelist_surnames.txt"
-    if (d / "reject_surnames.txt").exists() and REJECT_TXT is None:
-        REJECT_TXT = d / "reject_surnames.txt"
+# ficheros auxiliares (opcionales): data/ (o raíz) surname_synonyms.csv, whitelist_surnames.txt,
+# reject_surnames.txt → los carga y precompila rulepack.py (out/rulepack.pkl)
 
 # ficheros de salida
 OUT_XLSX = OUT_DIR / "Zamacona_normalized_patched.xlsx"
@@ -79,138 +74,6 @@ def norm(s: str) -> str:
     s = re.sub(r"\s+", " ", s).strip()
     return s
 
-def load_listfile(path: Path) -> set:
-    vals = set()
-    if path and path.exists():
-        with open(path, "r", encoding="utf-8") as f:
-            for line in f:
-                t = line.strip()
-                if t and not t.startswith("#"):
-                    vals.add(norm(t))
-    return vals
-
-def load_synonyms(path: Path) -> tuple[set, set]:
-    """
-    Devuelve:
-      strong: set de sinónimos "fuertes"
-      weak: set de sinónimos "débiles" (no se usan para forzar)
-
-    Acepta CSV con:
-      - separador auto (',', ';' o tab),
-      - líneas con 1..N columnas,
-      - comentarios con '#',
-      - columnas con nombres variados (synonym|alias|value|surname, strength|type|class|tier|level),
-      - comas sin comillar: intenta deducir "strong/weak" si aparece en alguna columna.
-    """
-    strong, weak = set(), set()
-    if not (path and path.exists()):
-        return strong, weak
-
-    import csv as _csv
-    import pandas as _pd
-    from pandas.errors import ParserError as _ParserError
-
-    def _norm(s: str) -> str:
-        return norm(s)  # usa tu norm() global
-
-    # 1) Intento principal: pandas con autodetección de separador y tolerante a líneas malas
-    try:
-        df = _pd.read_csv(
-            path,
-            engine="python",
-            sep=None,                  # autodetecta ',', ';', '\t'
-            dtype=str,
-            keep_default_na=False,
-            comment="#",
-            on_bad_lines="skip",       # salta líneas irrecuperables
-        )
-        # Detección flexible de columnas
-        col_syn = next((c for c in df.columns if c.lower() in ("synonym","alias","value","surname","name")), None)
-        col_str = next((c for c in df.columns if c.lower() in ("strength","type","class","tier","level")), None)
-
-        if col_syn is None:
-            # Si no hay columna clara, asume primera columna como 'synonym'
-            col_syn = df.columns[0]
-
-        if col_str is None:
-            # Sin columna de fuerza: todo weak por defecto
-            for v in df[col_syn]:
-                vv = _norm(v)
-                if vv:
-                    weak.add(vv)
-        else:
-            for _, row in df.iterrows():
-                syn = _norm(row[col_syn])
-                if not syn:
-                    continue
-                strength = str(row[col_str]).strip().lower()
-                if strength == "strong":
-                    strong.add(syn)
-                elif strength == "weak":
-                    weak.add(syn)
-                else:
-                    # si la celda no es 'strong/weak', intenta deducir mirando el resto de la fila
-                    tokens = {str(x).strip().lower() for x in row.tolist() if str(x).strip()}
-                    if "strong" in tokens:
-                        strong.add(syn)
-                    elif "weak" in tokens:
-                        weak.add(syn)
-                    else:
-                        weak.add(syn)
-        return strong, weak
-
-    except Exception as e:
-        # 2) Fallback manual con csv.reader (máxima tolerancia)
-        skipped = 0
-        with open(path, "r", encoding="utf-8") as f:
-            # intenta varios separadores
-            sample = f.read()
-            f.seek(0)
-            # Elige separador probable
-            if "\t" in sample:
-                delim = "\t"
-            elif ";" in sample and sample.count(";") >= sample.count(","):
-                delim = ";"
-            else:
-                delim = ","
-
-            reader = _csv.reader(f, delimiter=delim)
-            for raw in reader:
-                if not raw:
-                    continue
-                # une si se colaron comas sin comillas y hay más de 2 columnas
-                row = [c.strip() for c in raw if c is not None]
-                # salta comentarios/blank
-                if len(row) == 0 or row[0].startswith("#"):
-                    continue
-
-                # Busca un posible strength en cualquier celda
-                low = [c.strip().lower() for c in row]
-                is_strong = any(c == "strong" for c in low)
-                is_weak = any(c == "weak" for c in low)
-
-                syn = _norm(row[0]) if row[0] else ""
-                if not syn:
-                    skipped += 1
-                    continue
-
-                if is_strong:
-                    strong.add(syn)
-                elif is_weak:
-                    weak.add(syn)
-                else:
-                    # si hay segunda columna y parece fuerza, úsala
-                    if len(row) >= 2 and row[1].strip().lower() in ("strong","weak"):
-                        if row[1].strip().lower() == "strong":
-                            strong.add(syn)
-                        else:
-                            weak.add(syn)
-                    else:
-                        weak.add(syn)
-        if skipped:
-            print(f"[WARN] load_synonyms: {skipped} líneas saltadas por vacías/sin 'synonym'.")
-        return strong, weak
-
 # ---------------------------
 # Reglas de matching
 # ---------------------------
@@ -223,12 +86,10 @@ DEFAULT_BLACKLIST = {
 }
 
 def build_blacklist() -> set:
-    bl = set(DEFAULT_BLACKLIST)
-    rej = load_listfile(REJECT_TXT)
-    bl |= rej
-    return bl
+    # DEFAULT_BLACKLIST ∪ reject_surnames.txt (normalizados), ya unidos en el rulepack
+    return set(rulepack.load()["zam_blacklist"])
 
-def should_force(fullname_norm: str, strong_syns: set, blacklist: set) -> tuple[bool, str, bool]:
+def decide(has_bad: bool, has_exact: bool, has_strong_syn: bool) -> tuple[bool, str, bool]:
     """
     Decide si forzar a green.
     Devuelve: (force: bool, reason: str, ambiguous: bool)
@@ -239,10 +100,6 @@ def should_force(fullname_norm: str, strong_syns: set, blacklist: set) -> tuple[
       - Si match en sinónimo 'strong' -> forzar
       - En otro caso -> no forzar
     """
-    has_bad = any(re.search(rf"\b{re.escape(b)}\b", fullname_norm) for b in blacklist)
-    has_exact = bool(ZAM_STRICT_RE.search(fullname_norm))
-    has_strong_syn = any(re.search(rf"\b{re.escape(s)}\b", fullname_norm) for s in strong_syns) if strong_syns else False
-
     if has_bad and has_exact:
         return (False, "skip:ambiguous:blacklist+exact", True)
     if has_bad and has_strong_syn:
@@ -257,6 +114,45 @@ def should_force(fullname_norm: str, strong_syns: set, blacklist: set) -> tuple[
 
     return (False, "skip:no-match", False)
 
+def should_force(fullname_norm: str, strong_syns: set, blacklist: set) -> tuple[bool, str, bool]:
+    has_bad = any(re.search(rf"\b{re.escape(b)}\b", fullname_norm) for b in blacklist)
+    has_exact = bool(ZAM_STRICT_RE.search(fullname_norm))
+    has_strong_syn = any(re.search(rf"\b{re.escape(s)}\b", fullname_norm) for s in strong_syns) if strong_syns else False
+    return decide(has_bad, has_exact, has_strong_syn)
+
+# ---------------------------
+# Matching vía índice invertido
+# ---------------------------
+
+SIMPLE_TERM_RE = re.compile(r"^[a-z]+(?: [a-z]+)*$")
+
+def term_mask(idx, terms: set, fullname_norms: list[str]) -> np.ndarray:
+    """
+    Filas (posición) cuyo nombre normalizado contiene algún término como palabra(s) completa(s).
+    norm() deja solo [a-z] y espacios simples, así que \bterm\b == el token está en la fila:
+      - término de una palabra -> lookup directo,
+      - varias palabras        -> filas con todas las palabras, confirmadas con regex,
+      - otra cosa              -> regex sobre todas las filas.
+    """
+    mask = np.zeros(len(fullname_norms), dtype=bool)
+    single = [t for t in terms if SIMPLE_TERM_RE.match(t) and " " not in t]
+    mask[idx.rows_any("fullname", single)] = True
+    for t in terms:
+        if SIMPLE_TERM_RE.match(t) and " " not in t:
+            continue
+        if SIMPLE_TERM_RE.match(t):
+            cand = None
+            for w in t.split():
+                rows = idx.rows_any("fullname", [w])
+                cand = rows if cand is None else np.intersect1d(cand, rows)
+        else:
+            cand = np.arange(len(fullname_norms))
+        pat = re.compile(rf"\b{re.escape(t)}\b")
+        for r in cand.tolist():
+            if not mask[r] and pat.search(fullname_norms[r]):
+                mask[r] = True
+    return mask
+
 # ---------------------------
 # Column helpers
 # ---------------------------
@@ -298,24 +194,29 @@ def build_fullname_norm(row, cols_priority: list[str]) -> str:
 # Color helpers (visual only)
 # ---------------------------
 
-FILL_GREEN = PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid") if load_workbook else None
-FILL_YELLOW = PatternFill(start_color="FFF2CC", end_color="FFF2CC", fill_type="solid") if load_workbook else None
-FILL_GRAY = PatternFill(start_color="E7E6E6", end_color="E7E6E6", fill_type="solid") if load_workbook else None
-FILL_RED = PatternFill(start_color="F4CCCC", end_color="F4CCCC", fill_type="solid") if load_workbook else None
+FILL_COLORS = {"green": "C6EFCE", "yellow": "FFF2CC", "gray": "E7E6E6", "red": "F4CCCC"}
+_FILLS: dict = {}
 
-def apply_row_fill(ws, row_idx: int, status: str):
-    if not load_workbook:
+def get_fill(kind: str):
+    if kind not in _FILLS:
+        from openpyxl.styles import PatternFill
+        c = FILL_COLORS[kind]
+        _FILLS[kind] = PatternFill(start_color=c, end_color=c, fill_type="solid")
+    return _FILLS[kind]
+
+def apply_row_fill(ws, row_idx: int, status: str, ncols: int = 0):
+    if not HAS_OPENPYXL:
         return
-    # colorea toda la fila de datos (desde 1 hasta max_column)
+    # colorea toda la fila de datos (desde 1 hasta max_column; ncols evita recalcularlo por fila)
     if status == "green":
-        fill = FILL_GREEN
+        fill = get_fill("green")
     elif status.startswith("yellow"):
-        fill = FILL_YELLOW
+        fill = get_fill("yellow")
     elif status == "red":
-        fill = FILL_RED
+        fill = get_fill("red")
     else:
-        fill = FILL_GRAY
-    for col_idx in range(1, ws.max_column + 1):
+        fill = get_fill("gray")
+    for col_idx in range(1, (ncols or ws.max_column) + 1):
         ws.cell(row=row_idx, column=col_idx).fill = fill
 
 # ---------------------------
@@ -364,9 +265,10 @@ def main():
             return row[status_col]
         base_df[status_col] = base_df.apply(_inherit, axis=1)
 
-    # Carga sinónimos y listas
-    strong_syns, _weak_syns = load_synonyms(SURNAME_SYNS_CSV) if SURNAME_SYNS_CSV else (set(), set())
-    whitelist = load_listfile(WHITELIST_TXT) if WHITELIST_TXT else set()
+    # Carga sinónimos y listas (rulepack)
+    pack = rulepack.load()
+    strong_syns = set(pack["zam_strong_syns"])
+    whitelist = set(pack["zam_whitelist"])
     blacklist = build_blacklist()
 
     # Forzado
@@ -382,17 +284,29 @@ def main():
         fullname_norms.append(build_fullname_norm(row, [work_name_col] if work_name_col else []))
     base_df["fullName__norm_tmp"] = fullname_norms  # columna temporal interna
 
+    # Términos por fila: índice para las filas con fullName__work; regex para las reconstruidas
+    n = len(base_df)
+    if work_name_col == "fullName__work":
+        # sin df: base_df no es el frame de read_artifact (sin dtype=str y ya con status heredado
+        # y columnas temporales); si hay que (re)construir, open_index relee el artefacto
+        idx_tok = token_index.open_index(BASE_NORMALIZED, ["fullname"])
+        covered = base_df[work_name_col].map(lambda v: pd.notna(v) and bool(str(v).strip())).to_numpy(dtype=bool)
+        has_bad = term_mask(idx_tok, blacklist, fullname_norms)
+        has_exact = term_mask(idx_tok, {"zamacona"}, fullname_norms)
+        has_syn = term_mask(idx_tok, strong_syns, fullname_norms)
+    else:
+        covered = np.zeros(n, dtype=bool)
+        has_bad = has_exact = has_syn = np.zeros(n, dtype=bool)
+
     # Recorre filas y decide promoción
-    for idx, row in base_df.iterrows():
+    for pos, (idx, row) in enumerate(base_df.iterrows()):
         curr_status = str(row[status_col]).strip().lower() if pd.notna(row[status_col]) else "gray"
         fullname_norm = row["fullName__norm_tmp"]
 
-        # whitelists exactas: equivalentes fuertes (pero solo las usamos como extra-seguro)
-        if any(re.search(rf"\b{re.escape(w)}\b", fullname_norm) for w in whitelist):
-            # NO forzamos automáticamente: solo permite reconocimiento; el forzado lo decide should_force
-            pass
-
-        force, reason, ambiguous = should_force(fullname_norm, strong_syns, blacklist)
+        if covered[pos]:
+            force, reason, ambiguous = decide(has_bad[pos], has_exact[pos], has_syn[pos])
+        else:
+            force, reason, ambiguous = should_force(fullname_norm, strong_syns, blacklist)
 
         if curr_status == "green":
             n_preserve_green += 1
@@ -436,8 +350,9 @@ def main():
     base_df.to_excel(OUT_XLSX, index=False)
     print(f"[OK] {OUT_XLSX.name}")
 
-    if load_workbook:
+    if HAS_OPENPYXL:
         try:
+            from openpyxl import load_workbook
             wb = load_workbook(OUT_XLSX)
             ws = wb.active
             # encab: fila 1; datos desde fila 2
@@ -448,12 +363,13 @@ def main():
             except ValueError:
                 status_col_idx = None
 
+            ncols = ws.max_column
             for r in range(2, ws.max_row + 1):
                 st = "gray"
                 if status_col_idx:
                     cell_v = ws.cell(row=r, column=status_col_idx).value
                     st = str(cell_v).strip().lower() if cell_v is not None else "gray"
-                apply_row_fill(ws, r, st if st else "gray")
+                apply_row_fill(ws, r, st if st else "gray", ncols)
 
             wb.save(OUT_XLSX)
         except Exception as e:
@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+golden_diff.py
+
+Arnés diferencial: ejecuta el motor de referencia y un motor candidato sobre el mismo
+corpus dorado y exige salidas idénticas en las cuatro funciones del camino caliente:
+
+  normalize_person_item · split_person · row_flags_with_reason · should_force
+
+Además comprueba que la normalización del candidato es idempotente:
+normalize(normalize(x)) == normalize(x) en todo el corpus (fallan los casos nuevos
+respecto a la referencia; los heredados solo se cuentan en el informe).
+
+Motores (--ref / --cand):
+  .            árbol de trabajo actual
+  <carpeta>    otra copia del proyecto
+  git:<rev>    revisión de git (se extrae con git archive a <tmp>/zamacona_golden_trees/<sha>/,
+               fuera del repo)
+--cand-module <modulo>: módulo del árbol candidato que sustituye cualquiera de las
+funciones (y opcionalmente sus variantes por lotes <func>_batch(lista) -> lista, para
+motores vectorizados o paralelos).
+
+Cada función se compara AISLADA: sus entradas salen siempre de la referencia (split y
+flags reciben los __work normalizados por la referencia), así un fallo no contamina los
+siguientes.
+
+Corpus dorado (out/golden/golden_corpus.jsonl, se congela la primera vez; --rebuild):
+  - real: columnas __work de out/Zamacona_prepared.csv (o --real <csv/xlsx>) si existe
+  - synthetic: filas de bench_corpus.py (--synthetic N)
+
+Salidas (out/golden/):
+  - golden_mismatches.tsv   func, fila, origen, entrada, referencia, candidato, repro mínima
+  - golden_report.md        resumen: discrepancias por función, pares de tokens y ratio de throughput
+
+Uso:
+  python3 golden_diff.py                          # git:HEAD frente al árbol de trabajo
+  python3 golden_diff.py --cand-module fast_norm  # HEAD frente a fast_norm.py (árbol de trabajo)
+  python3 golden_diff.py --ref git:main --cand ../otra_copia --synthetic 200000 --repeat 3
+
+Salida: 0 idénticos · 1 con discrepancias
+"""
+
+from __future__ import annotations
+import argparse
+import csv
+import hashlib
+import importlib
+import io
+import json
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parent
+GOLDEN_DIR = ROOT / "out" / "golden"
+CORPUS = GOLDEN_DIR / "golden_corpus.jsonl"
+TREES_DIR = Path(tempfile.gettempdir()) / "zamacona_golden_trees"  # fuera del árbol de trabajo
+OUT_TSV = GOLDEN_DIR / "golden_mismatches.tsv"
+OUT_MD = GOLDEN_DIR / "golden_report.md"
+REAL_DEFAULT = ROOT / "out" / "Zamacona_prepared.csv"
+
+NORMALIZE = "normalize_person_item"
+FUNCS = ["normalize_person_item", "split_person", "row_flags_with_reason", "should_force"]
+WORK_COLS = [f"{p}__work" for p in ("fullName", "fatherFullName", "motherFullName",
+                                     "spouseFullName", "childrenFullNames", "otherFullNames")]
+MAX_REPROS = 25
+
+# ---------------------------
+# Corpus dorado
+# ---------------------------
+
+def real_rows(path: Path, limit: int) -> List[dict]:
+    import pandas as pd
+    if path.suffix.lower() == ".xlsx":
+        df = pd.read_excel(path, dtype=str)
+    else:
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    cols = [c for c in WORK_COLS if c in df.columns]
+    if not cols:
+        print(f"[WARN] {path.name} no tiene columnas __work: sin filas reales.")
+        return []
+    df = df[cols].fillna("")
+    if limit:
+        df = df.head(limit)
+    return [{"source": "real", "cells": {c: v for c, v in r.items() if v}} for r in df.to_dict("records")]
+
+def synthetic_rows(n: int, seed: int) -> List[dict]:
+    import bench_corpus
+    pos = {c: bench_corpus.COLUMNS.index(c[:-6]) for c in WORK_COLS if c[:-6] in bench_corpus.COLUMNS}
+    out = []
+    for row in bench_corpus.iter_rows(n, seed, dup_rate=0.0):
+        out.append({"source": "synthetic", "cells": {c: row[i] for c, i in pos.items() if row[i]}})
+    return out
+
+def build_corpus(real: Optional[Path], real_limit: int, synthetic: int, seed: int) -> List[dict]:
+    rows = real_rows(real, real_limit) if real and real.exists() else []
+    n_real = len(rows)
+    rows += synthetic_rows(synthetic, seed)
+    GOLDEN_DIR.mkdir(parents=True, exist_ok=True)
+    with open(CORPUS, "w", encoding="utf-8") as f:
+        for i, r in enumerate(rows):
+            f.write(json.dumps(dict(id=i, **r), ensure_ascii=False) + "\n")
+    print(f"[OK] Corpus dorado: {n_real} filas reales + {len(rows) - n_real} sintéticas → {CORPUS}")
+    return load_corpus()
+
+def load_corpus() -> List[dict]:
+    with open(CORPUS, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+# ---------------------------
+# Motores
+# ---------------------------
+
+def git_tree(rev: str) -> Path:
+    """Extrae la revisión (solo ficheros versionados) a TREES_DIR/<sha>/ (una vez)."""
+    sha = subprocess.run(["git", "rev-parse", rev], cwd=str(ROOT), capture_output=True,
+                         text=True, check=True).stdout.strip()
+    dest = TREES_DIR / sha[:12]
+    if not (dest / "normalize_names.py").exists():
+        dest.mkdir(parents=True, exist_ok=True)
+        tar = subprocess.run(["git", "archive", "--format=tar", sha], cwd=str(ROOT),
+                             capture_output=True, check=True).stdout
+        with tarfile.open(fileobj=io.BytesIO(tar)) as tf:
+            tf.extractall(dest)
+    return dest
+
+def tree_for(spec: str) -> Path:
+    if spec.startswith("git:"):
+        return git_tree(spec[4:])
+    p = (ROOT / spec).resolve() if not Path(spec).is_absolute() else Path(spec)
+    if not (p / "normalize_names.py").exists():
+        raise SystemExit(f"✖ {spec}: no contiene normalize_names.py")
+    return p
+
+@contextmanager
+def _isolated_imports(tree: Path):
+    """Importa los módulos del proyecto desde 'tree' sin pisar los ya cargados de otro árbol.
+    Las funciones conservan sus propios globales aunque se retiren de sys.modules."""
+    local = {p.stem for p in tree.glob("*.py")} | {p.stem for p in ROOT.glob("*.py")}
+    local.discard(Path(__file__).stem)
+    saved = {n: sys.modules.pop(n) for n in list(sys.modules) if n in local}
+    sys.path.insert(0, str(tree))
+    try:
+        yield
+    finally:
+        sys.path.remove(str(tree))
+        for n in local:
+            sys.modules.pop(n, None)
+        sys.modules.update(saved)
+
+class Engine:
+    """Las cuatro funciones de un árbol (más el módulo candidato, si lo hay) y sus tablas."""
+
+    def __init__(self, spec: str, module: Optional[str] = None):
+        self.tree = tree_for(spec)
+        self.label = spec + (f" + {module}" if module else "")
+        with _isolated_imports(self.tree):
+            nn = importlib.import_module("normalize_names")
+            fz = importlib.import_module("find_zamacona_in_non_green")
+            rp = importlib.import_module("rulepack")
+            nn.load_surname_whitelist()
+            self.first_person = nn.first_person
+            self.fz_norm = fz.norm
+            self.strong = set(rp.load()["zam_strong_syns"])
+            self.blacklist = fz.build_blacklist()
+            self.funcs: Dict[str, Callable] = {
+                "normalize_person_item": nn.normalize_person_item,
+                "split_person": nn.split_person,
+                "row_flags_with_reason": nn.row_flags_with_reason,
+                "should_force": fz.should_force,
+            }
+            self.batch: Dict[str, Callable] = {}
+            if module:
+                mod = importlib.import_module(module)
+                for name in FUNCS:
+                    if hasattr(mod, name):
+                        self.funcs[name] = getattr(mod, name)
+                    if hasattr(mod, name + "_batch"):
+                        self.batch[name] = getattr(mod, name + "_batch")
+        self.overrides = sorted(set(self.batch) | {n for n in FUNCS if module and self.funcs[n].__module__ == module})
+
+    def call(self, name: str, x):
+        """Una llamada, con la salida en forma comparable (tuplas/str)."""
+        f = self.funcs[name]
+        if name == "row_flags_with_reason":
+            return _flags_tuple(f(x, WORK_COLS))
+        if name == "should_force":
+            return tuple(f(x, self.strong, self.blacklist))
+        return _plain(f(x))
+
+    def run(self, name: str, inputs: list) -> list:
+        if name in self.batch:
+            if name == "row_flags_with_reason":
+                return [_flags_tuple(r) for r in self.batch[name](inputs, WORK_COLS)]
+            if name == "should_force":
+                return [tuple(r) for r in self.batch[name](inputs, self.strong, self.blacklist)]
+            return [_plain(r) for r in self.batch[name](inputs)]
+        return [self.call(name, x) for x in inputs]
+
+def _plain(v):
+    return tuple(v) if isinstance(v, list) else v
+
+def _flags_tuple(v) -> tuple:
+    # row_flags_with_reason devuelve una pd.Series (o dict en motores alternativos)
+    get = v.get if hasattr(v, "get") else (lambda k: None)
+    return (int(get("blacklistFlag") or 0), int(get("reviewFlag") or 0), str(get("blacklistReason") or ""))
+
+# ---------------------------
+# Entradas por función (siempre desde la referencia)
+# ---------------------------
+
+def function_inputs(ref: Engine, corpus: List[dict]) -> Tuple[Dict[str, list], Dict[str, List[int]]]:
+    """Entradas de cada función y, en paralelo, el id de fila del corpus de cada entrada."""
+    items, item_rows = [], []
+    for r in corpus:
+        for c in WORK_COLS:
+            for part in (r["cells"].get(c) or "").split(";"):
+                if part.strip():
+                    items.append(part.strip())
+                    item_rows.append(r["id"])
+    normed = ref.run("normalize_person_item", items)
+    # __work normalizados por fila, como normalize_cell_value
+    rows_norm: Dict[int, Dict[str, List[str]]] = {}
+    k = 0
+    for r in corpus:
+        d = {}
+        for c in WORK_COLS:
+            parts = [p.strip() for p in (r["cells"].get(c) or "").split(";") if p.strip()]
+            d[c] = "; ".join(p for p in normed[k:k + len(parts)] if p)
+            k += len(parts)
+        rows_norm[r["id"]] = d
+    persons, person_rows = [], []
+    for rid, d in rows_norm.items():
+        for c in WORK_COLS:
+            fp = ref.first_person(d[c])
+            if fp:
+                persons.append(fp)
+                person_rows.append(rid)
+    rows_in = [rows_norm[r["id"]] for r in corpus]
+    full_in = [ref.fz_norm(rows_norm[r["id"]]["fullName__work"]) for r in corpus]
+    inputs = {"normalize_person_item": items, "split_person": persons,
+              "row_flags_with_reason": rows_in, "should_force": full_in}
+    ids = {"normalize_person_item": item_rows, "split_person": person_rows,
+           "row_flags_with_reason": [r["id"] for r in corpus], "should_force": [r["id"] for r in corpus]}
+    return inputs, ids
+
+# ---------------------------
+# Reproducciones mínimas
+# ---------------------------
+
+def _differs(ref: Engine, cand: Engine, name: str, x) -> bool:
+    try:
+        return ref.call(name, x) != cand.call(name, x)
+    except Exception:
+        return True
+
+def _safe_call(engine: Engine, name: str, x):
+    try:
+        return engine.call(name, x)
+    except Exception as e:
+        return f"<{type(e).__name__}: {e}>"
+
+def shrink_text(ref: Engine, cand: Engine, name: str, s: str) -> str:
+    """Quita tokens mientras la discrepancia se mantenga (greedy, hasta punto fijo)."""
+    toks = s.split()
+    changed = True
+    while changed and len(toks) > 1:
+        changed = False
+        for i in range(len(toks)):
+            trial = toks[:i] + toks[i + 1:]
+            if _differs(ref, cand, name, " ".join(trial)):
+                toks, changed = trial, True
+                break
+    return " ".join(toks)
+
+def shrink_row(ref: Engine, cand: Engine, row: Dict[str, str]) -> Dict[str, str]:
+    name = "row_flags_with_reason"
+    row = dict(row)
+    for c in WORK_COLS:
+        if row.get(c):
+            trial = dict(row, **{c: ""})
+            if _differs(ref, cand, name, trial):
+                row = trial
+    for c in WORK_COLS:
+        if row.get(c):
+            toks = row[c].split()
+            changed = True
+            while changed and len(toks) > 1:
+                changed = False
+                for i in range(len(toks)):
+                    trial = dict(row, **{c: " ".join(toks[:i] + toks[i + 1:])})
+                    if _differs(ref, cand, name, trial):
+                        toks, row, changed = trial[c].split(), trial, True
+                        break
+    return row
+
+def minimal_repro(ref: Engine, cand: Engine, name: str, x):
+    if name == "row_flags_with_reason":
+        return shrink_row(ref, cand, x)
+    return shrink_text(ref, cand, name, x)
+
+# ---------------------------
+# Diferencias
+# ---------------------------
+
+def _time_pair(ref: Engine, cand: Engine, name: str, inputs: list, repeat: int):
+    """Salidas y mejor tiempo de cada motor; calentamiento previo (caché de re, lazy imports)
+    y repeticiones alternadas para que el orden no sesgue el ratio."""
+    for e in (ref, cand):
+        e.run(name, inputs[:200])
+    best = [float("inf"), float("inf")]
+    outs = [None, None]
+    for _ in range(max(1, repeat)):
+        for k, e in enumerate((ref, cand)):
+            t0 = time.perf_counter()
+            outs[k] = e.run(name, inputs)
+            best[k] = min(best[k], time.perf_counter() - t0)
+    return outs[0], best[0], outs[1], best[1]
+
+def token_pairs(a: str, b: str) -> List[Tuple[str, str]]:
+    """Pares (ref, cand) de tokens distintos, alineados por posición."""
+    ta, tb = (a or "").split(), (b or "").split()
+    n = max(len(ta), len(tb))
+    ta += [""] * (n - len(ta))
+    tb += [""] * (n - len(tb))
+    return [(x, y) for x, y in zip(ta, tb) if x != y]
+
+def _fmt(v) -> str:
+    if isinstance(v, dict):
+        return json.dumps({k: x for k, x in v.items() if x}, ensure_ascii=False)  # solo celdas con texto
+    if isinstance(v, tuple):
+        return " | ".join(str(x) for x in v)
+    return str(v)
+
+def diff_engines(ref: Engine, cand: Engine, corpus: List[dict], funcs: List[str],
+                 repeat: int, max_repros: int) -> dict:
+    inputs, ids = function_inputs(ref, corpus)
+    source = {r["id"]: r["source"] for r in corpus}
+    res = {"funcs": {}, "mismatches": [], "token_pairs": Counter(), "rows": set()}
+    for name in funcs:
+        xs = inputs[name]
+        print(f"… {name}: {len(xs)} entradas")
+        out_ref, t_ref, out_cand, t_cand = _time_pair(ref, cand, name, xs, repeat)
+        bad = [i for i, (a, b) in enumerate(zip(out_ref, out_cand)) if a != b]
+        if len(out_ref) != len(out_cand):
+            print(f"✖ {name}: el candidato devolvió {len(out_cand)} salidas para {len(out_ref)} entradas")
+            bad = list(range(len(xs)))
+        res["funcs"][name] = {"inputs": len(xs), "mismatches": len(bad),
+                              "ref_s": round(t_ref, 4), "cand_s": round(t_cand, 4),
+                              "ratio": round(t_ref / t_cand, 2) if t_cand else None}
+        seen = set()
+        for i in bad:
+            rid = ids[name][i]
+            res["rows"].add(rid)
+            a = out_ref[i]
+            b = out_cand[i] if i < len(out_cand) else None
+            if name == "normalize_person_item":
+                pairs = token_pairs(a, b)
+                res["token_pairs"].update(pairs)
+                key = tuple(pairs) or (_fmt(a), _fmt(b))
+            else:
+                key = (_fmt(a), _fmt(b))
+            m = {"func": name, "row": rid, "source": source.get(rid, ""),
+                 "input": _fmt(xs[i]), "ref": _fmt(a), "cand": _fmt(b), "repro": ""}
+            if len(seen) < max_repros and key not in seen:  # una repro por patrón de discrepancia
+                seen.add(key)
+                x = minimal_repro(ref, cand, name, xs[i])
+                if _fmt(x) not in seen:  # patrones distintos que se reducen al mismo caso
+                    seen.add(_fmt(x))
+                    m["repro"] = _fmt(x)
+                    m["repro_ref"], m["repro_cand"] = (_fmt(_safe_call(e, name, x)) for e in (ref, cand))
+            res["mismatches"].append(m)
+        if name == "normalize_person_item":
+            check_idempotence(ref, cand, xs, ids[name], out_ref, out_cand, source, res)
+    return res
+
+def check_idempotence(ref: Engine, cand: Engine, xs: list, rows: List[int], out_ref: list, out_cand: list,
+                      source: Dict[int, str], res: dict):
+    """normalize(normalize(x)) == normalize(x). Cuentan como fallo los casos que el candidato
+    rompe y la referencia no (los que ya fallaban en la referencia solo se informan)."""
+    again_ref, again_cand = ref.run(NORMALIZE, out_ref), cand.run(NORMALIZE, out_cand)
+    bad_ref = {i for i, (a, b) in enumerate(zip(out_ref, again_ref)) if a != b}
+    bad_cand = [i for i, (a, b) in enumerate(zip(out_cand, again_cand)) if a != b]
+    new = [i for i in bad_cand if i not in bad_ref]
+    res["idempotence"] = {"inputs": len(xs), "ref": len(bad_ref), "cand": len(bad_cand), "new": len(new)}
+    for i in new:
+        res["rows"].add(rows[i])
+        res["mismatches"].append({"func": "idempotence", "row": rows[i], "source": source.get(rows[i], ""),
+                                  "input": xs[i], "ref": out_cand[i], "cand": again_cand[i], "repro": ""})
+
+# ---------------------------
+# Informe
+# ---------------------------
+
+def write_outputs(res: dict, ref: Engine, cand: Engine, corpus: List[dict]):
+    GOLDEN_DIR.mkdir(parents=True, exist_ok=True)
+    with open(OUT_TSV, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f, delimiter="\t", lineterminator="\n")
+        w.writerow(["func", "row", "source", "input", "ref", "cand", "repro"])
+        for m in res["mismatches"]:
+            w.writerow([m[k] for k in ("func", "row", "source", "input", "ref", "cand", "repro")])
+
+    n_src = Counter(r["source"] for r in corpus)
+    md = ["# Diferencial del motor de normalización",
+          f"- Referencia: `{ref.label}`",
+          f"- Candidato: `{cand.label}`" + (f" (sustituye: {', '.join(cand.overrides)})" if cand.overrides else ""),
+          f"- Corpus: {len(corpus)} filas ({', '.join(f'{k}={v}' for k, v in sorted(n_src.items()))}); "
+          f"sha1 {hashlib.sha1(CORPUS.read_bytes()).hexdigest()[:12]}",
+          f"- Filas con alguna discrepancia: **{len(res['rows'])}**",
+          "\n## Por función\n",
+          "| función | entradas | discrepancias | ref (s) | cand (s) | ratio ref/cand |",
+          "|---|---:|---:|---:|---:|---:|"]
+    for name, st in res["funcs"].items():
+        md.append(f"| {name} | {st['inputs']} | {st['mismatches']} | {st['ref_s']:.3f} | {st['cand_s']:.3f} | "
+                  f"{st['ratio'] if st['ratio'] is not None else '-'}x |")
+    idem = res.get("idempotence")
+    if idem:
+        md.append("\n## Idempotencia (normalize_person_item)\n")
+        md.append(f"- normalize(normalize(x)) ≠ normalize(x): ref {idem['ref']} · cand {idem['cand']} "
+                  f"de {idem['inputs']}; nuevos en el candidato: **{idem['new']}** "
+                  "(en el TSV con func=idempotence: ref = 1ª pasada, cand = 2ª)")
+    if res["token_pairs"]:
+        md.append("\n## Tokens distintos (normalize_person_item, top 30)\n")
+        md.append("| referencia | candidato | veces |")
+        md.append("|---|---|---:|")
+        for (a, b), n in res["token_pairs"].most_common(30):
+            md.append(f"| {a or '∅'} | {b or '∅'} | {n} |")
+    repros = [m for m in res["mismatches"] if m["repro"]]
+    if repros:
+        md.append("\n## Reproducciones mínimas\n")
+        for m in repros:
+            md.append(f"- `{m['func']}({m['repro']})` → ref `{m['repro_ref']}` · cand `{m['repro_cand']}`"
+                      f"  (fila {m['row']}, {m['source']})")
+    OUT_MD.write_text("\n".join(md) + "\n", encoding="utf-8")
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Diferencial referencia vs candidato sobre el corpus dorado.")
+    ap.add_argument("--ref", default="git:HEAD", help="Motor de referencia: '.', carpeta o git:<rev>")
+    ap.add_argument("--cand", default=".", help="Motor candidato: '.', carpeta o git:<rev>")
+    ap.add_argument("--cand-module", default=None, help="Módulo del árbol candidato que sustituye funciones")
+    ap.add_argument("--funcs", default=",".join(FUNCS), help="Funciones a comparar")
+    ap.add_argument("--real", default=str(REAL_DEFAULT), help="CSV/XLSX con columnas __work reales")
+    ap.add_argument("--real-limit", type=int, default=0, help="Máximo de filas reales (0 = todas)")
+    ap.add_argument("--synthetic", type=int, default=20000, help="Filas sintéticas (bench_corpus.py)")
+    ap.add_argument("--seed", type=int, default=4321)
+    ap.add_argument("--rebuild", action="store_true", help="Regenera el corpus dorado")
+    ap.add_argument("--repeat", type=int, default=1, help="Repeticiones para el throughput (mejor)")
+    ap.add_argument("--max-repros", type=int, default=MAX_REPROS, help="Reproducciones mínimas por función")
+    args = ap.parse_args()
+
+    names = [f.strip() for f in args.funcs.split(",") if f.strip()]
+    unknown = [f for f in names if f not in FUNCS]
+    if unknown:
+        raise SystemExit(f"Funciones desconocidas: {', '.join(unknown)} (válidas: {', '.join(FUNCS)})")
+
+    if args.rebuild or not CORPUS.exists():
+        corpus = build_corpus(Path(args.real) if args.real else None, args.real_limit, args.synthetic, args.seed)
+    else:
+        corpus = load_corpus()
+        print(f"[INFO] Corpus dorado existente: {len(corpus)} filas (usa --rebuild para regenerarlo)")
+
+    ref = Engine(args.ref)
+    cand = Engine(args.cand, args.cand_module)
+    print(f"[INFO] Referencia: {ref.tree}\n[INFO] Candidato:  {cand.tree}"
+          + (f" (sustituye: {', '.join(cand.overrides)})" if cand.overrides else ""))
+
+    res = diff_engines(ref, cand, corpus, names, args.repeat, args.max_repros)
+    write_outputs(res, ref, cand, corpus)
+
+    for name, st in res["funcs"].items():
+        flag = "[OK]  " if not st["mismatches"] else "✖     "
+        print(f"{flag} {name:<24} {st['mismatches']:>7} discrepancias / {st['inputs']:<8} "
+              f"ref {st['ref_s']:.2f}s · cand {st['cand_s']:.2f}s · {st['ratio']}x")
+    idem = res.get("idempotence")
+    if idem:
+        flag = "[OK]  " if not idem["new"] else "✖     "
+        print(f"{flag} {'idempotencia':<24} {idem['new']:>7} nuevos / {idem['inputs']:<8} "
+              f"(ya en la referencia: {idem['ref']})")
+    print(f"[OK] Informe → {OUT_MD}\n[OK] Discrepancias → {OUT_TSV}")
+    return 1 if res["mismatches"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+hot_stats.py
+
+Contadores y temporizadores opcionales para el camino caliente de normalize_names.py
+(se activan con --stats; desactivados no cuestan más que un 'if STATS is not None').
+
+- phase(nombre): acumula segundos por fase (normalize, flags, split, status, write, paint…)
+- count(nombre, n): contadores sueltos (tokens, llamadas a edit_distance…)
+- hit(tabla, clave): qué clave de qué tabla de reglas disparó (GIVEN_MAP, SURNAME_SYNONYMS,
+  BLACKLIST_REGEX…)
+- merge(otro): suma fases, contadores y disparos de otro HotStats (procesos del pool)
+- save(path, tables, extra): JSON con todo lo anterior y, por tabla, las claves que no
+  dispararon nunca (candidatas a peso muerto)
+"""
+
+from __future__ import annotations
+import json
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+class HotStats:
+    def __init__(self):
+        self.phases: Dict[str, float] = defaultdict(float)
+        self.counts: Counter = Counter()
+        self.hits: Dict[str, Counter] = defaultdict(Counter)
+
+    @contextmanager
+    def phase(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] += time.perf_counter() - t0
+
+    def count(self, name: str, n: int = 1):
+        self.counts[name] += n
+
+    def hit(self, table: str, key: str):
+        self.hits[table][key] += 1
+
+    def merge(self, other: "HotStats"):
+        """Suma lo de otro HotStats (p.ej. el de un proceso del pool de normalize_names --jobs)."""
+        for k, v in other.phases.items():
+            self.phases[k] += v
+        self.counts.update(other.counts)
+        for table, c in other.hits.items():
+            self.hits[table].update(c)
+
+    def to_dict(self, tables: Optional[Dict[str, Iterable[str]]] = None) -> dict:
+        """tables: {nombre: claves} de las tablas de reglas, para listar las que no dispararon."""
+        rules = {}
+        for name in sorted(set(self.hits) | set(tables or {})):
+            c = self.hits.get(name, Counter())
+            entry = {"fired": int(sum(c.values())), "distinct": len(c),
+                     "top": dict(c.most_common())}
+            if tables and name in tables:
+                keys = [str(k) for k in tables[name]]
+                entry["keys"] = len(keys)
+                entry["unused"] = sorted(k for k in keys if k not in c)
+            rules[name] = entry
+        return {
+            "phases_s": {k: round(v, 4) for k, v in self.phases.items()},
+            "total_s": round(sum(self.phases.values()), 4),
+            "counters": dict(self.counts),
+            "rules": rules,
+        }
+
+    def save(self, path: Path, tables: Optional[Dict[str, Iterable[str]]] = None, extra: Optional[dict] = None):
+        data = dict(extra or {})
+        data.update(self.to_dict(tables))
+        Path(path).write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+        return data
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+link_records.py
+
+Enlace probabilístico de registros: la misma persona indexada varias veces por
+FamilySearch con arkIds distintos y grafías algo diferentes (lo que no ven
+check_dedup*.py / analyze_duplicates.py / canonicalize_strict_dupes.py, que solo
+detectan copias exactas o el mismo arkId).
+
+1) Bloqueo (varias pasadas; un par es candidato si coincide en alguna):
+     A: clave fonética apellido1 + inicial del nombre + año
+     B: clave fonética apellido1 + apellidos del padre y de la madre (fonéticos)
+     C: claves fonéticas apellido1 + apellido2 + inicial del nombre
+   (claves = phonetic.skeleton: esqueleto fonético compartido con normalize/audit)
+   Año = primer año de 4 cifras de chrDate / birthLikeDate. Los bloques de más de
+   --max-block filas se descartan en esa pasada (nombres muy frecuentes; las otras
+   pasadas, más específicas, los cubren): así los pares candidatos crecen casi
+   linealmente con las filas (≤ n·max_block/2 por pasada).
+2) Comparación vectorizada por pares (códigos enteros factorizados, sin bucles):
+   nombre, apellido1, apellido2, padre, madre → exacto / fonético / distinto / falta;
+   año → igual / ±2 / distinto / falta; lugar y sexo → igual / distinto / falta.
+3) Puntuación tipo Fellegi-Sunter: suma de pesos log2(m/u) por nivel (WEIGHTS);
+   match si score >= --threshold.
+4) Clústeres = componentes conexas de los matches (propagación de etiquetas con numpy).
+
+Salidas en out/:
+  - linkage_pairs.tsv     → pares candidatos con score >= --report-min (niveles + score)
+  - linkage_clusters.tsv  → cluster_id, size, score_min/score_max (aristas del clúster) y
+                            una fila por registro (arkId, fila Excel, nombre, año, padres)
+
+Uso:
+  python3 link_records.py
+  python3 link_records.py --threshold 12 --max-block 80
+  python3 link_records.py --input out/Zamacona_normalized.csv
+"""
+
+from __future__ import annotations
+import argparse
+import re
+import sys
+import time
+import unicodedata
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import phonetic
+
+ROOT = Path(__file__).resolve().parent
+OUT = ROOT / "out"
+
+# Orden de preferencia del input (el CSV gemelo se lee mucho más rápido que el xlsx)
+CAND = [
+    OUT / "Zamacona_normalized_patched.csv",
+    OUT / "Zamacona_normalized_patched.xlsx",
+    OUT / "Zamacona_normalized.csv",
+    OUT / "Zamacona_normalized.xlsx",
+]
+OUT_PAIRS = OUT / "linkage_pairs.tsv"
+OUT_CLUSTERS = OUT / "linkage_clusters.tsv"
+
+MAX_BLOCK = 50      # filas por bloque (más → se descarta el bloque en esa pasada)
+THRESHOLD = 10.0    # score mínimo para considerar match
+REPORT_MIN = 4.0    # score mínimo para listar el par en linkage_pairs.tsv
+
+# Niveles de comparación
+MISSING, DIFF, PHON, EXACT = -1, 0, 1, 2
+NEAR = 1  # año a ±YEAR_NEAR
+YEAR_NEAR = 2
+
+# Pesos log2(m/u) por campo y nivel (missing = 0: no aporta evidencia)
+WEIGHTS: Dict[str, Dict[int, float]] = {
+    "given":  {EXACT: 4.0, PHON: 2.5, DIFF: -4.0},
+    "surn1":  {EXACT: 4.0, PHON: 3.0, DIFF: -5.0},
+    "surn2":  {EXACT: 3.5, PHON: 2.5, DIFF: -3.0},
+    "father": {EXACT: 3.0, PHON: 2.0, DIFF: -2.0},
+    "mother": {EXACT: 3.0, PHON: 2.0, DIFF: -2.0},
+    "year":   {EXACT: 3.0, NEAR: 1.0, DIFF: -4.0},
+    "place":  {EXACT: 1.5, DIFF: -1.0},
+    "sex":    {EXACT: 0.5, DIFF: -3.0},
+}
+
+# ---------------------------
+# Normalización y claves
+# ---------------------------
+
+def strip_accents(s: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFD", s or "") if unicodedata.category(c) != "Mn")
+
+def norm_name(s: str) -> str:
+    """minúsculas, sin acentos, solo letras y espacios."""
+    s = strip_accents(s).lower()
+    return re.sub(r"\s+", " ", re.sub(r"[^a-z\s]", " ", s)).strip()
+
+def _map_distinct(s: pd.Series, fn) -> pd.Series:
+    u = pd.unique(s.to_numpy())
+    return s.map(dict(zip(u, map(fn, u))))
+
+def _col(df: pd.DataFrame, name: str) -> pd.Series:
+    return df[name].fillna("").astype(str) if name in df.columns else pd.Series("", index=df.index)
+
+def _first_surname(s: pd.Series) -> pd.Series:
+    """Primera parte de una celda 'A; B' (apellidos multi-valor)."""
+    return s.str.split(";").str[0].str.strip()
+
+def person_fields(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Campos de comparación normalizados (una fila por registro):
+    given/surn1/surn2 de las columnas split; si están vacías (filas no verdes), de fullName__work
+    (primera palabra = nombre, últimas dos = apellidos).
+    """
+    work = _map_distinct(_col(df, "fullName__work"), norm_name).str.split()
+    given = _map_distinct(_col(df, "fullName__given"), norm_name)
+    surn1 = _map_distinct(_first_surname(_col(df, "fullName__surn1")), norm_name)
+    surn2 = _map_distinct(_first_surname(_col(df, "fullName__surn2")), norm_name)
+    n_words = work.str.len().fillna(0)
+    no_split = (given == "") & (surn1 == "")
+    given = given.mask(no_split, work.str[0].fillna(""))
+    surn1 = surn1.mask(no_split & (n_words >= 3), work.str[-2].fillna(""))
+    surn1 = surn1.mask(no_split & (n_words == 2), work.str[-1].fillna(""))
+    surn2 = surn2.mask(no_split & (n_words >= 3), work.str[-1].fillna(""))
+
+    date = _col(df, "chrDate").where(_col(df, "chrDate") != "", _col(df, "birthLikeDate"))
+    year = pd.to_numeric(date.str.extract(r"(\d{4})", expand=False), errors="coerce")
+    place = _col(df, "chrPlace").where(_col(df, "chrPlace") != "", _col(df, "birthLikePlaceText"))
+
+    out = pd.DataFrame({
+        "given": given, "surn1": surn1, "surn2": surn2,
+        "father": _map_distinct(_first_surname(_col(df, "fatherFullName__surn1")), norm_name),
+        "mother": _map_distinct(_first_surname(_col(df, "motherFullName__surn1")), norm_name),
+        "year": year.fillna(-1).astype("int64"),
+        "place": _map_distinct(place.str.split(",").str[0].fillna(""), norm_name),
+        "sex": _col(df, "sex").str.strip().str.lower().replace({"unknown": ""}),
+    }, index=df.index)
+    for c in ("given", "surn1", "surn2", "father", "mother"):
+        out[c + "_ph"] = phonetic.key_column(out[c], phonetic.skeleton)
+    out["initial"] = out["given"].str[:1]
+    return out
+
+# ---------------------------
+# Bloqueo
+# ---------------------------
+
+BLOCKINGS = {
+    "A": ["surn1_ph", "initial", "year"],
+    "B": ["surn1_ph", "father_ph", "mother_ph"],
+    "C": ["surn1_ph", "surn2_ph", "initial"],
+}
+
+def block_pairs(f: pd.DataFrame, keys: List[str], max_block: int) -> tuple:
+    """(i, j) posiciones con i < j dentro de cada bloque; bloques con alguna clave vacía no cuentan."""
+    sub = f[keys]
+    ok = np.ones(len(f), dtype=bool)
+    for k in keys:
+        ok &= (sub[k] != "").to_numpy() if sub[k].dtype == object else (sub[k] >= 0).to_numpy()
+    codes = pd.MultiIndex.from_frame(sub[ok]).factorize()[0] if ok.any() else np.zeros(0, dtype=np.int64)
+    pos = np.flatnonzero(ok)
+    sizes = np.bincount(codes) if len(codes) else np.zeros(0, dtype=np.int64)
+    keep = (sizes[codes] > 1) & (sizes[codes] <= max_block) if len(codes) else np.zeros(0, dtype=bool)
+    skipped = int(((sizes > max_block)).sum())
+    kf = pd.DataFrame({"b": codes[keep], "p": pos[keep]})
+    if kf.empty:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), skipped
+    m = kf.merge(kf, on="b", suffixes=("_i", "_j"))
+    m = m[m["p_i"] < m["p_j"]]
+    return m["p_i"].to_numpy(np.int64), m["p_j"].to_numpy(np.int64), skipped
+
+def candidate_pairs(f: pd.DataFrame, max_block: int, verbose: bool = True) -> tuple:
+    """Unión (sin repetir) de los pares de todas las pasadas de bloqueo."""
+    n = len(f)
+    all_i, all_j = [], []
+    for name, keys in BLOCKINGS.items():
+        i, j, skipped = block_pairs(f, keys, max_block)
+        all_i.append(i)
+        all_j.append(j)
+        if verbose:
+            print(f"[INFO] Bloqueo {name} ({' + '.join(keys)}): {len(i)} pares"
+                  + (f", {skipped} bloques > {max_block} descartados" if skipped else ""))
+    i = np.concatenate(all_i)
+    j = np.concatenate(all_j)
+    uniq = np.unique(i * n + j)
+    return uniq // n, uniq % n
+
+# ---------------------------
+# Comparación y puntuación
+# ---------------------------
+
+def _codes(*series: pd.Series) -> List[np.ndarray]:
+    """Factoriza varias columnas con el mismo vocabulario (códigos comparables entre sí)."""
+    codes, _ = pd.factorize(pd.concat(series, ignore_index=True))
+    out, start = [], 0
+    for s in series:
+        out.append(codes[start:start + len(s)])
+        start += len(s)
+    return out
+
+def compare(f: pd.DataFrame, i: np.ndarray, j: np.ndarray) -> pd.DataFrame:
+    """Niveles de comparación por par (vectorizado sobre arrays de posiciones)."""
+    lv: Dict[str, np.ndarray] = {}
+    for c in ("given", "surn1", "surn2", "father", "mother"):
+        exact, = _codes(f[c])
+        phon, = _codes(f[c + "_ph"])
+        missing = (f[c] == "").to_numpy()
+        level = np.where(exact[i] == exact[j], EXACT, np.where(phon[i] == phon[j], PHON, DIFF))
+        lv[c] = np.where(missing[i] | missing[j], MISSING, level)
+    y = f["year"].to_numpy()
+    dy = np.abs(y[i] - y[j])
+    lv["year"] = np.where((y[i] < 0) | (y[j] < 0), MISSING,
+                          np.where(dy == 0, EXACT, np.where(dy <= YEAR_NEAR, NEAR, DIFF)))
+    for c in ("place", "sex"):
+        code, = _codes(f[c])
+        missing = (f[c] == "").to_numpy()
+        lv[c] = np.where(missing[i] | missing[j], MISSING, np.where(code[i] == code[j], EXACT, DIFF))
+    return pd.DataFrame(lv)
+
+def score(levels: pd.DataFrame) -> np.ndarray:
+    total = np.zeros(len(levels))
+    for c, w in WEIGHTS.items():
+        lvl = levels[c].to_numpy()
+        for level, weight in w.items():
+            total += np.where(lvl == level, weight, 0.0)
+    return total
+
+# ---------------------------
+# Clústeres
+# ---------------------------
+
+def connected_components(n: int, i: np.ndarray, j: np.ndarray) -> np.ndarray:
+    """Etiqueta = mínima posición de la componente (propagación de mínimos hasta converger)."""
+    label = np.arange(n)
+    if not len(i):
+        return label
+    while True:
+        m = np.minimum(label[i], label[j])
+        new = label.copy()
+        np.minimum.at(new, i, m)
+        np.minimum.at(new, j, m)
+        new = new[new]  # salto de puntero: acorta cadenas largas
+        if np.array_equal(new, label):
+            return label
+        label = new
+
+# ---------------------------
+# Main
+# ---------------------------
+
+def pick_input(arg: Optional[str]) -> Optional[Path]:
+    if arg:
+        return Path(arg)
+    for p in CAND:
+        if p.exists():
+            return p
+    return None
+
+def read_input(path: Path) -> pd.DataFrame:
+    if path.suffix.lower() == ".xlsx":
+        return pd.read_excel(path, dtype=str)
+    return pd.read_csv(path, dtype=str)
+
+def link(df: pd.DataFrame, threshold: float, max_block: int, verbose: bool = True) -> tuple:
+    """(campos, pares con niveles y score, etiqueta de clúster por fila de df, máscara de match)."""
+    f = person_fields(df)
+    i, j = candidate_pairs(f, max_block, verbose)
+    if "arkId" in df.columns:  # mismo arkId = duplicado estricto, no enlace
+        ark = df["arkId"].fillna("").astype(str).to_numpy()
+        keep = ark[i] != ark[j]
+        i, j = i[keep], j[keep]
+    levels = compare(f, i, j)
+    pairs = pd.concat([pd.DataFrame({"i": i, "j": j}), levels], axis=1)
+    pairs["score"] = score(levels).round(2)
+    match = pairs["score"].to_numpy() >= threshold
+    labels = connected_components(len(df), i[match], j[match])
+    return f, pairs, labels, match
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Enlace probabilístico de registros (misma persona, distinto arkId).")
+    ap.add_argument("--input", default=None, help="CSV/XLSX normalizado (por defecto patched o normalized de out/)")
+    ap.add_argument("--threshold", type=float, default=THRESHOLD, help="Score mínimo de match")
+    ap.add_argument("--max-block", type=int, default=MAX_BLOCK, help="Tamaño máximo de bloque por pasada")
+    ap.add_argument("--report-min", type=float, default=REPORT_MIN, help="Score mínimo para listar pares")
+    args = ap.parse_args()
+
+    src = pick_input(args.input)
+    if not src or not src.exists():
+        print("[ERROR] No hay normalized en out/. Ejecuta primero normalize_names.py", file=sys.stderr)
+        return 1
+    t0 = time.perf_counter()
+    df = read_input(src)
+    df["__row"] = np.arange(len(df)) + 2  # fila de Excel del input
+    if "arkId" in df.columns:
+        df = df.drop_duplicates(subset=["arkId"], keep="first")
+    df = df.reset_index(drop=True)
+    print(f"[INFO] {src.name}: {len(df)} registros (uno por arkId)")
+
+    f, pairs, labels, match = link(df, args.threshold, args.max_block)
+    print(f"[INFO] {len(pairs)} pares comparados, {int(match.sum())} matches (score >= {args.threshold:g})")
+
+    ark = df["arkId"].fillna("").astype(str) if "arkId" in df.columns else pd.Series(df.index.astype(str))
+    name = df["fullName"].fillna("").astype(str) if "fullName" in df.columns else pd.Series("", index=df.index)
+    rep = pairs[pairs["score"] >= args.report_min].sort_values("score", ascending=False, kind="stable")
+    rep = rep.assign(arkId_a=ark.to_numpy()[rep["i"]], arkId_b=ark.to_numpy()[rep["j"]],
+                     name_a=name.to_numpy()[rep["i"]], name_b=name.to_numpy()[rep["j"]],
+                     match=rep["score"] >= args.threshold)
+    OUT.mkdir(parents=True, exist_ok=True)
+    cols = ["arkId_a", "arkId_b", "name_a", "name_b", "score", "match"] + list(WEIGHTS)
+    rep[cols].to_csv(OUT_PAIRS, sep="\t", index=False)
+
+    # clústeres (>1 registro): tamaño y rango de score de sus aristas
+    m = pairs[match]
+    sizes = np.bincount(labels, minlength=len(df))
+    edge_lab = labels[m["i"].to_numpy()]
+    s_min = pd.Series(m["score"].to_numpy()).groupby(edge_lab).min()
+    s_max = pd.Series(m["score"].to_numpy()).groupby(edge_lab).max()
+    in_cl = sizes[labels] > 1
+    cl = pd.DataFrame({
+        "cluster_id": labels[in_cl], "size": sizes[labels][in_cl],
+        "score_min": s_min.reindex(labels[in_cl]).to_numpy(), "score_max": s_max.reindex(labels[in_cl]).to_numpy(),
+        "arkId": ark.to_numpy()[in_cl], "row": df["__row"].to_numpy()[in_cl], "fullName": name.to_numpy()[in_cl],
+        "year": f["year"].to_numpy()[in_cl], "father": f["father"].to_numpy()[in_cl], "mother": f["mother"].to_numpy()[in_cl],
+    })
+    cl["year"] = cl["year"].where(cl["year"] >= 0, None)
+    cl = cl.sort_values(["size", "cluster_id", "row"], ascending=[False, True, True], kind="stable")
+    cl.to_csv(OUT_CLUSTERS, sep="\t", index=False)
+
+    print(f"[OK] {OUT_PAIRS.name} ({len(rep)} pares con score >= {args.report_min:g})")
+    print(f"[OK] {OUT_CLUSTERS.name} ({cl['cluster_id'].nunique()} clústeres, {len(cl)} registros) "
+          f"en {time.perf_counter() - t0:.1f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,6 +4,11 @@
 # Salida :  out/Zamacona_mark_rejects.xlsx
 # Extra 1:  out/reject_log.txt        (apellidos rechazados únicos)
 # Extra 2:  out/reject_hits.tsv       (log detallado con given por cada hit)
+# Detección vectorizada: la hoja se lee una vez (openpyxl, valores) a un DataFrame;
+# __surn1/__surn2 se funden (melt), se parten por ';' (explode), se pliegan acentos
+# (sobre los valores distintos) y se cruzan con isin contra el conjunto de rechazados.
+# Los logs salen en bloque del DataFrame de hits; el libro solo se toca para pintar
+# (una pasada sobre las celdas/filas con hit).
 
 import csv
 import unicodedata
@@ -62,6 +67,49 @@ def load_reject_set(tsv_path: Path) -> set:
                     rejects.add(val)
         return rejects
 
+def fold_keys(parts: pd.Series) -> pd.Series:
+    """strip_accents(p).lower() calculado una vez por valor distinto."""
+    u = pd.unique(parts.to_numpy())
+    return parts.map(dict(zip(u, (strip_accents(p).lower() for p in u))))
+
+def find_hits(df: pd.DataFrame, surname_cols: list, given_cols_map: dict, reject_set: set) -> pd.DataFrame:
+    """
+    Hits (una fila por parte rechazada) con columnas row, column, base, given, surname_hit.
+    row = fila de Excel (posición + 2). Orden: columna a columna, fila a fila, parte a parte.
+    """
+    cols = ["row", "column", "base", "given", "surname_hit"]
+    long = df[surname_cols].melt(var_name="column", value_name="value", ignore_index=False)
+    long = long[long["value"].notna() & (long["value"].astype(str) != "")]
+    if long.empty or not reject_set:
+        return pd.DataFrame(columns=cols)
+    parts = long.assign(surname_hit=long["value"].astype(str).str.split(";")).explode("surname_hit")
+    parts["surname_hit"] = parts["surname_hit"].str.strip()
+    parts = parts[parts["surname_hit"] != ""]
+    hits = parts[fold_keys(parts["surname_hit"]).isin(reject_set)].drop(columns="value")
+
+    hits["given"] = ""
+    for col_name, gname in given_cols_map.items():
+        sel = (hits["column"] == col_name).to_numpy()
+        if gname and sel.any():
+            g = df.loc[hits.index[sel], gname]
+            hits.loc[sel, "given"] = g.where(g.notna(), "").astype(str).str.strip().to_numpy()
+    hits["base"] = hits["column"].str.replace("__surn1", "", regex=False).str.replace("__surn2", "", regex=False)
+    hits["row"] = hits.index + 2
+    return hits.reset_index(drop=True)[cols]
+
+def paint(ws, hits: pd.DataFrame, headers: dict) -> int:
+    """Una pasada de estilo: celdas con hit (o filas enteras con COLOR_WHOLE_ROW)."""
+    if COLOR_WHOLE_ROW:
+        rows = sorted(set(hits["row"].tolist()))
+        ncols = ws.max_column  # max_column recorre todas las celdas: una vez
+        for r in rows:
+            for c in range(1, ncols + 1):
+                ws.cell(row=r, column=c).fill = FILL_RED
+        return len(rows)
+    for r, col_name in set(zip(hits["row"].tolist(), hits["column"].tolist())):
+        ws.cell(row=r, column=headers[col_name]).fill = FILL_RED
+    return len(hits)  # como antes: una marca por hit
+
 def main():
     if not IN_XLSX.exists():
         raise SystemExit(f"No encuentro {IN_XLSX}. Ejecuta antes la normalización.")
@@ -76,11 +124,9 @@ def main():
     # Mapa cabeceras -> índice de columna (1-based)
     headers = {cell.value: idx for idx, cell in enumerate(ws[1], start=1) if cell.value}
 
-    # Columnas de apellidos y sus índices
+    # Columnas de apellidos
     surname_cols = [name for name in headers if name.endswith("__surn1") or name.endswith("__surn2")]
-    surname_cols_idx = [headers[name] for name in surname_cols]
-
-    if not surname_cols_idx:
+    if not surname_cols:
         raise SystemExit("No encuentro columnas de apellidos (__surn1/__surn2) en la hoja.")
 
     # Para buscar el given, necesitamos la columna base__given
@@ -89,72 +135,36 @@ def main():
     for col_name in surname_cols:
         base = col_name.replace("__surn1", "").replace("__surn2", "")
         gname = f"{base}__given"
-        given_cols_map[col_name] = headers.get(gname, None)
-
-    marked = 0
-    unique_hits = set()
-    detailed_rows = []  # Para el TSV detallado
-
-    for r in range(2, ws.max_row + 1):
-        row_hits = []
-        for col_name, cidx in zip(surname_cols, surname_cols_idx):
-            val = ws.cell(row=r, column=cidx).value
-            if not val:
-                continue
-            parts = [p.strip() for p in str(val).split(";") if p.strip()]
-            for p in parts:
-                key = strip_accents(p).lower()
-                if key in reject_set:
-                    row_hits.append((col_name, p))
-
-        if row_hits:
-            # Obtener el 'given' que corresponde a cada columna base
-            for col_name, hit in row_hits:
-                base = col_name.replace("__surn1", "").replace("__surn2", "")
-                gidx = given_cols_map.get(col_name, None)
-                given_val = ws.cell(row=r, column=gidx).value if gidx else ""
-
-                # Agregar a detallado (fila, columna, base, given, hit)
-                detailed_rows.append({
-                    "row": r,
-                    "column": col_name,
-                    "base": base,
-                    "given": (given_val or "").strip(),
-                    "surname_hit": hit
-                })
-
-                unique_hits.add(hit)
-
-                if not COLOR_WHOLE_ROW:
-                    # Pintar solo la celda de apellido que pegó
-                    ws.cell(row=r, column=headers[col_name]).fill = FILL_RED
-                    marked += 1
-
-            if COLOR_WHOLE_ROW:
-                for c in range(1, ws.max_column + 1):
-                    ws.cell(row=r, column=c).fill = FILL_RED
-                marked += 1
+        given_cols_map[col_name] = gname if gname in headers else None
+
+    # valores de la hoja (misma lectura que el libro que se pinta); posición 0 = fila Excel 2
+    wanted = list(dict.fromkeys(surname_cols + [g for g in given_cols_map.values() if g]))
+    pos = [headers[c] - 1 for c in wanted]
+    values = [[row[i] if i < len(row) else None for i in pos]
+              for row in ws.iter_rows(min_row=2, values_only=True)]
+    df = pd.DataFrame(values, columns=wanted)
+
+    hits = find_hits(df, surname_cols, given_cols_map, reject_set)
+    marked = paint(ws, hits, headers)
 
     # Guardar Excel marcado
     wb.save(OUT_XLSX)
 
     # Guardar log único (solo apellidos)
+    unique_hits = sorted(set(hits["surname_hit"].tolist()), key=lambda x: x.lower())
     with open(OUT_LOG_UNIQ, "w", encoding="utf-8") as f:
-        for val in sorted(unique_hits, key=lambda x: x.lower()):
-            f.write(val + "\n")
+        f.writelines(val + "\n" for val in unique_hits)
 
     # Guardar log detallado con given por hit
     # Formato TSV: row, column, base, given, surname_hit
-    with open(OUT_LOG_HITS, "w", encoding="utf-8", newline="") as f:
-        writer = csv.writer(f, delimiter="\t")
-        writer.writerow(["row", "column", "base", "given", "surname_hit"])
-        for d in sorted(detailed_rows, key=lambda x: (x["row"], x["column"], x["surname_hit"].lower())):
-            writer.writerow([d["row"], d["column"], d["base"], d["given"], d["surname_hit"]])
+    hits = hits.assign(_low=hits["surname_hit"].str.lower())
+    hits = hits.sort_values(["row", "column", "_low"], kind="stable").drop(columns="_low")
+    hits.to_csv(OUT_LOG_HITS, sep="\t", index=False, lineterminator="\r\n")
 
     print(f"[OK] Guardado {OUT_XLSX} (apellidos rechazados marcados en rojo).")
     print(f"[OK] Guardado {OUT_LOG_UNIQ} ({len(unique_hits)} apellidos únicos rechazados).")
-    print(f"[OK] Guardado {OUT_LOG_HITS} ({len(detailed_rows)} hits con given).")
+    print(f"[OK] Guardado {OUT_LOG_HITS} ({len(hits)} hits con given).")
     print(f"[INFO] {'Filas' if COLOR_WHOLE_ROW else 'Celdas'} marcadas: {marked}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+multi_match.py
+
+Búsqueda de muchas subcadenas a la vez (listas de rechazo de drop_rejects.py).
+
+Una alternación 'a|b|c|…' sin anclar se degrada al crecer la lista (el motor de
+regex prueba cada alternativa en cada posición). Aquí:
+  - listas cortas (< AHO_MIN): una regex con str.contains vectorizado,
+  - listas largas: autómata Aho-Corasick (trie + enlaces de fallo), una sola pasada
+    por texto independientemente del número de patrones.
+En ambos casos se evalúa solo sobre los valores DISTINTOS y se vuelve a las filas
+con isin (los nombres se repiten mucho).
+
+API:
+  m = SubstringMatcher(["zamacola", "de zamolla", ...])   # sin distinguir mayúsculas
+  m.search("Juan Zamacolas")     → True
+  m.contains(series)             → máscara booleana (pd.Series, mismo índice)
+"""
+
+from __future__ import annotations
+import re
+from collections import deque
+from typing import Dict, Iterable, List
+
+import pandas as pd
+
+AHO_MIN = 200  # a partir de este nº de patrones, Aho-Corasick en vez de una alternación
+
+class AhoCorasick:
+    """Autómata para '¿contiene alguno de los patrones?' (no enumera las coincidencias)."""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.final: List[bool] = [False]
+        for p in patterns:
+            if not p:
+                continue
+            node = 0
+            for ch in p:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][ch] = nxt
+                    self.goto.append({})
+                    self.final.append(False)
+                node = nxt
+            self.final[node] = True
+        # enlaces de fallo en anchura; un nodo es final si lo es su sufijo más largo
+        self.fail = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self.goto[node].items():
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.final[nxt] = self.final[nxt] or self.final[self.fail[nxt]]
+                queue.append(nxt)
+
+    def search(self, text: str) -> bool:
+        goto, fail, final = self.goto, self.fail, self.final
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if final[node]:
+                return True
+        return False
+
+class SubstringMatcher:
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns = sorted({p.lower() for p in patterns if p})
+        self.aho = AhoCorasick(self.patterns) if len(self.patterns) >= AHO_MIN else None
+        self.regex = (re.compile("|".join(map(re.escape, self.patterns)))
+                      if self.patterns and self.aho is None else None)
+
+    def __bool__(self):
+        return bool(self.patterns)
+
+    def search(self, text: str) -> bool:
+        text = (text or "").lower()
+        if self.aho is not None:
+            return self.aho.search(text)
+        return bool(self.regex and self.regex.search(text))
+
+    def contains(self, s: pd.Series) -> pd.Series:
+        """Máscara por fila: el valor contiene algún patrón (evaluado una vez por valor distinto)."""
+        if not self.patterns:
+            return pd.Series(False, index=s.index)
+        low = s.fillna("").astype(str).str.lower()
+        u = pd.Series(pd.unique(low.to_numpy()), dtype=object)
+        if self.aho is not None:
+            hit = u.map(self.aho.search).astype(bool)
+        else:
+            hit = u.str.contains(self.regex)
+        return low.isin(set(u[hit.to_numpy()]))
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+name_stats.py
+
+Frecuencias de nombres/apellidos compartidas por normalize_names.py,
+only_green_surnames.py y audit_surnames.py (antes cada uno tenía su Counter).
+
+- Vectorizado: las columnas se apilan en una sola Series (columna a columna, fila a
+  fila: el mismo orden de recorrido que los scripts originales), se parte por ';'
+  con str.split + explode y se cuenta con value_counts. Las normalizaciones en Python
+  (capitalize por palabra, norm_token) se aplican solo a los valores distintos.
+- Cualquier conjunto de columnas y máscara de filas:
+    kinds:  given        → __given (o 'given'), espacios colapsados, Capitalize por palabra
+            surname      → __surn1/__surn2 (o surname/surname2), partes por ';'
+            surname_norm → __surn1/__surn2, partes por ';' con norm_token (token_index 'surnames')
+    masks:  all          → todas las filas
+            flags        → blacklistFlag == reviewFlag == "0"
+            status       → status empieza por "green" (si no hay status, flags)
+- Caché por artefacto: out/index/<artefacto>.names.json, sellado con el sha1 del
+  fichero (token_index.file_sha1); cada (kind, máscara) se guarda en orden de primera
+  aparición y se reutiliza mientras el artefacto no cambie.
+
+API:
+  - frequencies(df, kind, mask="all", cols=None) → Series token → ocurrencias (orden de aparición)
+  - artifact_frequencies(path, kinds, mask="all", df=None) → {kind: Series} (con caché)
+  - write_unique(path, counts)  → fichero "token\\tcuenta" ordenado (-cuenta, minúsculas, token)
+"""
+
+from __future__ import annotations
+import json
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Union
+
+import pandas as pd
+
+import token_index
+
+STATS_VERSION = 1  # súbelo si cambia algún normalizador
+
+# ---------------------------
+# Columnas y máscaras
+# ---------------------------
+
+def given_cols(df: pd.DataFrame) -> List[str]:
+    cols = [c for c in df.columns if c.endswith("__given")]
+    return cols or [c for c in ("given",) if c in df.columns]
+
+def surname_cols(df: pd.DataFrame) -> List[str]:
+    cols = [c for c in df.columns if c.endswith("__surn1") or c.endswith("__surn2")]
+    return cols or [c for c in ("surname", "surname2") if c in df.columns]
+
+def split_surname_cols(df: pd.DataFrame) -> List[str]:
+    return [c for c in df.columns if c.endswith("__surn1") or c.endswith("__surn2")]
+
+def row_mask(df: pd.DataFrame, mask: str) -> Optional[pd.Series]:
+    """None = todas las filas."""
+    if mask == "all":
+        return None
+    if mask == "status" and "status" in df.columns:
+        return df["status"].fillna("").astype(str).str.lower().str.startswith("green")
+    if mask in ("flags", "status"):
+        if not {"blacklistFlag", "reviewFlag"}.issubset(df.columns):
+            return pd.Series(False, index=df.index)
+        return (df["blacklistFlag"].fillna("0").astype(str) == "0") & (df["reviewFlag"].fillna("0").astype(str) == "0")
+    raise ValueError(f"Máscara desconocida: {mask!r}")
+
+# ---------------------------
+# Normalizadores
+# ---------------------------
+
+def _collapse(s: pd.Series) -> pd.Series:
+    return s.str.replace(r"\s+", " ", regex=True).str.strip()
+
+def _capitalize_words(v: str) -> str:
+    return " ".join(w.capitalize() for w in v.split())
+
+def _map_distinct(s: pd.Series, fn: Callable[[str], str]) -> pd.Series:
+    """fn solo sobre los valores distintos (suelen ser pocos frente a las filas)."""
+    u = pd.unique(s.to_numpy())
+    return s.map(dict(zip(u, map(fn, u))))
+
+def _given_values(s: pd.Series) -> pd.Series:
+    s = _collapse(s.str.replace("_", " ", regex=False))  # como normalize_names.clean_spaces
+    s = s[s != ""]
+    return _map_distinct(s, _capitalize_words)
+
+def _surname_values(s: pd.Series) -> pd.Series:
+    return _collapse(s.str.split(";").explode())
+
+def _surname_norm_values(s: pd.Series) -> pd.Series:
+    return _map_distinct(s.str.split(";").explode(), token_index.norm_token)
+
+# kind → (columnas por defecto, valores a contar a partir de las celdas apiladas)
+KINDS: Dict[str, tuple] = {
+    "given":        (given_cols, _given_values),
+    "surname":      (surname_cols, _surname_values),
+    "surname_norm": (split_surname_cols, _surname_norm_values),
+}
+
+# ---------------------------
+# Cálculo
+# ---------------------------
+
+def frequencies(df: pd.DataFrame, kind: str, mask: str = "all", cols: Optional[List[str]] = None) -> pd.Series:
+    """Ocurrencias por token en orden de primera aparición (columna a columna, fila a fila)."""
+    cols_fn, values_fn = KINDS[kind]
+    cols = cols_fn(df) if cols is None else cols
+    sub = df[cols]
+    m = row_mask(df, mask)
+    if m is not None:
+        sub = sub[m]
+    if not cols or sub.empty:
+        return pd.Series([], dtype="int64")
+    cells = pd.concat([sub[c] for c in cols], ignore_index=True).fillna("").astype(str)
+    vals = values_fn(cells[cells != ""])
+    vals = vals[vals.notna() & (vals != "")]
+    return vals.value_counts(sort=False).astype("int64").rename(None).rename_axis(None)
+
+def cache_path(artifact: Path) -> Path:
+    return token_index.INDEX_DIR / f"{Path(artifact).name}.names.json"
+
+def _load_cache(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+
+def artifact_frequencies(artifact: Path, kinds: Iterable[str], mask: str = "all",
+                         df: Optional[pd.DataFrame] = None) -> Dict[str, pd.Series]:
+    """
+    Frecuencias de un artefacto, reutilizando out/index/<artefacto>.names.json si el sha1
+    y la versión coinciden. df (opcional) = el DataFrame ya leído de ese artefacto.
+    """
+    artifact = Path(artifact)
+    sha = token_index.file_sha1(artifact)
+    path = cache_path(artifact)
+    cache = _load_cache(path)
+    if cache.get("sha1") != sha or cache.get("version") != STATS_VERSION:
+        cache = {"sha1": sha, "version": STATS_VERSION, "artifact": artifact.name, "stats": {}}
+    out: Dict[str, pd.Series] = {}
+    dirty = False
+    for kind in kinds:
+        key = f"{kind}|{mask}"
+        hit = cache["stats"].get(key)
+        if hit is None:
+            if df is None:
+                df = token_index.read_artifact(artifact)
+            s = frequencies(df, kind, mask)
+            cache["stats"][key] = [[t, int(c)] for t, c in s.items()]
+            dirty = True
+            out[kind] = s
+        else:
+            out[kind] = pd.Series([c for _, c in hit], index=[t for t, _ in hit], dtype="int64")
+    if dirty:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(cache, ensure_ascii=False), encoding="utf-8")
+    return out
+
+# ---------------------------
+# Salida
+# ---------------------------
+
+def write_unique(path: Path, counts: Union[pd.Series, Mapping[str, int]]) -> int:
+    """Escribe 'token\\tcuenta' ordenado por (-cuenta, minúsculas, token); devuelve nº de tokens."""
+    items = counts.items()
+    with open(path, "w", encoding="utf-8") as f:
+        for tok, cnt in sorted(items, key=lambda x: (-x[1], x[0].lower(), x[0])):
+            f.write(f"{tok}\t{cnt}\n")
+    return len(counts)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+name_trie.py
+
+Árbol (trie) sobre SECUENCIAS de tokens para reconocer nombres compuestos
+("maria antonia", "juana baptista geronima", "mariano francisco jaime sebastian"...).
+
+- Se construye una vez (lo precalcula el rulepack a partir de COMPOUND_2/COMPOUND_3).
+- longest_at(low, i): longitud del compuesto más largo que empieza en i (0 si no hay).
+- spans(low): recorre la lista UNA vez y devuelve los compuestos (inicio, longitud)
+  más a la izquierda y más largos, sin solaparse, en cualquier posición.
+- Longitud arbitraria; el recorrido no crea tuplas ni listas por token
+  (solo consultas a dict). 'low' son tokens ya en minúsculas y sin acentos.
+
+Lo usan normalize_names.merge_compound_given / split_person y cualquier parser nuevo.
+"""
+
+from __future__ import annotations
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+END = None  # clave que marca fin de compuesto en un nodo (valor = longitud)
+
+def build_trie(seqs: Iterable[Tuple[str, ...]]) -> dict:
+    """{tok: {tok: {..., END: n}}} a partir de secuencias de tokens."""
+    root: Dict = {}
+    for seq in seqs:
+        if len(seq) < 2:
+            continue  # un solo token no es compuesto
+        node = root
+        for t in seq:
+            node = node.setdefault(t, {})
+        node[END] = len(seq)
+    return root
+
+class TokenTrie:
+    __slots__ = ("root",)
+
+    def __init__(self, root: dict):
+        self.root = root
+
+    @classmethod
+    def from_sequences(cls, seqs: Iterable[Tuple[str, ...]]) -> "TokenTrie":
+        return cls(build_trie(seqs))
+
+    def longest_at(self, low: List[str], i: int) -> int:
+        node = self.root
+        best = 0
+        j, n = i, len(low)
+        while j < n:
+            node = node.get(low[j])
+            if node is None:
+                break
+            j += 1
+            if END in node:
+                best = j - i
+        return best
+
+    def spans(self, low: List[str]) -> Iterator[Tuple[int, int]]:
+        i, n = 0, len(low)
+        while i < n - 1:
+            k = self.longest_at(low, i)
+            if k:
+                yield i, k
+                i += k
+            else:
+                i += 1
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+norm_cache.py
+
+Caché persistente por fila para normalize_names.py.
+
+Clave de fila = arkId + hash del contenido de las columnas __work de entrada
+(las seis: fullName, father, mother, spouse, children, other). Además, todo el
+caché va sellado con la versión de reglas (hash de la lógica de normalización):
+si cambia o cambia el conjunto de columnas __work, el caché se descarta.
+
+Las tablas "rastreadas" (GIVEN_MAP, SURNAME_SYNONYMS, WHITELIST_TOKENS,
+BLACKLIST_TOKENS, PROTECTED_NEAR, whitelist de apellidos) se guardan clave a clave.
+Si solo cambian ellas, se difunden las claves cambiadas y, con el índice invertido
+token → filas, solo se marcan como obsoletas las filas que contienen esas claves.
+
+Por clave se guarda el resultado derivado (valores __work normalizados, flags,
+__given/__surn1/__surn2 antes del vaciado de no-verdes) y 'n' = cuántas filas
+de la última ejecución tenían esa clave. Con 'n' se actualizan de forma
+incremental los contadores de únicos (given/surnames, solo verdes): solo se
+suman/restan las claves que entran o salen.
+
+Ficheros:
+  - out/normalize_cache.csv         (key, n, columnas derivadas, __tokens)
+  - out/normalize_cache.json        (versión de reglas, tablas rastreadas, columnas, únicos)
+  - out/normalize_cache_tokens.csv  (índice invertido: token → claves de fila)
+"""
+
+from __future__ import annotations
+import json
+import unicodedata
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+# contrib(fila_derivada: dict) -> (given_strings, surname_tokens) que aporta a los únicos
+ContribFn = Callable[[dict], Tuple[List[str], List[str]]]
+
+TOKENS_COL = "__tokens"  # tokens (minúsculas, sin acentos) que vieron las tablas de reglas en la fila
+
+def fold(s: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFD", s or "") if unicodedata.category(c) != "Mn").lower()
+
+def changed_tokens(old: Dict[str, dict], new: Dict[str, dict]) -> set:
+    """Claves añadidas, quitadas o con valor distinto entre dos instantáneas de tablas.
+    Se devuelven tal cual, en minúsculas y sin acentos (así se consultan las tablas)."""
+    out = set()
+    for name in set(old) | set(new):
+        a, b = old.get(name, {}), new.get(name, {})
+        for k in set(a) | set(b):
+            if a.get(k) != b.get(k):
+                out.update({k, k.lower(), fold(k)}, fold(k).split())
+    return out
+
+def row_keys(df: pd.DataFrame, work_cols: List[str]) -> pd.Series:
+    """arkId|hash64(__work) por fila (vectorizado con hash_pandas_object)."""
+    h = pd.util.hash_pandas_object(df[work_cols].fillna("").astype(str), index=False)
+    ark = df["arkId"].fillna("").astype(str) if "arkId" in df.columns else pd.Series("", index=df.index)
+    return ark + "|" + h.map("{:016x}".format)
+
+class RowCache:
+    def __init__(self, path: Path, rules_version: str, work_cols: List[str], value_cols: List[str],
+                 rules_tables: Optional[Dict[str, dict]] = None):
+        self.path = Path(path)
+        self.meta_path = self.path.with_suffix(".json")
+        self.index_path = self.path.with_name(self.path.stem + "_tokens.csv")
+        self.rules_version = rules_version
+        self.rules_tables = rules_tables or {}
+        self.work_cols = list(work_cols)
+        self.value_cols = list(value_cols)
+        self.table = pd.DataFrame(columns=["n"] + self.value_cols)
+        self.given: Counter = Counter()
+        self.surn: Counter = Counter()
+        self.stale_reason = "sin caché previo"
+        self.changed_tokens: set = set()   # claves de reglas editadas desde la última ejecución
+        self.stale: set = set()            # claves de fila afectadas por esas ediciones
+        # última pasada (la rellena normalize_names.normalize_frame vía remember)
+        self.last_keys: Optional[pd.Series] = None
+        self.last_hit: Optional[pd.Series] = None
+        self.last_derived: Optional[pd.DataFrame] = None
+
+    # ---------- persistencia ----------
+    def load(self) -> bool:
+        if not (self.path.exists() and self.meta_path.exists()):
+            return False
+        try:
+            meta = json.loads(self.meta_path.read_text(encoding="utf-8"))
+        except Exception as e:
+            self.stale_reason = f"meta ilegible ({e})"
+            return False
+        if meta.get("rules_version") != self.rules_version:
+            self.stale_reason = "cambió la versión de reglas"
+            return False
+        if meta.get("work_cols") != self.work_cols or meta.get("value_cols") != self.value_cols:
+            self.stale_reason = "cambiaron las columnas __work"
+            return False
+        table = pd.read_csv(self.path, dtype=str, keep_default_na=False).set_index("key")
+        table["n"] = table["n"].astype(int)
+        for c in ("blacklistFlag", "reviewFlag"):
+            if c in table.columns:
+                table[c] = table[c].astype(int)
+        self.table = table
+        self.given = Counter(meta.get("unique_given", {}))
+        self.surn = Counter(meta.get("unique_surnames", {}))
+        self.stale_reason = ""
+        old_tables = meta.get("rules_tables", {})
+        if old_tables != self.rules_tables:
+            self.changed_tokens = changed_tokens(old_tables, self.rules_tables)
+            self.stale = self.keys_for_tokens(self.changed_tokens)
+        return True
+
+    def load_index(self) -> Dict[str, List[str]]:
+        """Índice invertido persistido: token → claves de fila."""
+        if self.index_path.exists():
+            idx = pd.read_csv(self.index_path, dtype=str, keep_default_na=False)
+            return dict(zip(idx["token"], idx["keys"].str.split(" ")))
+        # sin fichero de índice: se invierte al vuelo la columna de tokens del caché
+        return build_index(self.table).to_dict() if len(self.table) else {}
+
+    def keys_for_tokens(self, tokens) -> set:
+        idx = self.load_index()
+        out = set()
+        for t in tokens:
+            out.update(idx.get(t, ()))
+        return out
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.table.rename_axis("key").reset_index().to_csv(self.path, index=False, encoding="utf-8")
+        meta = {
+            "rules_version": self.rules_version,
+            "work_cols": self.work_cols,
+            "value_cols": self.value_cols,
+            "rules_tables": self.rules_tables,
+            "rows": int(self.table["n"].sum()) if len(self.table) else 0,
+            "unique_given": dict(self.given),
+            "unique_surnames": dict(self.surn),
+        }
+        self.meta_path.write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+        idx = build_index(self.table)
+        pd.DataFrame({"token": idx.index, "keys": idx.map(" ".join).values}).to_csv(
+            self.index_path, index=False, encoding="utf-8")
+
+    # ---------- uso ----------
+    def hits(self, keys: pd.Series) -> pd.Series:
+        return keys.isin(self.table.index) & ~keys.isin(self.stale)
+
+    def assemble(self, keys: pd.Series, hit: pd.Series, derived_miss: pd.DataFrame) -> pd.DataFrame:
+        """Frame derivado completo (índice = el del df) con filas cacheadas + recién calculadas."""
+        cached = self.table.loc[keys[hit].values, self.value_cols]
+        cached.index = keys.index[hit.values]
+        return pd.concat([cached, derived_miss[self.value_cols]]).reindex(keys.index)
+
+    def update(self, keys: pd.Series, derived: pd.DataFrame, contrib: ContribFn) -> Tuple[Counter, Counter]:
+        """Sustituye el caché por las claves de esta ejecución y ajusta los únicos por diferencia."""
+        new_n = keys.value_counts()
+        old_n = self.table["n"] if len(self.table) else pd.Series(dtype=int)
+        delta = new_n.sub(old_n, fill_value=0).astype(int)
+        delta = delta[delta != 0]
+
+        first = ~keys.duplicated(keep="first")
+        new_table = derived.loc[first.values, self.value_cols].copy()
+        new_table.index = keys[first].values
+        new_table.insert(0, "n", new_n.reindex(new_table.index).astype(int))
+
+        # únicos por diferencia: se resta lo que aportaba la clave antes y se suma lo de ahora
+        for key in set(delta.index) | (self.stale & set(new_n.index)):
+            if key in self.table.index:
+                self._add_contrib(contrib, self.table.loc[key], -int(self.table.at[key, "n"]))
+            if key in new_table.index:
+                self._add_contrib(contrib, new_table.loc[key], int(new_table.at[key, "n"]))
+        self.given = Counter({k: v for k, v in self.given.items() if v > 0})
+        self.surn = Counter({k: v for k, v in self.surn.items() if v > 0})
+        self.table = new_table
+        self.stale = set()
+        return self.given, self.surn
+
+    def _add_contrib(self, contrib: ContribFn, row: pd.Series, times: int):
+        given, surn = contrib(row.to_dict())
+        for g in given:
+            self.given[g] += times
+        for t in surn:
+            self.surn[t] += times
+
+    def remember(self, keys: pd.Series, hit: pd.Series, derived: pd.DataFrame):
+        self.last_keys, self.last_hit, self.last_derived = keys, hit, derived
+
+    def stats(self) -> Dict[str, int]:
+        hit = self.last_hit if self.last_hit is not None else pd.Series(dtype=bool)
+        return {"rows": int(len(hit)), "hits": int(hit.sum()), "recomputed": int((~hit).sum())}
+
+def build_index(table: pd.DataFrame) -> pd.Series:
+    """Invierte la columna de tokens del caché: token → lista ordenada de claves de fila."""
+    if TOKENS_COL not in table.columns or not len(table):
+        return pd.Series(dtype=object)
+    tok = table[TOKENS_COL].fillna("").str.split(" ").explode()
+    tok = tok[tok.astype(bool)]
+    return tok.index.to_series(index=tok.values).groupby(level=0).agg(sorted)
@@ -3,15 +3,33 @@
 # Mantiene 100% tu lógica original y añade:
 #  - Entrada flexible (prepared.xlsx o all.xlsx)
 #  - Columna 'status' derivada de blacklistFlag/reviewFlag (solo informativa)
-
+#  - Caché por fila (norm_cache.py): solo recalcula filas nuevas/cambiadas; --no-cache para todo
+#  - --stats: contadores del camino caliente (hot_stats.py) → out/Zamacona_normalized_stats.json
+#    (tiempo por fase, tokens, reglas que disparan, llamadas a edit_distance, aciertos de caché)
+#    Con caché solo se cuentan las filas recalculadas: --stats --no-cache para el cuadro completo.
+#  - --jobs N: normalización + flags + split por trozos de filas en un pool de procesos
+#    (N=0 → todos los núcleos); reglas cargadas una vez por proceso, trozos en su orden
+#    original y contadores de únicos sumados entre procesos. Salida idéntica a la serie.
+#    Las columnas viajan por memoria compartida (shm_columns.py), no por pickle.
+#  - Variantes de Zamacona (Zamakona, Samacona…) por clave fonética (phonetic.py): búsqueda
+#    O(1) antes de caer a edit_distance, con la misma salida. El resto del índice fonético
+#    (Balle/Valle, Ibanes/Ibanez…) NO reescribe datos: son sugerencias NEAR de audit_surnames
+
+import os
 import re
+import sys
 import unicodedata
+from contextlib import nullcontext
 from pathlib import Path
 import pandas as pd
 from collections import Counter
-from openpyxl import load_workbook
-from openpyxl.styles import PatternFill
-from openpyxl.utils import get_column_letter
+import hot_stats
+import name_stats
+import norm_cache
+import phonetic
+import rulepack
+import shm_columns
+from name_trie import TokenTrie
 
 # ---- Entrada flexible: usa prepared si existe; si no, cae a all.xlsx ----
 IN_FILE_PREPARED = Path("out/Zamacona_prepared.xlsx")
@@ -29,6 +47,14 @@ OUT_CSV  = OUT_DIR / "Zamacona_normalized.csv"
 OUT_REVIEW_LOG = OUT_DIR / "Zamacona_review_log.txt"
 OUT_UNIQUE_GIVEN = OUT_DIR / "Zamacona_unique_given.txt"
 OUT_UNIQUE_SURN  = OUT_DIR / "Zamacona_unique_surnames.txt"
+OUT_CACHE        = OUT_DIR / "normalize_cache.csv"   # caché por fila (ver norm_cache.py); --no-cache lo ignora
+OUT_STATS        = OUT_DIR / "Zamacona_normalized_stats.json"  # solo con --stats
+
+STATS = None  # hot_stats.HotStats() con --stats; None = sin instrumentación
+CHUNK_ROWS = 2000  # filas por tarea del pool con --jobs
+
+def phase(name: str):
+    return STATS.phase(name) if STATS is not None else nullcontext()
 
 TARGET_PREFIXES = ["fullName","fatherFullName","motherFullName","spouseFullName","childrenFullNames","otherFullNames"]
 
@@ -194,12 +220,20 @@ BLACKLIST_REGEX = [
     r"\bzam(?!acona\b)\w+\b",
 ]
 
-# colores
-FILL_GREEN  = PatternFill(fill_type="solid", start_color="C6EFCE", end_color="C6EFCE")
-FILL_YELLOW = PatternFill(fill_type="solid", start_color="FFF2CC", end_color="FFF2CC")
-FILL_GRAY   = PatternFill(fill_type="solid", start_color="E7E6E6", end_color="E7E6E6")
+# colores (los PatternFill se crean al exportar: openpyxl solo se importa en paint_rows/write_outputs)
+COLOR_GREEN  = "C6EFCE"
+COLOR_YELLOW = "FFF2CC"
+COLOR_GRAY   = "E7E6E6"
 
 SURNAME_CANON = set()
+# "~" + clave fonética → Zamacona: solo las claves del índice del rulepack que apuntan a
+# Zamacona (lo que ya resolvía edit_distance); lo rellena load_surname_whitelist()
+PHONETIC_INDEX = {}
+PHONETIC_MIN_LEN = 4  # tokens más cortos no se resuelven por fonética (demasiadas colisiones)
+
+# lookups derivados; load_surname_whitelist() los toma ya precalculados del rulepack
+SECOND_OR_GIVEN = SECOND_NAME_LIKE | GIVEN_COMMON
+BLACKLIST_RX = re.compile("|".join(f"(?:{p})" for p in BLACKLIST_REGEX))
 
 def strip_accents(s: str) -> str:
     return "".join(c for c in unicodedata.normalize("NFD", s or "") if unicodedata.category(c) != "Mn")
@@ -214,6 +248,15 @@ def archaic_y_to_i(token: str) -> str:
         return ""
     return token
 
+def phonetic_canon(low: str, sink: set = None) -> str:
+    """Zamacona si la clave fonética del token (fuera de whitelist) está en el índice ("" si no).
+    El token "~clave" va al sink: así el caché sabe qué filas tocar si cambia esa entrada."""
+    if len(low) < PHONETIC_MIN_LEN or low in SURNAME_CANON or low in SECOND_OR_GIVEN:
+        return ""
+    k = "~" + phonetic.key(low)
+    if sink is not None: sink.add(k)
+    return PHONETIC_INDEX.get(k, "")
+
 def edit_distance(a: str, b: str) -> int:
     a = a.lower(); b = b.lower()
     dp = list(range(len(b)+1))
@@ -246,6 +289,7 @@ def canonicalize_surname(tok: str) -> str:
     if not tok: return ""
     low = strip_accents(tok).lower()
     if low in SURNAME_SYNONYMS:
+        if STATS is not None: STATS.hit("SURNAME_SYNONYMS", low)
         return SURNAME_SYNONYMS[low]
     return re.sub(r"\s+", " ", tok.strip()).title()
 
@@ -256,114 +300,118 @@ def dedupe_consecutive(tokens):
             out.append(t)
     return out
 
+# ---------- nombres compuestos (se fusionan al inicio en merge_compound_given) ----------
+MALE_FIRST = {"francisco","jose","juan","pedro","manuel"}
+
+COMPOUND_3 = {
+    ("francisco","xavier","jesus"),
+    ("maria","juana","agustina"),
+    ("maria","concepcion","nicasia"),
+    ("juana","baptista","geronima"),
+    ("mariano","francisco","jaime","sebastian"),
+}
+COMPOUND_2 = {
+    ("san","juan"),
+    ("maria","antonia"), ("maria","antolin"), ("maria","ascension"), ("maria","asuncion"),
+    ("maria","benita"), ("maria","bentura"), ("maria","ventura"), ("maria","dolores"),
+    ("maria","elena"), ("maria","fausta"), ("maria","francisca"), ("maria","gregoria"),
+    ("maria","isabel"), ("maria","jesus"), ("maria","josefa"), ("maria","manuela"),
+    ("maria","melitona"),
+    ("juana","melitona"),
+    ("maria","victoria"),
+    ("jose","antonio"), ("jose","ramon"), ("jose","januario"),
+    ("josefa","antonia"),
+    ("ana","isabel"),
+    ("pedro","antonio"), ("manuel","antonio"),
+    ("juan","manuel"), ("francisco","xavier"), ("francisco","ramon"), ("francisco","antonio"),
+    ("francisco","juan"),
+    ("martin","geronimo"),
+    ("francisca","paula"),
+    ("felipa","toribia"),
+    ("juan","antonio"), ("brigida","dionisia"),
+    ("domingo","mariano"), ("miguel","antonio"),
+    ("juan","ignacio"), ("juan","jose"),
+    ("martin","angel"),
+    ("maria","rosa"),
+    ("jaime","sebastian"),
+    ("alaria","antonia"),
+    ("juan","andres"),
+    ("luciano","adolfo"),
+    ("maria","joanes"),
+    ("maria","magdalena"),
+    ("juan","domingo"),
+    ("juana","josefa"),
+    ("juan","anacleto"),
+    ("leonor","jose"),
+    ("pedro","miguel"),
+    ("maria","zeferina"),
+    ("cirila","romana"),
+    ("cosme","damian"),
+    ("manuel","valentin"),
+    ("pedro","marcelino"),
+    ("juan","domingo"),
+
+    # del log
+    ("maria","ascencia"),
+    ("esperanza","eusebia"),
+    ("dominga","crispina"),
+    ("maria","severiana"),
+    ("josefa","ignacia"),
+    ("juan","ambrosio"),
+    ("catalina","francisca"),
+    ("eustasia","micaela"),
+    ("pedro","ignacio"),
+    ("mateo","manuel"),
+    ("manuel","jose"),
+    ("francisco","sabra"),
+    ("manuel","francisco"),
+    ("josefa","ibertucha"),
+    ("dominga","manuela"),
+
+    # otros reportados
+    ("buenaventura","artuisa"),
+    ("martin","antonio"),
+    ("jose","facundo"),
+    ("maria","petra"),
+    ("maria","catalina"),
+    ("toribia","juliana"),
+    ("josefa","francisca"),
+    ("josefa","motorn"),
+    ("maria","teresa"),
+    ("dorotea","alonso"),
+    ("vicenta","ines"),
+    ("juana","baptista"),
+}
+
+COMPOUND_TRIE = TokenTrie.from_sequences(COMPOUND_2 | COMPOUND_3)
+
 def merge_compound_given(tokens):
+    """Fusiona en un token cada nombre compuesto (el más largo, en cualquier posición) vía trie."""
     if not tokens:
         return tokens
-    MALE_FIRST = {"francisco","jose","juan","pedro","manuel"}
     low = [strip_accents(t).lower() for t in tokens]
     if len(tokens) >= 2 and low[1] == "antonia" and low[0] in MALE_FIRST:
         tokens = [tokens[0], "Antonio"] + tokens[2:]
-        low = [strip_accents(t).lower() for t in tokens]
-
-    COMPOUND_3 = {
-        ("francisco","xavier","jesus"),
-        ("maria","juana","agustina"),
-        ("maria","concepcion","nicasia"),
-        ("juana","baptista","geronima"),
-        ("mariano","francisco","jaime","sebastian"),
-    }
-    COMPOUND_2 = {
-        ("san","juan"),
-        ("maria","antonia"), ("maria","antolin"), ("maria","ascension"), ("maria","asuncion"),
-        ("maria","benita"), ("maria","bentura"), ("maria","ventura"), ("maria","dolores"),
-        ("maria","elena"), ("maria","fausta"), ("maria","francisca"), ("maria","gregoria"),
-        ("maria","isabel"), ("maria","jesus"), ("maria","josefa"), ("maria","manuela"),
-        ("maria","melitona"),
-        ("juana","melitona"),
-        ("maria","victoria"),
-        ("jose","antonio"), ("jose","ramon"), ("jose","januario"),
-        ("josefa","antonia"),
-        ("ana","isabel"),
-        ("pedro","antonio"), ("manuel","antonio"),
-        ("juan","manuel"), ("francisco","xavier"), ("francisco","ramon"), ("francisco","antonio"),
-        ("francisco","juan"),
-        ("martin","geronimo"),
-        ("francisca","paula"),
-        ("felipa","toribia"),
-        ("juan","antonio"), ("brigida","dionisia"),
-        ("domingo","mariano"), ("miguel","antonio"),
-        ("juan","ignacio"), ("juan","jose"),
-        ("martin","angel"),
-        ("maria","rosa"),
-        ("jaime","sebastian"),
-        ("alaria","antonia"),
-        ("juan","andres"),
-        ("luciano","adolfo"),
-        ("maria","joanes"),
-        ("maria","magdalena"),
-        ("juan","domingo"),
-        ("juana","josefa"),
-        ("juan","anacleto"),
-        ("leonor","jose"),
-        ("pedro","miguel"),
-        ("maria","zeferina"),
-        ("cirila","romana"),
-        ("cosme","damian"),
-        ("manuel","valentin"),
-        ("pedro","marcelino"),
-        ("juan","domingo"),
-
-        # del log
-        ("maria","ascencia"),
-        ("esperanza","eusebia"),
-        ("dominga","crispina"),
-        ("maria","severiana"),
-        ("josefa","ignacia"),
-        ("juan","ambrosio"),
-        ("catalina","francisca"),
-        ("eustasia","micaela"),
-        ("pedro","ignacio"),
-        ("mateo","manuel"),
-        ("manuel","jose"),
-        ("francisco","sabra"),
-        ("manuel","francisco"),
-        ("josefa","ibertucha"),
-        ("dominga","manuela"),
-
-        # otros reportados
-        ("buenaventura","artuisa"),
-        ("martin","antonio"),
-        ("jose","facundo"),
-        ("maria","petra"),
-        ("maria","catalina"),
-        ("toribia","juliana"),
-        ("josefa","francisca"),
-        ("josefa","motorn"),
-        ("maria","teresa"),
-        ("dorotea","alonso"),
-        ("vicenta","ines"),
-        ("juana","baptista"),
-    }
-
-    # 3-palabras al inicio
-    if len(tokens) >= 3 and tuple(low[:3]) in COMPOUND_3:
-        merged = " ".join([tokens[0].title(), tokens[1].title(), tokens[2].title()])
-        rest = tokens[3:]
-        if len(rest) == 1 and strip_accents(rest[0]).lower() in SECOND_NAME_LIKE.union(GIVEN_COMMON):
-            merged = merged + " " + rest[0].title()
-            rest = []
-        return [merged] + rest
-
-    # 2-palabras al inicio
-    if len(tokens) >= 2 and tuple(low[:2]) in COMPOUND_2:
-        merged = " ".join([tokens[0].title(), tokens[1].title()])
-        return [merged] + tokens[2:]
-
-    return tokens
+        low[1] = "antonio"
+
+    out, prev = [], 0
+    for i, k in COMPOUND_TRIE.spans(low):
+        if STATS is not None: STATS.hit("COMPOUND", " ".join(low[i:i + k]))
+        out.extend(tokens[prev:i])
+        out.append(" ".join(t.title() for t in tokens[i:i + k]))
+        prev = i + k
+    if not out:
+        return tokens
+    # compuesto de >=3 al inicio seguido de un único token que parece 2º nombre → también al given
+    if len(out) == 1 and prev == len(tokens) - 1 and prev >= 3 and low[-1] in SECOND_OR_GIVEN:
+        return [out[0] + " " + tokens[-1].title()]
+    return out + tokens[prev:]
 
 TITLE_TOKENS = {"capito","capitan","capitán"}
 
-def normalize_person_item(s: str) -> str:
+def normalize_person_item(s: str, sink: set = None) -> str:
+    """sink (opcional): recoge los tokens en minúsculas que ven las tablas de reglas
+    (antes/después de GIVEN_MAP y los de salida) para el índice token→fila."""
     if not isinstance(s, str): return ""
     s = strip_accents(s)
     s = re.sub(r"\bcapito\.?\b", " ", s, flags=re.IGNORECASE)
@@ -379,13 +427,16 @@ def normalize_person_item(s: str) -> str:
     s = re.sub(r"\by\s+",   " ", s, flags=re.IGNORECASE)
 
     tokens = [t for t in re.split(r"\s+", s) if t]
+    if STATS is not None: STATS.count("tokens", len(tokens)); STATS.count("person_items")
     norm_tokens = []
     for t in tokens:
         t2 = archaic_y_to_i(t)
         if not t2: continue
         low = t2.lower()
+        if sink is not None: sink.add(low)
         if low in TITLE_TOKENS: continue
         t3 = GIVEN_MAP.get(low, t2)
+        if STATS is not None and low in GIVEN_MAP: STATS.hit("GIVEN_MAP", low)
         norm_tokens.append(t3)
 
     norm_tokens = dedupe_consecutive(norm_tokens)
@@ -393,31 +444,59 @@ def normalize_person_item(s: str) -> str:
     out = []
     for t in norm_tokens:
         low = strip_accents(t).lower()
+        if sink is not None: sink.add(low)
         if low in SURNAME_SYNONYMS:
+            if STATS is not None: STATS.hit("SURNAME_SYNONYMS", low)
             out.append(SURNAME_SYNONYMS[low]); continue
         if low in WHITELIST_TOKENS:
+            if STATS is not None: STATS.hit("WHITELIST_TOKENS", low)
             out.append(WHITELIST_TOKENS[low]); continue
-        if low not in BLACKLIST_TOKENS and low not in PROTECTED_NEAR and edit_distance(low,"zamacona") <= 2:
-            out.append("Zamacona"); continue
+        if low not in BLACKLIST_TOKENS and low not in PROTECTED_NEAR:
+            canon = phonetic_canon(low, sink)
+            if canon:
+                if STATS is not None: STATS.hit("PHONETIC", low)
+                out.append(canon); continue
+            if STATS is not None: STATS.count("edit_distance_calls")
+            if edit_distance(low,"zamacona") <= 2:
+                if STATS is not None: STATS.hit("FUZZY_ZAMACONA", low)
+                out.append("Zamacona"); continue
+        elif STATS is not None and low in PROTECTED_NEAR:
+            STATS.hit("PROTECTED_NEAR", low)
         out.append(t)
-    return clean_spaces(" ".join(out))
+    res = clean_spaces(" ".join(out))
+    if sink is not None:
+        sink.update(strip_accents(w).lower() for w in res.split())
+    return res
 
-def normalize_cell_value(val: str) -> str:
+def normalize_cell_value(val: str, sink: set = None) -> str:
     if not isinstance(val, str): return ""
     parts = [p.strip() for p in val.split(";")]
-    normed = [normalize_person_item(p) for p in parts if p]
+    normed = [normalize_person_item(p, sink) for p in parts if p]
     return "; ".join([p for p in normed if p])
 
 def contains_token_blacklist(text: str) -> bool:
     toks = re.split(r"[^\wñÑ]+", strip_accents(text or "").lower())
+    if STATS is not None:
+        bad = [t for t in toks if t and t in BLACKLIST_TOKENS]
+        for t in bad: STATS.hit("BLACKLIST_TOKENS", t)
+        return bool(bad)
     return any(t in BLACKLIST_TOKENS for t in toks if t)
 
 def contains_regex_blacklist(text: str) -> bool:
     txt = strip_accents(text or "").lower()
-    return any(re.search(p, txt) for p in BLACKLIST_REGEX)
+    found = BLACKLIST_RX.search(txt) is not None
+    if found and STATS is not None:
+        # la alternación compilada no dice qué patrón casó: se atribuye uno a uno (solo con --stats)
+        for p in BLACKLIST_REGEX:
+            if re.search(p, txt): STATS.hit("BLACKLIST_REGEX", p)
+    return found
 
 def contains_phrase_blacklist(text: str) -> bool:
     txt = clean_spaces(strip_accents(text or "").lower())
+    if STATS is not None:
+        bad = [phrase for phrase in BLACKLIST_PHRASES if phrase in txt]
+        for phrase in bad: STATS.hit("BLACKLIST_PHRASES", phrase)
+        return bool(bad)
     return any(phrase in txt for phrase in BLACKLIST_PHRASES)
 
 def contains_zamacona(text: str) -> bool:
@@ -427,13 +506,24 @@ def _tokens(s: str):
     s = (s or "").strip()
     return [t for t in re.split(r"\s+", s) if t] if s else []
 
+# parejas de 2 tokens que son given compuesto (sin apellidos)
+GIVEN_PAIRS = {
+    ("ana","isabel"), ("jose","januario"), ("juana","melitona"),
+    ("dominga","manuela"), ("manuel","francisco"), ("esperanza","eusebia"),
+    ("josefa","ignacia"), ("juan","ambrosio"), ("emeterio","donalo")
+}
+
+def given_like(tok_low: str) -> bool:
+    """Segundo nombre / nombre común, o compuesto ya fusionado por el trie (lleva espacio)."""
+    return tok_low in SECOND_OR_GIVEN or " " in tok_low
+
 def split_person(person: str):
     """Partición robusta con tratamiento de segundos nombres y fallbacks seguros."""
     toks = _tokens(person)
     if not toks:
         return ("", "", "")
 
-    # fusiona compuestos al inicio
+    # fusiona compuestos (trie compartido, cualquier posición)
     toks = merge_compound_given(toks)
     n = len(toks)
     low = [strip_accents(t).lower() for t in toks]
@@ -447,18 +537,14 @@ def split_person(person: str):
     # 1) exactamente 2 tokens
     if n == 2:
         pair = (low[0], low[1])
-        if (low[1] in SECOND_NAME_LIKE.union(GIVEN_COMMON)) or pair in {
-            ("ana","isabel"), ("jose","januario"), ("juana","melitona"),
-            ("dominga","manuela"), ("manuel","francisco"), ("esperanza","eusebia"),
-            ("josefa","ignacia"), ("juan","ambrosio"), ("emeterio","donalo")
-        }:
+        if given_like(low[1]) or pair in GIVEN_PAIRS:
             # los 2 tokens son given compuesto → sin apellidos
             return (" ".join([t.title() for t in toks]), "", "")
         # regla estándar 2 → given + primer apellido
         return (toks[0].title(), canonicalize_surname(toks[1]), "")
 
     # 2) n >= 3 y el ÚLTIMO parece segundo nombre (p.ej. ... Dano/Donalo/Sebastian)
-    if low[-1] in SECOND_NAME_LIKE.union(GIVEN_COMMON):
+    if given_like(low[-1]):
         prev = toks[:-1]           # quitamos el último (lo sumaremos al given)
         last = toks[-1].title()
 
@@ -467,7 +553,7 @@ def split_person(person: str):
             return (f"{prev[0].title()} {last}", "", "")
         if len(prev) == 2:
             p2 = (strip_accents(prev[0]).lower(), strip_accents(prev[1]).lower())
-            if p2[1] in SECOND_NAME_LIKE.union(GIVEN_COMMON):
+            if given_like(p2[1]):
                 # también son 2º nombres → todo given
                 return (f"{prev[0].title()} {prev[1].title()} {last}", "", "")
             # si no, trata prev[1] como apellido
@@ -492,6 +578,10 @@ def split_person(person: str):
 
     # fallback seguro
     if len(idxs) < 2:
+        if n >= 2 and " " in low[-2]:
+            # el penúltimo es un compuesto fusionado → es given; solo queda un apellido
+            given = " ".join([t.title() for t in toks[:-1]] + ([tail_given] if tail_given else []))
+            return (given, canonicalize_surname(toks[-1]), "")
         if n >= 2:
             s2 = canonicalize_surname(toks[-1])
             s1 = canonicalize_surname(toks[-2])
@@ -515,6 +605,7 @@ def first_person(cell: str) -> str:
 
 # --- hyperlink & colores ---
 def add_ark_hyperlinks(ws):
+    from openpyxl.utils import get_column_letter
     headers = {cell.value: idx for idx, cell in enumerate(ws[1], start=1)}
     cidx = headers.get("arkId")
     if not cidx: return 0
@@ -530,6 +621,9 @@ def add_ark_hyperlinks(ws):
     return count
 
 def paint_rows(ws):
+    from openpyxl.styles import PatternFill
+    FILL_GREEN, FILL_YELLOW, FILL_GRAY = (PatternFill(fill_type="solid", start_color=c, end_color=c)
+                                          for c in (COLOR_GREEN, COLOR_YELLOW, COLOR_GRAY))
     headers = {cell.value: idx for idx, cell in enumerate(ws[1], start=1)}
     c_black = headers.get("blacklistFlag")
     c_rev   = headers.get("reviewFlag")
@@ -543,6 +637,7 @@ def paint_rows(ws):
         except Exception:
             return 0
     green = yellow = gray = 0
+    ncols = ws.max_column  # max_column recorre todas las celdas: una vez, no por fila
     for r in range(2, ws.max_row + 1):
         is_black  = to_int(ws.cell(row=r, column=c_black).value) == 1
         is_review = to_int(ws.cell(row=r, column=c_rev).value) == 1
@@ -550,89 +645,200 @@ def paint_rows(ws):
         if is_black: gray += 1
         elif is_review: yellow += 1
         else: green += 1
-        for c in range(1, ws.max_column + 1):
+        for c in range(1, ncols + 1):
             ws.cell(row=r, column=c).fill = fill
     return (green, yellow, gray)
 
 def load_surname_whitelist():
-    global SURNAME_CANON
-    p = Path("data/whitelist_surnames.txt")
-    if not p.exists():
-        SURNAME_CANON = set(); return
-    vals = []
-    for line in p.read_text(encoding="utf-8").splitlines():
-        t = strip_accents(line).strip().lower()
-        if t: vals.append(t)
-    SURNAME_CANON = set(vals)
-
-# ---------- MAIN ----------
-def main():
-    OUT_DIR.mkdir(parents=True, exist_ok=True)
-    if not Path(IN_FILE).exists():
-        raise SystemExit(f"No encuentro {IN_FILE}")
+    """Whitelist de apellidos (data/whitelist_surnames.txt) y lookups precalculados, vía rulepack."""
+    global SURNAME_CANON, PHONETIC_INDEX, SECOND_OR_GIVEN, BLACKLIST_RX, COMPOUND_TRIE
+    pack = rulepack.load()
+    SURNAME_CANON = set(pack["surname_canon"])
+    PHONETIC_INDEX = {"~" + k: "Zamacona" for k, v in pack["phonetic_index"].items()
+                      if strip_accents(v).lower() == "zamacona"}
+    SECOND_OR_GIVEN = pack["second_or_given"]
+    BLACKLIST_RX = pack["blacklist_regex_any"]
+    COMPOUND_TRIE = TokenTrie(pack["compound_trie"])
+
+# ---------- pasos por frame (reutilizables desde otros scripts) ----------
+def find_work_cols(df: pd.DataFrame) -> list:
+    work_cols = [c for c in df.columns if c.endswith("__work") and any(c.startswith(p) for p in TARGET_PREFIXES)]
+    work_cols.sort()
+    return work_cols
+
+def row_flags_with_reason(row, work_cols):
+    texts = [str(row[c] or "") for c in work_cols]
+    has_bad_cam      = any(re.search(r"\bcama[a-z]{1,}\b", strip_accents(t).lower()) for t in texts)
+    has_bad_zamregex = any(re.search(r"\bzam(?!acona\b)\w+\b", strip_accents(t).lower()) for t in texts)
+    has_bad_regex    = any(contains_regex_blacklist(t) for t in texts)
+    has_bad_token    = any(contains_token_blacklist(t) for t in texts)
+    has_bad_phrase   = any(contains_phrase_blacklist(t) for t in texts)
+    has_z            = any(contains_zamacona(t) for t in texts)
+
+    reason = ""
+    if has_bad_token:      reason = "token"
+    elif has_bad_cam:      reason = "regex:cama*"
+    elif has_bad_zamregex: reason = "regex:zam*!=zamacona"
+    elif has_bad_regex:    reason = "regex:misc"
+    elif has_bad_phrase:   reason = "phrase"
+
+    critical = has_bad_cam or has_bad_zamregex or has_bad_token or has_bad_phrase
+    blacklist = 1 if critical or (has_bad_regex and not has_z) else 0
+    review    = 1 if (not blacklist and not has_z) else 0
+    if STATS is not None:
+        STATS.count("rows_flagged")
+        if reason: STATS.hit("blacklistReason", reason)
+    return pd.Series({"blacklistFlag": blacklist, "reviewFlag": review, "blacklistReason": reason})
+
+def _flags_to_status(row):
+    b = str(row.get("blacklistFlag","0")).strip()
+    r = str(row.get("reviewFlag","0")).strip()
+    if b == "1":
+        return "gray"
+    if r == "1":
+        return "yellow"
+    return "green"
+
+FLAG_COLS = ["blacklistFlag", "reviewFlag", "blacklistReason"]
+
+def split_cols_for(work_cols: list) -> list:
+    created = []
+    for c in work_cols:
+        base = c[:-6]
+        created += [f"{base}__given", f"{base}__surn1", f"{base}__surn2"]
+    return created
+
+# tablas cuyo cambio NO invalida todo el caché: se difunden clave a clave y solo se
+# recalculan las filas que contienen esas claves (índice token→fila, ver norm_cache/rule_impact)
+TRACKED_TABLES = ["GIVEN_MAP", "SURNAME_SYNONYMS", "WHITELIST_TOKENS", "BLACKLIST_TOKENS", "PROTECTED_NEAR", "SURNAME_CANON",
+                  "PHONETIC_INDEX"]
+
+def rules_snapshot() -> dict:
+    """Contenido de las tablas rastreadas (clave → valor; los sets con valor '1')."""
+    snap = {}
+    for name in TRACKED_TABLES:
+        t = globals()[name]
+        snap[name] = {str(k): str(v) for k, v in t.items()} if isinstance(t, dict) else {str(k): "1" for k in t}
+    return snap
+
+def rules_version() -> str:
+    """Hash del resto de reglas: este módulo (AST, ignora comentarios) sin las tablas rastreadas.
+    Lo calcula y guarda el rulepack (solo se recalcula si cambia el fichero)."""
+    return rulepack.load()["logic_hash"]
+
+def compute_rows(df: pd.DataFrame, work_cols: list, with_tokens: bool = False,
+                 jobs: int = 1, uniques=None) -> pd.DataFrame:
+    """Trabajo por fila: __work normalizados, flags y split (antes de vaciar no-verdes).
+    with_tokens añade norm_cache.TOKENS_COL (tokens vistos por las tablas de reglas).
+    jobs > 1: por trozos en un pool de procesos. uniques (opcional): (given_ctr, surn_ctr)
+    a los que se suma lo que aportan las filas verdes (como unique_contrib).
+    Devuelve un frame con el mismo índice que df."""
+    if jobs > 1 and len(df) > CHUNK_ROWS:
+        return _compute_rows_parallel(df, work_cols, with_tokens, jobs, uniques)
+    out = pd.DataFrame(index=df.index)
+    sinks = [set() for _ in range(len(df))] if with_tokens else None
+    with phase("normalize"):
+        for c in work_cols:
+            vals = df[c].fillna("").astype(str)
+            if with_tokens:
+                out[c] = [normalize_cell_value(v, sk) for v, sk in zip(vals.tolist(), sinks)]
+            else:
+                out[c] = vals.map(normalize_cell_value)
+    with phase("flags"):
+        if len(out):
+            flags = out.apply(row_flags_with_reason, axis=1, args=(work_cols,))
+        else:
+            flags = pd.DataFrame(columns=FLAG_COLS, index=out.index)
+        out = pd.concat([out, flags], axis=1)
+    with phase("split"):
+        for c in work_cols:
+            base = c[:-6]
+            parts = out[c].map(first_person).map(split_person)
+            out[f"{base}__given"] = parts.map(lambda t: t[0])
+            out[f"{base}__surn1"] = parts.map(lambda t: t[1])
+            out[f"{base}__surn2"] = parts.map(lambda t: t[2])
+    if with_tokens:
+        out[norm_cache.TOKENS_COL] = [" ".join(sorted(sk)) for sk in sinks]
+    if uniques is not None:
+        add_uniques(out, split_cols_for(work_cols), uniques)
+    return out
 
+def add_uniques(derived: pd.DataFrame, created: list, uniques):
+    given_ctr, surn_ctr = uniques
+    for row in derived[FLAG_COLS + created].to_dict("records"):
+        g, sn = unique_contrib(row, created)
+        given_ctr.update(g)
+        surn_ctr.update(sn)
+
+# ---------- modo paralelo (--jobs) ----------
+def _init_worker(with_stats: bool):
+    """Una vez por proceso del pool: tablas de reglas (rulepack) e instrumentación propia."""
+    global STATS
     load_surname_whitelist()
+    STATS = hot_stats.HotStats() if with_stats else None
+
+def _compute_chunk(task):
+    """Tarea del pool: compute_rows de las filas [start, stop) de las columnas en memoria
+    compartida (+ únicos y contadores del trozo). El resultado vuelve también por shm."""
+    global STATS
+    handle, work_cols, start, stop, with_tokens, want_uniques = task
+    if STATS is not None:
+        STATS = hot_stats.HotStats()  # solo lo de este trozo; el padre los suma
+    chunk = shm_columns.attach(handle).frame(work_cols, start, stop)
+    uniques = (Counter(), Counter()) if want_uniques else None
+    derived = compute_rows(chunk, work_cols, with_tokens, uniques=uniques)
+    return shm_columns.publish_frame(derived), uniques, STATS
+
+def _compute_rows_parallel(df: pd.DataFrame, work_cols: list, with_tokens: bool, jobs: int, uniques):
+    from concurrent.futures import ProcessPoolExecutor
+    n = len(df)
+    parts = []
+    with shm_columns.SharedColumns() as sc:
+        for c in work_cols:  # solo se publica lo que se usa; nulos → "" (como hace compute_rows)
+            sc.put_strings(c, df[c].tolist())
+        tasks = ((sc.handle, work_cols, i, min(i + CHUNK_ROWS, n), with_tokens, uniques is not None)
+                 for i in range(0, n, CHUNK_ROWS))
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(STATS is not None,)) as ex:
+            for res, part_uniques, part_stats in ex.map(_compute_chunk, tasks):  # map conserva el orden
+                parts.append(shm_columns.take_frame(res))
+                if uniques is not None:
+                    uniques[0].update(part_uniques[0])
+                    uniques[1].update(part_uniques[1])
+                if STATS is not None and part_stats is not None:
+                    STATS.merge(part_stats)
+    out = pd.concat(parts, ignore_index=True)
+    out.index = df.index
+    return out
 
-    df = pd.read_excel(IN_FILE, dtype=str)
-    df.columns = [re.sub(r"\s+"," ", str(c)).strip() for c in df.columns]
+def normalize_frame(df: pd.DataFrame, work_cols: list, cache=None, jobs: int = 1, uniques=None):
+    """Pasos 1-4: normaliza __work, flags, status, split y vacía splits en no-verdes.
+    Con cache (norm_cache.RowCache) solo se calculan las filas nuevas o cambiadas.
+    jobs/uniques: ver compute_rows (uniques solo sin caché; con caché los lleva RowCache).
+    Devuelve (df, created) con created = columnas __given/__surn1/__surn2 creadas."""
+    created = split_cols_for(work_cols)
 
-    work_cols = [c for c in df.columns if c.endswith("__work") and any(c.startswith(p) for p in TARGET_PREFIXES)]
-    work_cols.sort()
-    if not work_cols:
-        raise SystemExit("No se encontraron columnas __work para procesar.")
+    # 1) + 2) + 3) trabajo por fila (o caché)
+    if cache is None:
+        derived = compute_rows(df, work_cols, jobs=jobs, uniques=uniques)
+    else:
+        keys = norm_cache.row_keys(df, work_cols)
+        hit = cache.hits(keys)
+        derived = cache.assemble(keys, hit, compute_rows(df.loc[~hit.values], work_cols, with_tokens=True, jobs=jobs))
+        cache.remember(keys, hit, derived)
 
-    # 1) normaliza TODOS los __work
     for c in work_cols:
-        df[c] = df[c].fillna("").astype(str).map(normalize_cell_value)
-
-    # 2) flags
-    def row_flags_with_reason(row):
-        texts = [str(row[c] or "") for c in work_cols]
-        has_bad_cam      = any(re.search(r"\bcama[a-z]{1,}\b", strip_accents(t).lower()) for t in texts)
-        has_bad_zamregex = any(re.search(r"\bzam(?!acona\b)\w+\b", strip_accents(t).lower()) for t in texts)
-        has_bad_regex    = any(contains_regex_blacklist(t) for t in texts)
-        has_bad_token    = any(contains_token_blacklist(t) for t in texts)
-        has_bad_phrase   = any(contains_phrase_blacklist(t) for t in texts)
-        has_z            = any(contains_zamacona(t) for t in texts)
-
-        reason = ""
-        if has_bad_token:      reason = "token"
-        elif has_bad_cam:      reason = "regex:cama*"
-        elif has_bad_zamregex: reason = "regex:zam*!=zamacona"
-        elif has_bad_regex:    reason = "regex:misc"
-        elif has_bad_phrase:   reason = "phrase"
-
-        critical = has_bad_cam or has_bad_zamregex or has_bad_token or has_bad_phrase
-        blacklist = 1 if critical or (has_bad_regex and not has_z) else 0
-        review    = 1 if (not blacklist and not has_z) else 0
-        return pd.Series({"blacklistFlag": blacklist, "reviewFlag": review, "blacklistReason": reason})
-
-    df = pd.concat([df, df.apply(row_flags_with_reason, axis=1)], axis=1)
+        df[c] = derived[c]
+    df = pd.concat([df, derived[FLAG_COLS]], axis=1)
 
     # 2.bis) status informativo (NO afecta tu pintado; sirve a otros scripts)
-    if "status" not in df.columns:
-        df["status"] = ""
-    def _flags_to_status(row):
-        b = str(row.get("blacklistFlag","0")).strip()
-        r = str(row.get("reviewFlag","0")).strip()
-        if b == "1":
-            return "gray"
-        if r == "1":
-            return "yellow"
-        return "green"
-    df["status"] = df.apply(lambda r: r["status"] if str(r["status"]).strip() else _flags_to_status(r), axis=1)
-
-    # 3) split + columnas
-    created = []
-    for c in work_cols:
-        base = c[:-6]
-        series_first = df[c].fillna("").astype(str).map(first_person)
-        parts = series_first.map(split_person)
-        gcol, s1col, s2col = f"{base}__given", f"{base}__surn1", f"{base}__surn2"
-        df[gcol]  = parts.map(lambda t: t[0])
-        df[s1col] = parts.map(lambda t: t[1])
-        df[s2col] = parts.map(lambda t: t[2])
-        created += [gcol, s1col, s2col]
+    with phase("status"):
+        if "status" not in df.columns:
+            df["status"] = ""
+        df["status"] = df.apply(lambda r: r["status"] if str(r["status"]).strip() else _flags_to_status(r), axis=1)
+
+    # 3) columnas de split
+    for col in created:
+        df[col] = derived[col]
 
     def reorder():
         order, done = [], set()
@@ -654,22 +860,48 @@ def main():
     surname_cols = [c for c in created if c.endswith("__surn1") or c.endswith("__surn2")]
     df.loc[non_green, given_cols] = ""
     df.loc[non_green, surname_cols] = ""
+    return df, created
 
+def norm_given_string(s: str) -> str:
+    s = clean_spaces(s)
+    return " ".join(w.capitalize() for w in s.split()) if s else ""
+
+def unique_contrib(row: dict, created: list):
+    """Lo que aporta una fila (ya derivada) a los únicos: solo si es verde por flags."""
+    if str(row.get("blacklistFlag", "0")) != "0" or str(row.get("reviewFlag", "0")) != "0":
+        return [], []
+    given = []
+    for c in created:
+        if c.endswith("__given"):
+            x = str(row.get(c) or "")
+            if x.strip():
+                g = norm_given_string(x)
+                if g: given.append(g)
+    surn = []
+    for c in created:
+        if c.endswith("__surn1") or c.endswith("__surn2"):
+            surn += [t.strip() for t in re.split(r"\s*;\s*", str(row.get(c) or "")) if t.strip()]
+    return given, surn
+
+def write_outputs(df: pd.DataFrame, work_cols: list, created: list, uniques=None):
+    """Pasos 5-7: CSV/XLSX, colores + hyperlinks, review log y únicos (solo verdes).
+    uniques=(given_ctr, surn_ctr) ya calculados (p.ej. incrementalmente por el caché)."""
     # 5) guardar
     OUT_DIR.mkdir(parents=True, exist_ok=True)
-    df.to_csv(OUT_CSV, index=False)
-    df.to_excel(OUT_XLSX, index=False)
+    with phase("write"):
+        df.to_csv(OUT_CSV, index=False)
+        df.to_excel(OUT_XLSX, index=False)
 
     # 6) colores + hyperlink arkId (exactamente como ya hacías)
-    wb = load_workbook(OUT_XLSX, data_only=False)
-    ws = wb.active
-    g,y,gr = paint_rows(ws)
-    links = add_ark_hyperlinks(ws)
-    wb.save(OUT_XLSX)
+    with phase("paint"):
+        from openpyxl import load_workbook
+        wb = load_workbook(OUT_XLSX, data_only=False)
+        ws = wb.active
+        g,y,gr = paint_rows(ws)
+        links = add_ark_hyperlinks(ws)
+        wb.save(OUT_XLSX)
 
     # 7) logs (solo verdes por tus flags)
-    green = df[(df["blacklistFlag"].astype(str)=="0") & (df["reviewFlag"].astype(str)=="0")].copy()
-
     name_col = "fullName__work" if "fullName__work" in df.columns else work_cols[0]
     reviews = df[df["reviewFlag"] == 1][name_col].fillna("").astype(str)
     with open(OUT_REVIEW_LOG, "w", encoding="utf-8") as f:
@@ -678,28 +910,14 @@ def main():
             if v: f.write(v + "\n")
 
     # únicos (solo verdes)
-    def norm_given_string(s: str) -> str:
-        s = clean_spaces(s)
-        return " ".join(w.capitalize() for w in s.split()) if s else ""
-
-    created_given = [c for c in created if c.endswith("__given")]
-    given_strings = []
-    for c in created_given:
-        given_strings += [norm_given_string(x) for x in green[c].fillna("").astype(str).tolist() if x and x.strip()]
-    given_ctr = Counter([g for g in given_strings if g])
-    with open(OUT_UNIQUE_GIVEN, "w", encoding="utf-8") as f:
-        for tok, cnt in sorted(given_ctr.items(), key=lambda x: (-x[1], x[0].lower())):
-            f.write(f"{tok}\t{cnt}\n")
-
-    surn_cols_all = [c for c in created if c.endswith("__surn1") or c.endswith("__surn2")]
-    surn_tokens = []
-    for c in surn_cols_all:
-        surn_tokens += re.split(r"\s*;\s*", ";".join(green[c].fillna("").astype(str).tolist()))
-    surn_tokens = [t.strip() for t in surn_tokens if t.strip()]
-    surn_ctr = Counter(surn_tokens)
-    with open(OUT_UNIQUE_SURN, "w", encoding="utf-8") as f:
-        for tok, cnt in sorted(surn_ctr.items(), key=lambda x: (-x[1], x[0].lower())):
-            f.write(f"{tok}\t{cnt}\n")
+    if uniques is not None:
+        given_ctr, surn_ctr = uniques
+    else:
+        given_ctr = name_stats.frequencies(df, "given", "flags", [c for c in created if c.endswith("__given")])
+        surn_ctr = name_stats.frequencies(df, "surname", "flags",
+                                          [c for c in created if c.endswith("__surn1") or c.endswith("__surn2")])
+    name_stats.write_unique(OUT_UNIQUE_GIVEN, given_ctr)
+    name_stats.write_unique(OUT_UNIQUE_SURN, surn_ctr)
 
     print(f"[OK] {OUT_XLSX}  ({len(df)} filas)  → filas coloreadas: green={g}, yellow={y}, gray={gr}")
     print(f"[OK] hipervínculos en arkId: {links}")
@@ -708,5 +926,85 @@ def main():
     print(f"[OK] {OUT_UNIQUE_GIVEN} ({len(given_ctr)} nombres únicos, SOLO verdes)")
     print(f"[OK] {OUT_UNIQUE_SURN} ({len(surn_ctr)} apellidos únicos, SOLO verdes)")
 
+def save_stats(rows: int, cache_stats: dict = None, jobs: int = 1):
+    """Sidecar JSON de --stats junto a Zamacona_normalized.xlsx.
+    cache_stats: RowCache.stats() + 'stale' (None si se ejecutó con --no-cache).
+    Con jobs > 1 las fases normalize/flags/split suman el tiempo de todos los procesos."""
+    extra = {"input": str(IN_FILE), "rows": rows, "jobs": jobs, "cache": None}
+    if cache_stats is not None:
+        st = dict(cache_stats)
+        st["hit_rate"] = round(st["hits"] / st["rows"], 4) if st["rows"] else 0.0
+        extra["cache"] = st
+    c = STATS.counts
+    if c.get("tokens"):
+        c["edit_distance_per_token"] = round(c.get("edit_distance_calls", 0) / c["tokens"], 4)
+    tables = {"GIVEN_MAP": GIVEN_MAP, "SURNAME_SYNONYMS": SURNAME_SYNONYMS, "WHITELIST_TOKENS": WHITELIST_TOKENS,
+              "PROTECTED_NEAR": PROTECTED_NEAR, "BLACKLIST_TOKENS": BLACKLIST_TOKENS,
+              "BLACKLIST_PHRASES": BLACKLIST_PHRASES, "BLACKLIST_REGEX": BLACKLIST_REGEX,
+              "COMPOUND": [" ".join(t) for t in COMPOUND_2 | COMPOUND_3]}
+    data = STATS.save(OUT_STATS, tables, extra)
+    dead = sum(len(r.get("unused", [])) for r in data["rules"].values())
+    print(f"[OK] {OUT_STATS}  (fases: " + ", ".join(f"{k}={v:.2f}s" for k, v in data["phases_s"].items())
+          + f" | {c.get('tokens', 0)} tokens | {c.get('edit_distance_calls', 0)} edit_distance | "
+          f"{dead} claves de reglas sin disparar)")
+
+# ---------- MAIN ----------
+def arg_int(flag: str, default: int) -> int:
+    """Valor entero de '--flag N' o '--flag=N' en sys.argv."""
+    for i, a in enumerate(sys.argv):
+        if a == flag and i + 1 < len(sys.argv):
+            return int(sys.argv[i + 1])
+        if a.startswith(flag + "="):
+            return int(a.split("=", 1)[1])
+    return default
+
+def main():
+    global STATS
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
+    if not Path(IN_FILE).exists():
+        raise SystemExit(f"No encuentro {IN_FILE}")
+    if "--stats" in sys.argv:
+        STATS = hot_stats.HotStats()
+
+    load_surname_whitelist()
+    jobs = arg_int("--jobs", 1)
+    if jobs <= 0:
+        jobs = os.cpu_count() or 1
+
+    with phase("read"):
+        df = pd.read_excel(IN_FILE, dtype=str)
+    df.columns = [re.sub(r"\s+"," ", str(c)).strip() for c in df.columns]
+
+    work_cols = find_work_cols(df)
+    if not work_cols:
+        raise SystemExit("No se encontraron columnas __work para procesar.")
+
+    cache = None
+    if "--no-cache" not in sys.argv:
+        cache = norm_cache.RowCache(OUT_CACHE, rules_version(), work_cols,
+                                    work_cols + FLAG_COLS + split_cols_for(work_cols) + [norm_cache.TOKENS_COL],
+                                    rules_snapshot())
+        if not cache.load():
+            print(f"[INFO] Caché de normalización no reutilizable ({cache.stale_reason}); se recalcula todo.")
+        elif cache.changed_tokens:
+            print(f"[INFO] Reglas editadas: {len(cache.changed_tokens)} claves cambiadas → "
+                  f"{len(cache.stale)} filas (claves de caché) afectadas se recalculan.")
+
+    uniques = (Counter(), Counter()) if cache is None and jobs > 1 else None  # únicos sumados por trozo
+    if jobs > 1:
+        print(f"[INFO] Modo paralelo: {jobs} procesos, trozos de {CHUNK_ROWS} filas.")
+    df, created = normalize_frame(df, work_cols, cache, jobs, uniques)
+
+    st = None
+    if cache is not None:
+        st = dict(cache.stats(), stale=len(cache.stale))
+        with phase("cache"):
+            uniques = cache.update(cache.last_keys, cache.last_derived, lambda row: unique_contrib(row, created))
+            cache.save()
+        print(f"[OK] caché por fila: {st['hits']} reutilizadas, {st['recomputed']} recalculadas de {st['rows']}")
+    write_outputs(df, work_cols, created, uniques)
+    if STATS is not None:
+        save_stats(len(df), st, jobs)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
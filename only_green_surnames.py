@@ -12,18 +12,18 @@ Mantiene el comportamiento original:
 Y añade valor:
   - Soporta input patched o normal
   - Si faltan blacklistFlag/reviewFlag, usa status=="green"
-  - Escribe únicos (solo verdes):
+  - Escribe únicos (solo verdes), con name_stats.py (vectorizado y cacheado por artefacto):
       - out/Zamacona_unique_given.txt
       - out/Zamacona_unique_surnames.txt
 """
 
 from __future__ import annotations
 from pathlib import Path
-import re
-from collections import Counter
 import sys
 import pandas as pd
 
+import name_stats
+
 OUT = Path("out")
 IN_PATCHED = OUT / "Zamacona_normalized_patched.xlsx"
 IN_NORMAL  = OUT / "Zamacona_normalized.xlsx"
@@ -57,6 +57,10 @@ def main():
     mask_green = green_mask(df)
     mask_non_green = ~mask_green
 
+    # Únicos (solo verdes) sobre el artefacto tal cual (cacheados por su sha1):
+    # given de '__given' (si no hay, 'given'); surnames de '__surn1/__surn2' (si no hay, 'surname/surname2')
+    freq = name_stats.artifact_frequencies(src, ["given", "surname"], "status", df)
+
     # Identificar columnas de apellidos (split)
     surname_cols = [c for c in df.columns if c.endswith("__surn1") or c.endswith("__surn2")]
 
@@ -69,44 +73,11 @@ def main():
     print(f"[OK] Guardado {OUT_CLEAN.name} con __surn1/__surn2 vacíos en no verdes. (origen: {src.name})")
 
     # --- Únicos (solo verdes) ---
-    greens = df[mask_green].copy()
-
-    # Given únicos: prioriza columnas split '__given'; si no hay, cae a 'given'
-    given_cols = [c for c in greens.columns if c.endswith("__given")]
-    if not given_cols and "given" in greens.columns:
-        given_cols = ["given"]
-
-    given_tokens = []
-    for c in given_cols:
-        for v in greens[c].astype(str):
-            v = " ".join(v.split()).strip()
-            if v:
-                given_tokens.append(" ".join(w.capitalize() for w in v.split()))
-    given_ctr = Counter(given_tokens)
-    with open(OUT_GIVEN, "w", encoding="utf-8") as f:
-        for tok, cnt in sorted(given_ctr.items(), key=lambda x: (-x[1], x[0].lower())):
-            f.write(f"{tok}\t{cnt}\n")
-
-    # Surnames únicos: prioriza '__surn1/__surn2'; si no hay, cae a 'surname/surname2'
-    surn_cols = [c for c in greens.columns if c.endswith("__surn1") or c.endswith("__surn2")]
-    if not surn_cols:
-        for base in ("surname", "surname2"):
-            if base in greens.columns:
-                surn_cols.append(base)
-
-    surn_tokens = []
-    raw = ";".join(greens[c].astype(str).tolist()) if surn_cols else ""
-    for t in re.split(r"\s*;\s*", raw):
-        t = " ".join(t.split()).strip()
-        if t:
-            surn_tokens.append(t)
-    surn_ctr = Counter(surn_tokens)
-    with open(OUT_SURN, "w", encoding="utf-8") as f:
-        for tok, cnt in sorted(surn_ctr.items(), key=lambda x: (-x[1], x[0].lower())):
-            f.write(f"{tok}\t{cnt}\n")
-
-    print(f"[OK] {OUT_GIVEN.name} ({len(given_ctr)} nombres únicos, SOLO verdes)")
-    print(f"[OK] {OUT_SURN.name} ({len(surn_ctr)} apellidos únicos, SOLO verdes)")
+    n_given = name_stats.write_unique(OUT_GIVEN, freq["given"])
+    n_surn = name_stats.write_unique(OUT_SURN, freq["surname"])
+
+    print(f"[OK] {OUT_GIVEN.name} ({n_given} nombres únicos, SOLO verdes)")
+    print(f"[OK] {OUT_SURN.name} ({n_surn} apellidos únicos, SOLO verdes)")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+perf_gate.py
+
+Puerta de regresión de rendimiento: compara una medición de bench.py con la línea base
+versionada (data/bench_baseline.json) y sale con código != 0 si algo empeora.
+
+- Etapas: filas/s por etapa (mediana de --runs ejecuciones completas sobre el corpus
+  sintético); las etapas sin filas (count_raw.py) se comparan por wall_s.
+- Funciones: llamadas/s de las funciones clave de bench.py (mediana de --runs repeticiones).
+- Umbral: regresión si la mediana cae más de --tolerance (relativo; 0.15 = 15 %) respecto
+  a la base, o más que la dispersión observada ((máx-mín)/mediana de las repeticiones, en la
+  base o en la medición actual) si esta es mayor: en una máquina ruidosa el umbral se abre solo.
+  Etapas con base < --min-wall s solo avisan (el arranque de Python domina y es ruido).
+
+Pensado para correr antes de tocar reglas (p.ej. nuevas BLACKLIST_REGEX) o el camino
+caliente de normalize_names.py; contains_regex_blacklist se mide aparte por eso.
+
+Uso:
+  python3 perf_gate.py                                  # mide (10k, 3 ejecuciones) y compara
+  python3 perf_gate.py --stages normalize_names.py --tolerance 0.10
+  python3 perf_gate.py --from out/bench/latest.json     # compara un resultado ya medido
+                                                        # (bench.py, varios separados por comas, o gate_latest.json)
+  python3 perf_gate.py --update-baseline                # mide y reescribe la línea base
+
+Salida: 0 sin regresiones · 1 con regresiones · 2 sin línea base
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import statistics
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import bench
+
+ROOT = Path(__file__).resolve().parent
+BASELINE = ROOT / "data" / "bench_baseline.json"
+GATE_LATEST = bench.BENCH_DIR / "gate_latest.json"
+
+TOLERANCE = 0.15   # caída relativa admitida
+MIN_WALL = 2.0     # s; por debajo, la etapa no bloquea (solo avisa)
+META_KEYS = ("machine", "cpus", "python", "rules_hash")
+
+# ---------------------------
+# Medición y resumen (medianas)
+# ---------------------------
+
+def _median(xs: List[float]) -> Optional[float]:
+    xs = [x for x in xs if x is not None]
+    return round(statistics.median(xs), 3) if xs else None
+
+def _spread(xs: List[float]) -> float:
+    """(máx - mín) / mediana: ruido relativo entre repeticiones (0 con una sola)."""
+    xs = [x for x in xs if x]
+    if len(xs) < 2:
+        return 0.0
+    return round((max(xs) - min(xs)) / statistics.median(xs), 3)
+
+def measure(sizes: List[str], stages: List[str], runs: int, func_samples: int, funcs: bool) -> List[dict]:
+    """--runs ejecuciones de bench (etapas en copia limpia); las funciones, una vez con --runs repeticiones."""
+    meta = bench.run_meta()
+    results = []
+    for i in range(max(1, runs)):
+        print(f"\n=== Ejecución {i + 1}/{runs} ===")
+        res = {"meta": meta, "stages": {}, "functions": {}}
+        for size in sizes if stages else []:
+            res["stages"][size] = bench.bench_stages(size, stages, warm=False, verbose=False)
+        results.append(res)
+    if funcs:
+        print("\n=== Funciones ===")
+        results[0]["functions"] = bench.bench_functions(func_samples, runs, bench.FUNCS)
+    return results
+
+def summarize(results: List[dict]) -> dict:
+    """Medianas por etapa (entre resultados) y por función (entre sus runs_s)."""
+    out = {"meta": results[0].get("meta", {}), "runs": len(results), "stages": {}, "functions": {}}
+    sizes = sorted({s for r in results for s in r.get("stages", {})})
+    for size in sizes:
+        recs: Dict[str, List[dict]] = {}
+        for r in results:
+            for rec in r.get("stages", {}).get(size, []):
+                recs.setdefault(rec["stage"], []).append(rec)
+        out["stages"][size] = {
+            stage: {
+                "rows_per_s": _median([x.get("rows_per_s") for x in xs if x.get("rc") == 0]),
+                "wall_s":     _median([x.get("wall_s") for x in xs if x.get("rc") == 0]),
+                "spread":     _spread([x.get("wall_s") for x in xs if x.get("rc") == 0]),
+                "n": sum(1 for x in xs if x.get("rc") == 0),
+                "failed": sum(1 for x in xs if x.get("rc")),
+            }
+            for stage, xs in recs.items()
+        }
+    for r in results:
+        for name, f in r.get("functions", {}).items():
+            times = f.get("runs_s") or [f["best_s"]]
+            med = statistics.median(times)
+            out["functions"][name] = {"calls_per_s": round(f["calls"] / med, 1) if med else None,
+                                      "us_per_call": round(med / f["calls"] * 1e6, 3) if f["calls"] else None,
+                                      "spread": _spread(times), "n": len(times)}
+    return out
+
+# ---------------------------
+# Comparación
+# ---------------------------
+
+def _tol(tol: float, b: Optional[dict], c: Optional[dict]) -> float:
+    return max(tol, (b or {}).get("spread", 0.0), (c or {}).get("spread", 0.0))
+
+def _verdict(delta: Optional[float], tol: float, noisy: bool) -> str:
+    if delta is None:
+        return "-"
+    if delta < -tol:
+        return "ruido" if noisy else "REGRESIÓN"
+    if delta > tol:
+        return "mejora"
+    return "ok"
+
+def compare(base: dict, cur: dict, tol: float, min_wall: float) -> List[dict]:
+    """Filas del informe; delta > 0 = más rápido que la base."""
+    rows = []
+    for size, stages in cur.get("stages", {}).items():
+        bstages = base.get("stages", {}).get(size, {})
+        for stage, c in stages.items():
+            b = bstages.get(stage)
+            row = {"kind": "etapa", "size": size, "name": stage,
+                   "base": None, "cur": c.get("rows_per_s"), "unit": "filas/s", "delta": None,
+                   "tol": _tol(tol, b, c)}
+            if c.get("failed") and not c.get("n"):
+                row["status"] = "ERROR"
+            elif not b:
+                row["status"] = "nuevo"
+            elif c.get("rows_per_s") and b.get("rows_per_s"):
+                row.update(base=b["rows_per_s"], delta=c["rows_per_s"] / b["rows_per_s"] - 1)
+            elif c.get("wall_s") and b.get("wall_s"):
+                row.update(base=b["wall_s"], cur=c["wall_s"], unit="s", delta=b["wall_s"] / c["wall_s"] - 1)
+            if "status" not in row:
+                row["status"] = _verdict(row["delta"], row["tol"], noisy=(b or {}).get("wall_s", 0) < min_wall)
+            rows.append(row)
+    for name, c in cur.get("functions", {}).items():
+        b = base.get("functions", {}).get(name)
+        row = {"kind": "función", "size": "", "name": name,
+               "base": b.get("calls_per_s") if b else None, "cur": c.get("calls_per_s"),
+               "unit": "llamadas/s", "delta": None, "tol": _tol(tol, b, c)}
+        if b and b.get("calls_per_s") and c.get("calls_per_s"):
+            row["delta"] = c["calls_per_s"] / b["calls_per_s"] - 1
+        row["status"] = _verdict(row["delta"], row["tol"], noisy=False) if b else "nuevo"
+        rows.append(row)
+    return rows
+
+def meta_warnings(base: dict, cur: dict) -> List[str]:
+    bm, cm = base.get("meta", {}), cur.get("meta", {})
+    out = []
+    for k in META_KEYS:
+        if bm.get(k) != cm.get(k):
+            out.append(f"{k}: base={bm.get(k)} actual={cm.get(k)}")
+    return out
+
+def print_report(rows: List[dict], tol: float):
+    def num(v):
+        return f"{v:>12.1f}" if isinstance(v, (int, float)) else f"{'-':>12}"
+    print(f"\n{'tipo':<8} {'tamaño':>6} {'nombre':<34} {'base':>12} {'actual':>12} {'unidad':<10} {'Δ':>8} {'umbral':>7}  estado")
+    for r in rows:
+        d = f"{r['delta'] * 100:+7.1f}%" if r["delta"] is not None else f"{'-':>8}"
+        print(f"{r['kind']:<8} {r['size']:>6} {r['name']:<34} {num(r['base'])} {num(r['cur'])} {r['unit']:<10} {d} "
+              f"{r['tol'] * 100:6.0f}%  {r['status']}")
+    print(f"(tolerancia mínima ±{tol * 100:.0f} %, ampliada a la dispersión de las repeticiones; "
+          f"'ruido' = etapa por debajo de --min-wall, no bloquea)")
+
+# ---------------------------
+# Main
+# ---------------------------
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Compara el rendimiento actual con la línea base (sale != 0 si empeora).")
+    ap.add_argument("--baseline", default=str(BASELINE), help="Línea base JSON (versionada)")
+    ap.add_argument("--from", dest="from_json", default=None, help="Resultado(s) de bench.py ya medidos (sin medir de nuevo)")
+    ap.add_argument("--sizes", default="10k", help="Tamaños de corpus (como bench.py)")
+    ap.add_argument("--stages", default="all", help="'all', 'none' o lista de scripts separados por comas")
+    ap.add_argument("--no-funcs", action="store_true", help="No medir las funciones clave")
+    ap.add_argument("--func-samples", type=int, default=20000, help="Nombres para los micro-benchmarks")
+    ap.add_argument("--runs", type=int, default=3, help="Ejecuciones/repeticiones por medida (se usa la mediana)")
+    ap.add_argument("--tolerance", type=float, default=TOLERANCE, help="Caída relativa admitida (0.15 = 15 %%)")
+    ap.add_argument("--min-wall", type=float, default=MIN_WALL, help="Etapas con base más corta (s) no bloquean")
+    ap.add_argument("--update-baseline", action="store_true", help="Escribe la medición como nueva línea base")
+    args = ap.parse_args()
+
+    if args.from_json:
+        results = [json.loads(Path(p).read_text(encoding="utf-8")) for p in args.from_json.split(",")]
+        if len(results) == 1 and "runs" in results[0]:
+            results = None  # ya es un resumen de perf_gate (gate_latest.json o una línea base)
+    else:
+        sizes = [s.strip().lower() for s in args.sizes.split(",") if s.strip()]
+        if args.stages == "all":
+            stages = bench.default_stages()
+        elif args.stages == "none":
+            stages = []
+        else:
+            stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+        results = measure(sizes, stages, args.runs, args.func_samples, not args.no_funcs)
+    cur = summarize(results) if results else json.loads(Path(args.from_json).read_text(encoding="utf-8"))
+    cur["tolerance"] = args.tolerance
+    GATE_LATEST.parent.mkdir(parents=True, exist_ok=True)
+    GATE_LATEST.write_text(json.dumps(cur, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    base_path = Path(args.baseline)
+    if args.update_baseline:
+        base_path.parent.mkdir(parents=True, exist_ok=True)
+        base_path.write_text(json.dumps(cur, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print(f"[OK] Línea base actualizada → {base_path} (commit {cur['meta'].get('commit')})")
+        return 0
+    if not base_path.exists():
+        print(f"✖ No existe la línea base {base_path}. Créala con: python3 perf_gate.py --update-baseline")
+        return 2
+
+    base = json.loads(base_path.read_text(encoding="utf-8"))
+    for w in meta_warnings(base, cur):
+        print(f"[WARN] Entorno distinto de la base → {w}")
+    rows = compare(base, cur, args.tolerance, args.min_wall)
+    print_report(rows, args.tolerance)
+
+    bad = [r for r in rows if r["status"] in ("REGRESIÓN", "ERROR")]
+    if bad:
+        print(f"\n✖ {len(bad)} regresión(es): " + ", ".join(f"{r['name']}"
+              + (f" ({r['delta'] * 100:+.1f}%)" if r["delta"] is not None else " (error)") for r in bad))
+        return 1
+    print(f"\n[OK] Sin regresiones frente a {base_path.name} (base {base.get('meta', {}).get('commit')}).")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
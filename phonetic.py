@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+phonetic.py
+
+Claves fonéticas para apellidos castellanos/vascos: buena parte de los "near" que se
+calculaban con distancia de edición son variación ortográfica (v/b, y/i, c/z/s/ç,
+ch/tx, h muda, letras dobles): Echevarria/Etxebarria, Ozerin/Ocerin, Vgalde/Ugalde.
+
+- key(s)      → clave fina (conserva vocales): misma clave ⇔ misma pronunciación
+                aproximada. Se usa para resolver variantes con una búsqueda O(1) en un
+                índice clave → canónico.
+- skeleton(s) → esqueleto grueso (primera letra + consonantes de la clave): tolera
+                también cambios de vocal; para bloqueo (link_records.py).
+- key_column(serie) → columna de claves (calculada una vez por valor distinto).
+- build_index(canónicos, sinónimos) → {clave: canónico}; las claves que apuntan a
+                canónicos distintos se descartan (ambiguas: ahí decide la distancia).
+
+El índice de normalize_names.py y el de audit_surnames.py los compila rulepack.py
+(whitelist + sinónimos); la distancia de edición queda como último recurso.
+
+Uso:
+  python3 phonetic.py Echevarria Etxebarria Ozerin Ocerin Vgalde Ugalde
+"""
+
+from __future__ import annotations
+import re
+import sys
+import unicodedata
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Mapping, Optional
+
+# Orden importante: los dígrafos antes que las letras sueltas. 'C' (mayúscula) marca
+# el sonido ch/tx; al final todo pasa a minúsculas y, como ya no queda ninguna 'c'
+# ortográfica (→ s/k), 'c' en la clave significa siempre ch.
+_RULES = [
+    (r"^v(?=[^aeiou])", "u"),      # Vgalde → Ugalde (v por u inicial)
+    (r"ph", "f"),
+    (r"(?:tx|ch)", "C"),           # Etxebarria ~ Echebarria
+    (r"tz", "s"),                  # Aitzpurua ~ Aizpurua
+    (r"qu(?=[ei])", "k"),
+    (r"c(?=[ei])", "s"),           # Ocerin ~ Ozerin
+    (r"g(?=[ei])", "j"),
+    (r"[cqk]", "k"),
+    (r"z", "s"),
+    (r"x", "j"),                   # Ximeno ~ Jimeno
+    (r"h", ""),                    # h muda
+    (r"[vw]", "b"),                # Vengoechea ~ Bengoechea
+    (r"ll", "y"),
+    (r"y", "i"),                   # Pagalday ~ Pagaldai, Yrquiza ~ Irquiza
+    (r"(.)\1+", r"\1"),            # dobles: rr, ss, tt…
+]
+_RULES = [(re.compile(a), b) for a, b in _RULES]
+_NON_LETTER = re.compile(r"[^a-z]")
+_VOWELS = re.compile(r"[aeiou]")
+
+def _fold(s: str) -> str:
+    s = (s or "").lower().replace("ç", "z")  # ç = z antes de quitar la cedilla
+    s = "".join(c for c in unicodedata.normalize("NFD", s) if unicodedata.category(c) != "Mn")
+    return _NON_LETTER.sub("", s)
+
+@lru_cache(maxsize=1 << 16)
+def key(s: str) -> str:
+    """Clave fonética fina (minúsculas, sin espacios ni signos)."""
+    k = _fold(s)
+    for rx, rep in _RULES:
+        k = rx.sub(rep, k)
+    return k.lower()
+
+def skeleton(s: str) -> str:
+    """Primera letra + consonantes de la clave (más grueso que key)."""
+    k = key(s)
+    return k[:1] + _VOWELS.sub("", k[1:]) if k else ""
+
+def key_column(values, fn: Callable[[str], str] = key):
+    """Claves para una Series de pandas (fn se evalúa una vez por valor distinto)."""
+    import pandas as pd
+    s = values.fillna("").astype(str)
+    u = pd.unique(s.to_numpy())
+    return s.map(dict(zip(u, map(fn, u))))
+
+def build_index(canonicals: Iterable[str], synonyms: Optional[Mapping[str, str]] = None) -> Dict[str, str]:
+    """
+    {clave: canónico} a partir de los canónicos (y de las variantes de los sinónimos,
+    que apuntan a su canónico). Una clave con dos canónicos distintos no entra.
+    """
+    seen: Dict[str, str] = {}
+    ambiguous = set()
+
+    def add(k: str, canon: str):
+        if not k or k in ambiguous:
+            return
+        prev = seen.get(k)
+        if prev is None:
+            seen[k] = canon
+        elif _fold(prev) != _fold(canon):
+            ambiguous.add(k)
+            del seen[k]
+
+    for c in canonicals:
+        c = (c or "").strip()
+        if c:
+            add(key(c), c)
+    for variant, canon in (synonyms or {}).items():
+        canon = (canon or "").strip()
+        if canon:
+            add(key(variant), canon)
+            add(key(canon), canon)
+    return seen
+
+def main() -> int:
+    for w in sys.argv[1:]:
+        print(f"{w:<24} key={key(w):<20} skeleton={skeleton(w)}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
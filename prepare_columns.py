@@ -11,7 +11,6 @@ import re
 import unicodedata
 from pathlib import Path
 import pandas as pd
-from openpyxl import load_workbook
 
 IN_FILE  = "out/Zamacona_all_raw.xlsx"
 OUT_DIR  = Path("out")
@@ -38,13 +37,8 @@ def mini_norm(s: str) -> str:
     s = "".join(c for c in unicodedata.normalize("NFD", s) if unicodedata.category(c) != "Mn")
     return s
 
-def main():
-    OUT_DIR.mkdir(parents=True, exist_ok=True)
-    if not Path(IN_FILE).exists():
-        raise SystemExit(f"No encuentro {IN_FILE}")
-
-    # leer como texto y limpiar nombres de columnas
-    df = pd.read_excel(IN_FILE, dtype=str)
+def prepare_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Columnas __work/__items/__count, arkUrl y limpieza de ruido sobre un frame RAW."""
     df.columns = [re.sub(r"\s+", " ", str(c)).strip() for c in df.columns]
 
     # arkId válido
@@ -84,6 +78,15 @@ def main():
 
     # nueva columna vacía para rellenar luego
     df["childSpouseFullName"] = ""
+    return df
+
+def main():
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
+    if not Path(IN_FILE).exists():
+        raise SystemExit(f"No encuentro {IN_FILE}")
+
+    # leer como texto y limpiar nombres de columnas
+    df = prepare_frame(pd.read_excel(IN_FILE, dtype=str))
 
     # guardar base
     df.to_excel(OUT_XLSX, index=False)
@@ -92,6 +95,7 @@ def main():
     print(f"OK -> {OUT_CSV}")
 
     # hipervínculos en arkUrl (pero sin crear arkLink extra)
+    from openpyxl import load_workbook  # solo para el paso de exportación
     wb = load_workbook(OUT_XLSX)
     ws = wb.active
     headers = {cell.value: idx for idx, cell in enumerate(ws[1], start=1)}
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+rule_impact.py
+
+Vista previa del impacto de editar las tablas de normalize_names.py
+(GIVEN_MAP, SURNAME_SYNONYMS, WHITELIST_TOKENS, BLACKLIST_TOKENS, PROTECTED_NEAR)
+o el whitelist de apellidos (data/whitelist_surnames.txt) ANTES de relanzar la normalización.
+
+- Compara las tablas actuales con las guardadas en el caché (out/normalize_cache.json).
+- Con el índice invertido token → filas (out/normalize_cache_tokens.csv) localiza solo
+  las filas que contienen alguna clave cambiada y las recalcula (nada más).
+- Compara status antes/después (green/yellow/gray según flags) y escribe:
+    * out/rule_impact_preview.tsv  (arkId, old/new status, old/new fullName__work, motivo)
+- No toca el caché ni las salidas de normalize_names.py.
+
+Si cambió otra cosa del módulo (lógica, regex, funciones), el caché no sirve de
+referencia: se avisa y hay que relanzar la normalización completa.
+
+Uso:
+  python3 rule_impact.py            # resumen + TSV
+  python3 rule_impact.py --all      # incluye en el TSV filas afectadas que no cambian de status
+"""
+
+import sys
+import json
+from pathlib import Path
+
+import pandas as pd
+
+import norm_cache
+import normalize_names as nn
+
+OUT_DIR = Path("out")
+OUT_PREVIEW = OUT_DIR / "rule_impact_preview.tsv"
+
+def load_input() -> pd.DataFrame:
+    # el .csv hermano del prepared (si existe) es mucho más rápido de leer
+    src = Path(nn.IN_FILE)
+    csv = src.with_suffix(".csv")
+    df = pd.read_csv(csv, dtype=str) if csv.exists() else pd.read_excel(src, dtype=str)
+    df.columns = [nn.re.sub(r"\s+", " ", str(c)).strip() for c in df.columns]
+    return df
+
+def main():
+    show_all = "--all" in sys.argv
+    meta_path = nn.OUT_CACHE.with_suffix(".json")
+    if not (nn.OUT_CACHE.exists() and meta_path.exists()):
+        raise SystemExit("No hay caché de normalización (out/normalize_cache.*). Ejecuta antes normalize_names.py.")
+    if not Path(nn.IN_FILE).exists():
+        raise SystemExit(f"No encuentro {nn.IN_FILE}")
+
+    nn.load_surname_whitelist()
+    df = load_input()
+    work_cols = nn.find_work_cols(df)
+    if not work_cols:
+        raise SystemExit("No se encontraron columnas __work para procesar.")
+
+    cache = norm_cache.RowCache(nn.OUT_CACHE, nn.rules_version(), work_cols,
+                                work_cols + nn.FLAG_COLS + nn.split_cols_for(work_cols) + [norm_cache.TOKENS_COL],
+                                nn.rules_snapshot())
+    if not cache.load():
+        print(f"✖ El caché no sirve de referencia ({cache.stale_reason}): hace falta una normalización completa.")
+        return 1
+    if not cache.changed_tokens:
+        print("[OK] Las tablas de reglas no han cambiado desde la última normalización.")
+        return 0
+
+    meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    old_tables = meta.get("rules_tables", {})
+    for name in nn.TRACKED_TABLES:
+        a, b = old_tables.get(name, {}), cache.rules_tables.get(name, {})
+        added = sorted(set(b) - set(a))
+        removed = sorted(set(a) - set(b))
+        changed = sorted(k for k in set(a) & set(b) if a[k] != b[k])
+        if added or removed or changed:
+            print(f"[INFO] {name}: +{len(added)} -{len(removed)} ~{len(changed)}  "
+                  f"{', '.join((added + removed + changed)[:8])}{' …' if len(added + removed + changed) > 8 else ''}")
+
+    keys = norm_cache.row_keys(df, work_cols)
+    affected = keys.isin(cache.stale)
+    print(f"[INFO] {len(cache.changed_tokens)} claves cambiadas → {int(affected.sum())} filas afectadas de {len(df)}")
+    if not affected.any():
+        pd.DataFrame(columns=["arkId", "old_status", "new_status", "old_fullName__work", "new_fullName__work",
+                              "new_reason"]).to_csv(OUT_PREVIEW, sep="\t", index=False, encoding="utf-8")
+        print(f"[OK] Ninguna fila cambia → {OUT_PREVIEW}")
+        return 0
+
+    sub = df.loc[affected]
+    new = nn.compute_rows(sub, work_cols)
+    old = cache.table.loc[keys[affected].values]
+    old.index = sub.index
+
+    name_col = "fullName__work" if "fullName__work" in work_cols else work_cols[0]
+    rep = pd.DataFrame({
+        "arkId": sub["arkId"] if "arkId" in sub.columns else "",
+        "old_status": old.apply(nn._flags_to_status, axis=1),
+        "new_status": new.apply(nn._flags_to_status, axis=1),
+        "old_" + name_col: old[name_col],
+        "new_" + name_col: new[name_col],
+        "new_reason": new["blacklistReason"],
+    }, index=sub.index)
+    moved = rep["old_status"] != rep["new_status"]
+    text_changed = (old[work_cols].values != new[work_cols].values).any(axis=1)
+
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
+    (rep if show_all else rep[moved]).to_csv(OUT_PREVIEW, sep="\t", index=False, encoding="utf-8")
+
+    print(f"[OK] Filas afectadas: {len(rep)} | texto normalizado cambia: {int(text_changed.sum())} "
+          f"| cambian de status: {int(moved.sum())}")
+    if moved.any():
+        trans = rep[moved].groupby(["old_status", "new_status"]).size()
+        for (a, b), n in trans.items():
+            print(f"       {a:>6} → {b:<6} {n}")
+    print(f"[OK] Vista previa → {OUT_PREVIEW}")
+    return 0
+
+if __name__ == "__main__":
+    pd.options.mode.chained_assignment = None
+    sys.exit(main())
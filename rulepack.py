@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+rulepack.py
+
+Compilador del "rulepack": junta en un único artefacto versionado todas las reglas
+de nombres/apellidos que hoy viven repartidas:
+
+  - tablas de normalize_names.py (GIVEN_MAP, WHITELIST_TOKENS, PROTECTED_NEAR,
+    SURNAME_SYNONYMS, GIVEN_COMMON, SECOND_NAME_LIKE, BLACKLIST_*, TITLE_TOKENS,
+    MALE_FIRST, COMPOUND_2/COMPOUND_3),
+  - DEFAULT_BLACKLIST de find_zamacona_in_non_green.py,
+  - data/whitelist_surnames.txt, data/surname_synonyms.csv y data/reject_surnames.txt,
+    con UN solo sitio de carga (aquí) y la vista que espera cada script,
+  - el índice fonético clave → apellido canónico (phonetic.py) sobre whitelist + sinónimos:
+    completo para las sugerencias NEAR de audit_surnames.py; normalize_names.py solo usa
+    las claves de Zamacona (las que ya resolvía edit_distance).
+
+Las tablas se leen de los .py con ast.literal_eval (sin importar los módulos, ni
+pandas/openpyxl), así que los .py siguen siendo la fuente: se editan como siempre.
+
+El pack precalcula solo las estructuras de búsqueda que leen los scripts (unión
+SECOND_NAME_LIKE∪GIVEN_COMMON, árbol de compuestos, alternación de BLACKLIST_REGEX
+compilada, vistas de data/*) y lleva:
+  - 'hash'       sha256 del contenido (tablas + vistas de los data/*), para invalidar cachés,
+  - 'logic_hash' hash de la lógica de normalize_names.py SIN las tablas rastreadas
+                 (lo usa normalize_names.rules_version() para el caché por fila),
+  - 'sources'    sha1 de cada fichero fuente: si ninguno cambió, load() solo deserializa.
+
+Artefacto: out/rulepack.pkl (pickle). Cargarlo cuesta milisegundos.
+
+Uso:
+  python3 rulepack.py            # compila (si hace falta) y muestra un resumen
+  python3 rulepack.py --force    # recompila siempre
+"""
+
+from __future__ import annotations
+import ast
+import csv
+import sys
+import json
+import pickle
+import hashlib
+import re
+import unicodedata
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import phonetic
+from name_trie import build_trie
+
+ROOT = Path(__file__).resolve().parent
+DATA_DIR = ROOT / "data"
+OUT_PACK = ROOT / "out" / "rulepack.pkl"
+
+RULEPACK_VERSION = 3  # súbelo si cambia el formato o cómo se compila
+
+SRC_NORMALIZE = ROOT / "normalize_names.py"
+SRC_FINDZAM   = ROOT / "find_zamacona_in_non_green.py"
+
+NORMALIZE_TABLES = [
+    "GIVEN_MAP", "WHITELIST_TOKENS", "PROTECTED_NEAR", "SURNAME_SYNONYMS", "GIVEN_COMMON",
+    "SECOND_NAME_LIKE", "BLACKLIST_TOKENS", "BLACKLIST_PHRASES", "BLACKLIST_REGEX",
+    "TITLE_TOKENS", "MALE_FIRST", "COMPOUND_2", "COMPOUND_3",
+]
+
+def data_file(name: str, fallback_root: bool = False) -> Optional[Path]:
+    """data/<name>; con fallback_root también <raíz>/<name> (como find_zamacona_in_non_green)."""
+    for d in ([DATA_DIR, ROOT] if fallback_root else [DATA_DIR]):
+        if (d / name).exists():
+            return d / name
+    return None
+
+# ---------------------------
+# Normalizaciones de claves
+# ---------------------------
+
+def strip_accents(s: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFD", s or "") if unicodedata.category(c) != "Mn")
+
+def norm_token(s: str) -> str:
+    # como audit_surnames.norm_token
+    s = strip_accents((s or "").strip())
+    s = re.sub(r"[^\w\s\-']", " ", s)
+    s = re.sub(r"\s+", " ", s).strip()
+    return s
+
+def norm_words(s) -> str:
+    # como find_zamacona_in_non_green.norm
+    if s is None or s != s:
+        return ""
+    s = str(s).lower()
+    s = "".join(c for c in unicodedata.normalize("NFD", s) if unicodedata.category(c) != "Mn")
+    s = re.sub(r"[^a-z\s]", " ", s)
+    s = re.sub(r"\s+", " ", s).strip()
+    return s
+
+# ---------------------------
+# Lectura de tablas de los .py (sin importarlos)
+# ---------------------------
+
+def _assigns(tree: ast.Module, names) -> Dict[str, ast.AST]:
+    out = {}
+    for node in tree.body:
+        if isinstance(node, ast.Assign):
+            for t in node.targets:
+                if isinstance(t, ast.Name) and t.id in names:
+                    out[t.id] = node.value
+    return out
+
+def read_tables(path: Path, names: List[str]) -> Dict[str, object]:
+    tree = ast.parse(path.read_text(encoding="utf-8"))
+    found = _assigns(tree, set(names))
+    return {n: ast.literal_eval(found[n]) for n in names if n in found}
+
+def logic_hash(path: Path) -> str:
+    """Hash del módulo (AST, ignora comentarios) sin las asignaciones de TRACKED_TABLES."""
+    tree = ast.parse(path.read_text(encoding="utf-8"))
+    tracked = set(ast.literal_eval(_assigns(tree, {"TRACKED_TABLES"})["TRACKED_TABLES"]))
+    tree.body = [n for n in tree.body
+                 if not (isinstance(n, ast.Assign) and any(isinstance(t, ast.Name) and t.id in tracked for t in n.targets))]
+    return hashlib.sha1(ast.dump(tree).encode("utf-8")).hexdigest()
+
+# ---------------------------
+# Cargadores de data/* (uno por fichero; vistas por consumidor)
+# ---------------------------
+
+def load_listfile(path: Optional[Path]) -> List[str]:
+    """Líneas no vacías y sin comentario (#)."""
+    if not (path and path.exists()):
+        return []
+    return [ln.strip() for ln in path.read_text(encoding="utf-8").splitlines()
+            if ln.strip() and not ln.strip().startswith("#")]
+
+def whitelist_views(path: Optional[Path]) -> dict:
+    lines = path.read_text(encoding="utf-8").splitlines() if (path and path.exists()) else []
+    # normalize_names: sin acentos, minúsculas
+    canon = {strip_accents(line).strip().lower() for line in lines} - {""}
+    # audit_surnames: set lower + mapa lower → forma original
+    wl_lower, wl_map = set(), {}
+    for line in lines:
+        orig = line.strip()
+        if not orig:
+            continue
+        low = norm_token(orig).lower()
+        if low:
+            wl_lower.add(low)
+            wl_map.setdefault(low, orig)
+    return {"canon": canon, "audit_lower": wl_lower, "audit_map": wl_map}
+
+def synonyms_chain(path: Optional[Path]) -> dict:
+    """
+    Vista de audit_surnames: variant(lower normalizado) -> canonical (tal cual).
+    Tolera comentarios (#), cabecera, y cadenas A,B,C -> (A->B) y (B->C).
+    """
+    syn = {}
+    if not (path and path.exists()):
+        return syn
+    with open(path, "r", encoding="utf-8") as f:
+        for raw in f:
+            line = raw.strip()
+            if not line:
+                continue
+            if "#" in line:
+                line = line.split("#", 1)[0].strip()
+                if not line:
+                    continue
+            parts = [p.strip() for p in line.split(",")]
+            if parts and parts[0].lower() == "variant":
+                continue
+            parts = [p for p in parts if p]
+            if len(parts) < 2:
+                continue
+            prev = parts[0]
+            for nxt in parts[1:]:
+                v = norm_token(prev).lower()
+                c = nxt.strip()
+                if v and c:
+                    syn[v] = c
+                prev = nxt
+    return syn
+
+def synonyms_strength(path: Optional[Path]) -> tuple:
+    """
+    Vista de find_zamacona_in_non_green: (strong, weak) con norm().
+    Separador autodetectado, columnas con nombres variados (synonym|alias|value|surname|name,
+    strength|type|class|tier|level); sin columna de fuerza, todo 'weak'.
+    """
+    strong, weak = set(), set()
+    if not (path and path.exists()):
+        return strong, weak
+    try:
+        import pandas as pd
+        df = pd.read_csv(path, engine="python", sep=None, dtype=str, keep_default_na=False,
+                         comment="#", on_bad_lines="skip")
+        col_syn = next((c for c in df.columns if c.lower() in ("synonym","alias","value","surname","name")), None)
+        col_str = next((c for c in df.columns if c.lower() in ("strength","type","class","tier","level")), None)
+        if col_syn is None:
+            col_syn = df.columns[0]
+        if col_str is None:
+            for v in df[col_syn]:
+                vv = norm_words(v)
+                if vv:
+                    weak.add(vv)
+        else:
+            for _, row in df.iterrows():
+                syn = norm_words(row[col_syn])
+                if not syn:
+                    continue
+                strength = str(row[col_str]).strip().lower()
+                if strength == "strong":
+                    strong.add(syn)
+                elif strength == "weak":
+                    weak.add(syn)
+                else:
+                    tokens = {str(x).strip().lower() for x in row.tolist() if str(x).strip()}
+                    (strong if "strong" in tokens else weak).add(syn)
+        return strong, weak
+    except Exception:
+        skipped = 0
+        with open(path, "r", encoding="utf-8") as f:
+            sample = f.read()
+            f.seek(0)
+            if "\t" in sample:
+                delim = "\t"
+            elif ";" in sample and sample.count(";") >= sample.count(","):
+                delim = ";"
+            else:
+                delim = ","
+            for raw in csv.reader(f, delimiter=delim):
+                if not raw:
+                    continue
+                row = [c.strip() for c in raw if c is not None]
+                if len(row) == 0 or row[0].startswith("#"):
+                    continue
+                low = [c.strip().lower() for c in row]
+                syn = norm_words(row[0]) if row[0] else ""
+                if not syn:
+                    skipped += 1
+                    continue
+                if "strong" in low:
+                    strong.add(syn)
+                elif "weak" in low:
+                    weak.add(syn)
+                elif len(row) >= 2 and row[1].strip().lower() == "strong":
+                    strong.add(syn)
+                else:
+                    weak.add(syn)
+        if skipped:
+            print(f"[WARN] surname_synonyms: {skipped} líneas saltadas por vacías/sin 'synonym'.")
+        return strong, weak
+
+# ---------------------------
+# Compilación
+# ---------------------------
+
+def source_files() -> Dict[str, Optional[Path]]:
+    return {
+        "normalize_names.py": SRC_NORMALIZE,
+        "find_zamacona_in_non_green.py": SRC_FINDZAM,
+        "rulepack.py": Path(__file__).resolve(),
+        "name_trie.py": ROOT / "name_trie.py",
+        "phonetic.py": ROOT / "phonetic.py",
+        "data/whitelist_surnames.txt": data_file("whitelist_surnames.txt"),
+        "data/surname_synonyms.csv": data_file("surname_synonyms.csv"),
+        "zam:whitelist_surnames.txt": data_file("whitelist_surnames.txt", fallback_root=True),
+        "zam:surname_synonyms.csv": data_file("surname_synonyms.csv", fallback_root=True),
+        "zam:reject_surnames.txt": data_file("reject_surnames.txt", fallback_root=True),
+    }
+
+def fingerprint() -> Dict[str, Optional[str]]:
+    fp = {"version": str(RULEPACK_VERSION)}
+    for name, p in source_files().items():
+        fp[name] = f"{p}:{hashlib.sha1(p.read_bytes()).hexdigest()}" if p and p.exists() else None
+    return fp
+
+def _jsonable(x):
+    if isinstance(x, dict):
+        return {str(k): _jsonable(v) for k, v in sorted(x.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(x, (set, frozenset)):
+        return sorted((_jsonable(v) for v in x), key=lambda v: json.dumps(v, ensure_ascii=False))
+    if isinstance(x, (list, tuple)):
+        return [_jsonable(v) for v in x]
+    return x
+
+def compile_pack() -> dict:
+    t = read_tables(SRC_NORMALIZE, NORMALIZE_TABLES)
+    zam = read_tables(SRC_FINDZAM, ["DEFAULT_BLACKLIST"])
+
+    wl = whitelist_views(data_file("whitelist_surnames.txt"))
+    syn_chain = synonyms_chain(data_file("surname_synonyms.csv"))
+    zam_wl = {norm_words(x) for x in load_listfile(data_file("whitelist_surnames.txt", fallback_root=True))}
+    zam_strong, zam_weak = synonyms_strength(data_file("surname_synonyms.csv", fallback_root=True))
+    zam_reject = {norm_words(x) for x in load_listfile(data_file("reject_surnames.txt", fallback_root=True))}
+
+    compounds = set(t.get("COMPOUND_2", set())) | set(t.get("COMPOUND_3", set()))
+    pack = {
+        "version": RULEPACK_VERSION,
+        # tablas tal cual (fuente)
+        "tables": t,
+        "logic_hash": logic_hash(SRC_NORMALIZE),
+        # normalize_names
+        "surname_canon": frozenset(wl["canon"]),
+        "second_or_given": frozenset(t.get("SECOND_NAME_LIKE", set()) | t.get("GIVEN_COMMON", set())),
+        "compound_trie": build_trie(compounds),  # name_trie.TokenTrie(root)
+        "blacklist_regex_any": re.compile("|".join(f"(?:{p})" for p in t.get("BLACKLIST_REGEX", [])) or r"(?!x)x"),
+        # audit_surnames
+        "audit_whitelist": (wl["audit_lower"], wl["audit_map"]),
+        "audit_synonyms": syn_chain,
+        # normalize_names + audit_surnames: clave fonética → forma canónica
+        "phonetic_index": phonetic.build_index(wl["audit_map"].values(), syn_chain),
+        # find_zamacona_in_non_green
+        "zam_whitelist": zam_wl,
+        "zam_strong_syns": zam_strong,
+        "zam_weak_syns": zam_weak,
+        "zam_blacklist": set(zam.get("DEFAULT_BLACKLIST", set())) | zam_reject,
+    }
+    content = {k: v for k, v in pack.items()
+               if k not in ("compound_trie", "blacklist_regex_any")}
+    pack["hash"] = hashlib.sha256(json.dumps(_jsonable(content), ensure_ascii=False, sort_keys=True)
+                                  .encode("utf-8")).hexdigest()
+    pack["sources"] = fingerprint()
+    return pack
+
+_LOADED: Optional[dict] = None
+
+def load(force: bool = False) -> dict:
+    """Pack vigente: deserializa out/rulepack.pkl si sus fuentes no han cambiado; si no, recompila y guarda."""
+    global _LOADED
+    fp = fingerprint()
+    if not force and _LOADED is not None and _LOADED.get("sources") == fp:
+        return _LOADED
+    pack = None
+    if not force and OUT_PACK.exists():
+        try:
+            with open(OUT_PACK, "rb") as f:
+                pack = pickle.load(f)
+        except Exception:
+            pack = None
+        if pack is not None and pack.get("sources") != fp:
+            pack = None
+    if pack is None:
+        pack = compile_pack()
+        OUT_PACK.parent.mkdir(parents=True, exist_ok=True)
+        tmp = OUT_PACK.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(pack, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp.replace(OUT_PACK)
+    _LOADED = pack
+    return pack
+
+def main() -> int:
+    import time
+    t0 = time.perf_counter()
+    pack = load(force="--force" in sys.argv)
+    ms = (time.perf_counter() - t0) * 1000
+    print(f"[OK] {OUT_PACK}  v{pack['version']}  hash={pack['hash'][:16]}  ({ms:.1f} ms)")
+    for name, tbl in pack["tables"].items():
+        print(f"       {name:<18} {len(tbl):>5}")
+    print(f"       {'whitelist (data)':<18} {len(pack['surname_canon']):>5}")
+    print(f"       {'synonyms (data)':<18} {len(pack['audit_synonyms']):>5}")
+    print(f"       {'phonetic index':<18} {len(pack['phonetic_index']):>5}")
+    print(f"       {'zam blacklist':<18} {len(pack['zam_blacklist']):>5}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,11 +12,19 @@ Modos:
 Otros flags:
   --with-patches : inserta patch_* tras normalize_names.py
   --continue     : no detiene la cadena al primer error
+  --watch        : modo vigilancia (watch_raw.py): ingiere incrementalmente los RAW nuevos
+                   de la carpeta autodetectada hasta Ctrl+C (no ejecuta la cadena completa)
+  --no-metrics   : no registra métricas por etapa (por defecto se añaden a out/pipeline_metrics.jsonl:
+                   wall, CPU user/sys, RSS pico, bytes E/S y filas; ver stage_metrics.py)
+  --startup-report : mide el tiempo de import de cada etapa (startup_report.py, presupuesto
+                     200 ms hasta el primer trabajo útil) y sale sin ejecutar la cadena
+                     (código 1 si alguna etapa supera el presupuesto; pandas/numpy no cuentan)
 """
 
 from __future__ import annotations
 import subprocess
 import sys
+import time
 from pathlib import Path
 from typing import List, Optional
 from shutil import copy2
@@ -54,6 +62,7 @@ ANALYSIS_BASE: List[str] = [
     "check_dedup.py",
     "count_raw.py",
     "canonicalize_strict_dupes.py",
+    "link_records.py",      # misma persona con distinto arkId (enlace probabilístico)
     # "analyze_duplicates.py",  # si lo quieres, descomenta
 ]
 
@@ -84,6 +93,27 @@ def run(cmd: list[str]) -> int:
         print(f"✖ Error ejecutando {cmd}: {e}")
         return 1
 
+def raw_files(raw_args: Optional[List[str]]) -> List[Path]:
+    if not raw_args:
+        return []
+    base, pattern = Path(raw_args[raw_args.index("--dir") + 1]), raw_args[raw_args.index("--glob") + 1]
+    return sorted(base.glob(pattern))
+
+def run_stage(script: str, cmd: list[str], run_id: str, inputs: Optional[List[Path]] = None) -> int:
+    """Como run(), pero registrando las métricas de la etapa (stage_metrics.py)."""
+    import stage_metrics
+    print(f"\n──▶ Ejecutando: {' '.join(cmd)}")
+    try:
+        rc, m = stage_metrics.measure_stage(script, cmd, run_id, ROOT, inputs)
+    except Exception as e:
+        print(f"✖ Error ejecutando {cmd}: {e}")
+        return 1
+    cpu = f" | cpu {m['user_s']:.1f}+{m['sys_s']:.1f}s | rss {m['max_rss_mb']:.0f} MB" if "user_s" in m else ""
+    rows = f" | filas {m['rows_in'] if m['rows_in'] is not None else '-'}→{m['rows_out']}" \
+        if m["rows_out"] is not None else ""
+    print(f"──■ Código de salida: {rc} | {m['wall_s']:.1f}s{cpu}{rows}")
+    return rc
+
 def promote_enhanced_to_patched():
     promoted = False
     if ENH_XLSX.exists():
@@ -112,9 +142,24 @@ def main() -> int:
     mode_apply = has_flag("--apply")
     with_patches = has_flag("--with-patches")
     allow_continue = has_flag("--continue")
+    with_metrics = not has_flag("--no-metrics")
+    run_id = time.strftime("%Y%m%d-%H%M%S")
 
     OUT.mkdir(exist_ok=True)
 
+    if has_flag("--watch"):
+        raw_args = detect_raw_args()
+        if not raw_args:
+            print("✖ No se encontraron RAW en (., raw/, data/, data/raw/, inputs/).")
+            return 1
+        print(f"[INFO] Modo vigilancia sobre: {' '.join(raw_args)}")
+        return run([PY, str(ROOT / "watch_raw.py")] + raw_args)
+
+    if has_flag("--startup-report"):
+        import startup_report
+        over = startup_report.report(build_order(with_patches, mode_apply) + startup_report.TOOLS)
+        return 1 if over else 0
+
     order = build_order(with_patches, mode_apply)
     print("Modo:", "APPLY" if mode_apply else "LOGS (dry-run)")
     print("Fase:", "NORMAL+PATCHES" if with_patches else "NORMAL")
@@ -146,7 +191,10 @@ def main() -> int:
         else:
             cmd = [PY, str(path)]
 
-        rc = run(cmd)
+        if with_metrics:
+            rc = run_stage(script, cmd, run_id, raw_files(raw_args) if script == "consolidate_raw.py" else None)
+        else:
+            rc = run(cmd)
         if rc != 0:
             overall_rc = rc
             print(f"✖ Falló: {script}")
@@ -158,6 +206,8 @@ def main() -> int:
                 # Promueve enhanced → patched para que el resto consuma la versión enriquecida
                 promote_enhanced_to_patched()
 
+    if with_metrics:
+        print(f"[INFO] Métricas (run {run_id}) → {OUT / 'pipeline_metrics.jsonl'}")
     print("\n✅ Pipeline finalizado.")
     return overall_rc
 
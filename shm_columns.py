@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+shm_columns.py
+
+Transporte de columnas en memoria compartida (multiprocessing.shared_memory) para las
+etapas multiproceso (normalize_names.py --jobs, check_dedup_strict.py --jobs,
+audit_surnames.py --jobs): el padre publica las columnas UNA vez y cada proceso del pool
+se adjunta por nombre sin copiar el bloque; solo viajan por pickle los handles (dicts
+pequeños) y los rangos de filas.
+
+Formato por columna (un bloque /dev/shm cada una):
+  - texto:   [n+1 offsets int64][bytes UTF-8 concatenados]   (nulos/NaN → "")
+  - números: array numpy tal cual (hashes uint64, distancias int32, flags int64…)
+
+Padre:
+  with SharedColumns() as sc:
+      sc.put_strings("fullName__work", valores)
+      res = sc.alloc("dist", n, "int32")      # resultado que rellenan los workers por rango
+      ... pool.map(tarea, [(sc.handle, start, stop), ...]) ...
+  (al salir: close + unlink de todo)
+
+Worker:
+  view = attach(handle)                         # una vez por proceso (se cachea)
+  view.strings("fullName__work", start, stop)   # decodifica solo ese rango
+  view.array("dist")[start:stop] = ...          # escribe sin copia
+  return publish_frame(df)                      # resultado de tamaño variable → take_frame() en el padre
+"""
+
+from __future__ import annotations
+from multiprocessing import shared_memory
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+_ATTACHED: Dict[str, "ColumnView"] = {}  # por proceso: nombre del primer bloque → vista
+
+# ---------------------------
+# Codificación
+# ---------------------------
+
+def _encode(values: Iterable) -> tuple:
+    enc = [b"" if v is None or (isinstance(v, float) and v != v) else str(v).encode("utf-8") for v in values]
+    offs = np.zeros(len(enc) + 1, dtype=np.int64)
+    if enc:
+        np.cumsum(np.fromiter((len(b) for b in enc), dtype=np.int64, count=len(enc)), out=offs[1:])
+    return offs, b"".join(enc)
+
+def _new_block(nbytes: int) -> shared_memory.SharedMemory:
+    return shared_memory.SharedMemory(create=True, size=max(1, nbytes))
+
+def _write_strings(values: Iterable) -> tuple:
+    offs, data = _encode(values)
+    shm = _new_block(offs.nbytes + len(data))
+    shm.buf[:offs.nbytes] = offs.tobytes()
+    shm.buf[offs.nbytes:offs.nbytes + len(data)] = data
+    return shm, {"kind": "str", "shm": shm.name, "n": len(offs) - 1}
+
+def _write_array(arr: np.ndarray) -> tuple:
+    arr = np.ascontiguousarray(arr)
+    shm = _new_block(arr.nbytes)
+    np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+    return shm, {"kind": "array", "shm": shm.name, "n": len(arr), "dtype": arr.dtype.str}
+
+def _int_column(s: pd.Series) -> Optional[np.ndarray]:
+    """Columna entera (int64 o object con solo ints) → ndarray; si no, None (va como texto)."""
+    if pd.api.types.is_integer_dtype(s.dtype):
+        return s.to_numpy(dtype=np.int64)
+    if s.dtype == object and len(s) and all(type(v) is int for v in s):
+        return s.to_numpy(dtype=np.int64)
+    return None
+
+# ---------------------------
+# Lado del padre
+# ---------------------------
+
+class SharedColumns:
+    """Bloques creados por este proceso; se liberan (close + unlink) al salir del with."""
+
+    def __init__(self):
+        self._blocks: List[shared_memory.SharedMemory] = []
+        self.handle: Dict[str, dict] = {}
+
+    def put_strings(self, name: str, values: Iterable):
+        shm, meta = _write_strings(values)
+        self._blocks.append(shm)
+        self.handle[name] = meta
+
+    def put_array(self, name: str, arr: np.ndarray):
+        shm, meta = _write_array(np.asarray(arr))
+        self._blocks.append(shm)
+        self.handle[name] = meta
+
+    def put_frame(self, df: pd.DataFrame, cols: List[str]):
+        for c in cols:
+            self.put_strings(c, df[c].tolist())
+
+    def alloc(self, name: str, n: int, dtype="int64") -> np.ndarray:
+        """Array de resultados (a ceros) que los workers rellenan por rango; devuelve la vista del padre."""
+        dt = np.dtype(dtype)
+        shm = _new_block(n * dt.itemsize)
+        self._blocks.append(shm)
+        self.handle[name] = {"kind": "array", "shm": shm.name, "n": n, "dtype": dt.str}
+        arr = np.ndarray((n,), dtype=dt, buffer=shm.buf)
+        arr[...] = 0
+        return arr
+
+    def array(self, name: str) -> np.ndarray:
+        meta = self.handle[name]
+        shm = next(b for b in self._blocks if b.name == meta["shm"])
+        return np.ndarray((meta["n"],), dtype=np.dtype(meta["dtype"]), buffer=shm.buf)
+
+    def close(self):
+        for shm in self._blocks:
+            shm.close()
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# ---------------------------
+# Lado del worker
+# ---------------------------
+
+class ColumnView:
+    """Columnas de un handle, adjuntadas sin copia."""
+
+    def __init__(self, handle: Dict[str, dict]):
+        self.handle = handle
+        self._shm = {name: shared_memory.SharedMemory(name=meta["shm"]) for name, meta in handle.items()}
+
+    def __len__(self):
+        return next(iter(self.handle.values()))["n"] if self.handle else 0
+
+    def strings(self, name: str, start: int = 0, stop: Optional[int] = None) -> List[str]:
+        meta, buf = self.handle[name], self._shm[name].buf
+        n = meta["n"]
+        stop = n if stop is None else min(stop, n)
+        offs = np.ndarray((n + 1,), dtype=np.int64, buffer=buf)
+        base = 8 * (n + 1)
+        o = offs[start:stop + 1].tolist()
+        data = bytes(buf[base + o[0]:base + o[-1]])
+        b0 = o[0]
+        return [data[a - b0:b - b0].decode("utf-8") for a, b in zip(o, o[1:])]
+
+    def array(self, name: str) -> np.ndarray:
+        meta = self.handle[name]
+        return np.ndarray((meta["n"],), dtype=np.dtype(meta["dtype"]), buffer=self._shm[name].buf)
+
+    def frame(self, cols: List[str], start: int = 0, stop: Optional[int] = None) -> pd.DataFrame:
+        """Filas [start, stop) de las columnas pedidas; índice posicional (start…)."""
+        stop = len(self) if stop is None else min(stop, len(self))
+        data = {}
+        for c in cols:
+            if self.handle[c]["kind"] == "str":
+                data[c] = self.strings(c, start, stop)
+            else:
+                data[c] = self.array(c)[start:stop].copy()
+        return pd.DataFrame(data, index=pd.RangeIndex(start, stop), columns=cols)
+
+    def close(self):
+        for shm in self._shm.values():
+            shm.close()
+        self._shm = {}
+
+def attach(handle: Dict[str, dict]) -> ColumnView:
+    """Vista de un handle; se adjunta una sola vez por proceso (las tareas siguientes la reutilizan)."""
+    key = ",".join(sorted(m["shm"] for m in handle.values()))
+    view = _ATTACHED.get(key)
+    if view is None:
+        view = _ATTACHED[key] = ColumnView(handle)
+    return view
+
+# ---------------------------
+# Resultados de tamaño variable (worker → padre)
+# ---------------------------
+
+def publish_frame(df: pd.DataFrame) -> dict:
+    """Worker: copia df a bloques nuevos (enteros como int64, el resto como texto) y devuelve su handle.
+    El worker solo cierra su mapeo; el padre los lee y libera con take_frame()."""
+    cols = {}
+    for c in df.columns:
+        arr = _int_column(df[c])
+        shm, meta = _write_array(arr) if arr is not None else _write_strings(df[c].tolist())
+        shm.close()
+        cols[c] = meta
+    return {"columns": list(df.columns), "meta": cols, "n": len(df)}
+
+def take_frame(res: dict) -> pd.DataFrame:
+    """Padre: reconstruye el frame publicado por un worker y libera sus bloques."""
+    view = ColumnView(res["meta"])
+    try:
+        data = {}
+        for c in res["columns"]:
+            if view.handle[c]["kind"] == "str":
+                data[c] = view.strings(c)
+            else:
+                data[c] = view.array(c).copy()
+        return pd.DataFrame(data, index=pd.RangeIndex(res["n"]), columns=res["columns"])
+    finally:
+        for shm in view._shm.values():
+            shm.close()
+            shm.unlink()
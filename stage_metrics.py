@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+stage_metrics.py
+
+Métricas de recursos por etapa del pipeline (las recoge run_pipeline.py).
+
+Por cada script lanzado se añade UNA línea JSON a out/pipeline_metrics.jsonl:
+  run_id, stage, rc, start, wall_s,
+  user_s, sys_s, max_rss_mb      (rusage del propio hijo vía os.wait4; en
+                                  plataformas sin wait4 solo wall_s)
+  in_bytes, rows_in              (artefacto principal de entrada de la etapa)
+  out_bytes, out_files, rows_out (ficheros de out/ creados o modificados por la
+                                  etapa; rows_out = su artefacto principal)
+
+Recuento de filas sin pandas: .csv/.tsv/.txt por saltos de línea (menos la
+cabecera en csv/tsv); .xlsx por la etiqueta <dimension> de la hoja (o por su
+.csv hermano si existe).
+
+summarize_logs.py lee el fichero con load_metrics() y pinta la tendencia.
+"""
+
+from __future__ import annotations
+import os
+import re
+import sys
+import json
+import time
+import zipfile
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parent
+OUT = ROOT / "out"
+METRICS_FILE = OUT / "pipeline_metrics.jsonl"
+
+# Artefacto principal de entrada por etapa (el primero que exista; rutas relativas a ROOT).
+# Salidas: se detectan solas (snapshot de out/ antes/después).
+STAGE_INPUTS: Dict[str, List[str]] = {
+    "prepare_columns.py":             ["out/Zamacona_all_raw.xlsx"],
+    "consolidate.py":                 ["out/Zamacona_all_raw.xlsx"],
+    "normalize_names.py":             ["out/Zamacona_prepared.xlsx", "out/Zamacona_all.xlsx"],
+    "audit_surnames.py":              ["out/Zamacona_normalized.xlsx"],
+    "mark_rejected_surnames.py":      ["out/Zamacona_normalized.xlsx"],
+    "find_zamacona_in_non_green.py":  ["out/Zamacona_normalized.xlsx"],
+    "infer_surnames_from_parents.py": ["out/Zamacona_normalized_patched.xlsx", "out/Zamacona_normalized.xlsx"],
+    "only_green_surnames.py":         ["out/Zamacona_normalized_patched.xlsx", "out/Zamacona_normalized.xlsx"],
+    "finalize_output.py":             ["out/Zamacona_normalized_patched.xlsx", "out/Zamacona_normalized.xlsx"],
+    "check_dedup.py":                 ["out/Zamacona_all_raw.xlsx"],
+    "canonicalize_strict_dupes.py":   ["out/Zamacona_normalized_patched.xlsx", "out/Zamacona_normalized.xlsx",
+                                       "out/Zamacona_all_raw.xlsx"],
+    "analyze_duplicates.py":          ["out/Zamacona_normalized_patched.xlsx"],
+}
+
+DIM_RX = re.compile(rb'<dimension ref="[A-Z]+\d+(?::[A-Z]+(\d+))?"')
+
+# ---------------------------
+# Ficheros
+# ---------------------------
+
+def snapshot(folder: Path) -> Dict[str, Tuple[int, int]]:
+    """{ruta relativa: (bytes, mtime_ns)} de todo lo que cuelga de folder."""
+    out: Dict[str, Tuple[int, int]] = {}
+    if not folder.exists():
+        return out
+    for p in folder.rglob("*"):
+        if p.is_file():
+            st = p.stat()
+            out[str(p.relative_to(folder))] = (st.st_size, st.st_mtime_ns)
+    return out
+
+def changed_files(before: Dict[str, Tuple[int, int]], after: Dict[str, Tuple[int, int]]) -> List[str]:
+    return sorted(k for k, v in after.items() if before.get(k) != v)
+
+def xlsx_rows(path: Path) -> Optional[int]:
+    try:
+        from xlsx_stream import sheet_member
+        with zipfile.ZipFile(path) as zf:
+            with zf.open(sheet_member(zf)) as f:
+                m = DIM_RX.search(f.read(4096))
+    except Exception:
+        return None
+    if not m:
+        return None
+    return max(int(m.group(1) or 1) - 1, 0)  # sin cabecera
+
+def text_rows(path: Path) -> int:
+    n = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            n += chunk.count(b"\n")
+    if path.suffix.lower() in (".csv", ".tsv"):
+        n -= 1
+    return max(n, 0)
+
+def count_rows(path: Path) -> Optional[int]:
+    """Filas de datos de un artefacto (aprox. en CSV con saltos de línea dentro de celdas)."""
+    path = Path(path)
+    if not path.exists():
+        return None
+    suf = path.suffix.lower()
+    if suf == ".xlsx":
+        sib = path.with_suffix(".csv")
+        if sib.exists():
+            return text_rows(sib)
+        return xlsx_rows(path)
+    if suf in (".csv", ".tsv", ".txt"):
+        return text_rows(path)
+    return None
+
+def stage_input(stage: str, root: Path = ROOT) -> Optional[Path]:
+    for rel in STAGE_INPUTS.get(stage, []):
+        p = Path(root) / rel
+        if p.exists():
+            return p
+    return None
+
+def main_output(files: List[str], out_dir: Path = OUT) -> Optional[Path]:
+    """Artefacto principal de salida: el Zamacona_*.xlsx/.csv más grande; si no hay, la tabla
+    (.xlsx/.csv/.tsv) más grande; si tampoco, el fichero más grande (cachés e índices aparte)."""
+    paths = [out_dir / f for f in files if (out_dir / f).exists() and "cache" not in f and not f.startswith("index")]
+    if not paths:
+        return None
+    tables = [p for p in paths if p.suffix.lower() in (".xlsx", ".csv", ".tsv")]
+    main = [p for p in tables if p.name.startswith("Zamacona_")]
+    return max(main or tables or paths, key=lambda p: p.stat().st_size)
+
+# ---------------------------
+# Ejecución medida
+# ---------------------------
+
+def _rss_mb(maxrss: int) -> float:
+    # Linux: KiB; macOS: bytes
+    return maxrss / (1024 * 1024) if sys.platform == "darwin" else maxrss / 1024
+
+def run_measured(cmd: List[str], cwd: Path, log=None) -> Tuple[int, Dict[str, float]]:
+    """Lanza cmd y devuelve (rc, {wall_s, user_s, sys_s, max_rss_mb}) del hijo.
+    log: fichero abierto al que redirigir stdout/stderr del hijo (None = consola)."""
+    t0 = time.perf_counter()
+    p = subprocess.Popen(cmd, cwd=str(cwd), stdout=log, stderr=subprocess.STDOUT if log else None)
+    usage: Dict[str, float] = {}
+    if hasattr(os, "wait4"):
+        try:
+            _, status, ru = os.wait4(p.pid, 0)
+        except KeyboardInterrupt:
+            p.kill()
+            raise
+        p.returncode = os.waitstatus_to_exitcode(status)
+        usage = {"user_s": round(ru.ru_utime, 3), "sys_s": round(ru.ru_stime, 3),
+                 "max_rss_mb": round(_rss_mb(ru.ru_maxrss), 1)}
+    else:
+        p.wait()
+    usage["wall_s"] = round(time.perf_counter() - t0, 3)
+    return p.returncode, usage
+
+def measure_stage(stage: str, cmd: List[str], run_id: str, cwd: Path = ROOT,
+                  inputs: Optional[List[Path]] = None, log=None) -> Tuple[int, dict]:
+    """Ejecuta la etapa, calcula E/S y filas y añade la línea a <cwd>/out/pipeline_metrics.jsonl.
+    inputs: entradas explícitas (p.ej. los RAW de consolidate_raw.py); si no, STAGE_INPUTS."""
+    out_dir = Path(cwd) / "out"
+    metrics_file = out_dir / METRICS_FILE.name
+    src = stage_input(stage, cwd)
+    in_bytes = src.stat().st_size if src else 0
+    if inputs:
+        in_bytes = sum(p.stat().st_size for p in inputs if p.exists())
+    before = snapshot(out_dir)
+    start = time.strftime("%Y-%m-%d %H:%M:%S")
+    rc, usage = run_measured(cmd, cwd, log)
+    after = snapshot(out_dir)
+    files = [f for f in changed_files(before, after) if f != METRICS_FILE.name]
+    main_out = main_output(files, out_dir)
+    rec = {
+        "run_id": run_id,
+        "stage": stage,
+        "rc": rc,
+        "start": start,
+        **usage,
+        "input": f"{len(inputs)} ficheros" if inputs else (src.name if src else ""),
+        "in_bytes": in_bytes,
+        "rows_in": None if inputs else (count_rows(src) if src else None),
+        "out_files": len(files),
+        "out_bytes": sum(after[f][0] for f in files),
+        "output": main_out.name if main_out else "",
+        "rows_out": count_rows(main_out) if main_out else None,
+    }
+    append(rec, metrics_file)
+    return rc, rec
+
+def append(rec: dict, path: Path = METRICS_FILE):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+
+def load_metrics(path: Path = METRICS_FILE) -> List[dict]:
+    """Todas las líneas válidas del fichero (en orden de escritura)."""
+    if not path.exists():
+        return []
+    out = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                out.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue  # línea truncada (p.ej. ejecución interrumpida)
+    return out
+
+def fmt_bytes(n: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(n) < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GB"
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+startup_report.py
+
+Presupuesto de arranque por etapa: cuánto tarda cada script del pipeline en
+importar sus dependencias antes de empezar a trabajar.
+
+- Por script se extraen los imports de nivel de módulo (ast; sin ejecutar el
+  script) y se lanzan en un intérprete limpio con `python -X importtime`.
+- Se cuenta solo lo que importa el script (no el arranque del propio intérprete).
+- Informe: total por etapa, módulos más pesados (tiempo acumulado) y aviso si
+  se supera el presupuesto (por defecto 200 ms). Los imports diferidos dentro de
+  funciones (openpyxl al exportar, pandas en rutas lentas...) no cuentan: no
+  retrasan el primer trabajo útil de la etapa.
+- pandas/numpy (ALLOWED, --allow) se informan pero no cuentan contra el presupuesto:
+  las etapas de datos los necesitan sí o sí; lo que se vigila es lo que se añade encima.
+- Código de salida: 0 si todas las etapas caben en el presupuesto; 1 si alguna lo
+  supera (para usarlo como puerta en CI).
+
+Uso:
+  python3 startup_report.py                       # etapas de run_pipeline.py + utilidades (TOOLS)
+  python3 startup_report.py normalize_names.py    # solo esas
+  python3 startup_report.py --runs 5 --top 8 --budget 150
+  python3 startup_report.py --allow ""             # sin exenciones (pandas también cuenta)
+  python3 run_pipeline.py --startup-report        # mismo informe, etapas del orden del pipeline
+"""
+
+from __future__ import annotations
+import argparse
+import ast
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent
+PY = sys.executable
+
+BUDGET_MS = 200.0
+ALLOWED = ("pandas", "numpy")  # módulos de primer nivel exentos del presupuesto
+MARK = "--startup-report--"
+
+# utilidades fuera de la cadena que también deben arrancar rápido
+TOOLS = ["summarize_logs.py", "clean_pipeline.py", "rule_impact.py", "watch_raw.py"]
+
+def module_imports(script: Path) -> str:
+    """Código con solo los imports de nivel de módulo del script (incluido el cuerpo de try/if)."""
+    tree = ast.parse(script.read_text(encoding="utf-8"), filename=str(script))
+    nodes: List[ast.stmt] = []
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            if not (isinstance(node, ast.ImportFrom) and node.module == "__future__"):
+                nodes.append(node)
+        elif isinstance(node, (ast.Try, ast.If)):
+            # solo la rama principal (el except suele ser el fallback de un import ausente)
+            for sub in (n for stmt in node.body for n in ast.walk(stmt)):
+                if isinstance(sub, (ast.Import, ast.ImportFrom)):
+                    nodes.append(sub)
+    return "\n".join(ast.unparse(n) for n in nodes)
+
+def parse_importtime(stderr: str) -> Tuple[float, Dict[str, float]]:
+    """(total ms, {módulo de primer nivel: ms acumulados}) a partir de la salida de -X importtime."""
+    lines = stderr.splitlines()
+    if MARK in lines:
+        lines = lines[lines.index(MARK) + 1:]
+    top: Dict[str, float] = {}
+    for ln in lines:
+        if not ln.startswith("import time:"):
+            continue
+        parts = ln.split("|")
+        if len(parts) < 3 or not parts[1].strip().isdigit():
+            continue  # cabecera
+        name = parts[2]
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 0:
+            top[name.strip()] = top.get(name.strip(), 0.0) + int(parts[1]) / 1000.0
+    return sum(top.values()), top
+
+def measure(script: Path, runs: int = 3) -> Tuple[float, Dict[str, float]]:
+    """Mejor de 'runs' (la primera pasada suele pagar la caché de disco/bytecode)."""
+    code = f"import sys; sys.stderr.write({MARK!r} + '\\n')\n" + module_imports(script)
+    best: Tuple[float, Dict[str, float]] = (float("inf"), {})
+    for _ in range(max(1, runs)):
+        p = subprocess.run([PY, "-X", "importtime", "-c", code], cwd=str(ROOT),
+                           capture_output=True, text=True, check=False)
+        if p.returncode != 0:
+            err = (p.stderr.strip().splitlines() or ["?"])[-1]
+            raise RuntimeError(f"{script.name}: los imports fallan ({err})")
+        res = parse_importtime(p.stderr)
+        if res[0] < best[0]:
+            best = res
+    return best
+
+def report(scripts: List[str], runs: int = 3, top: int = 5, budget_ms: float = BUDGET_MS,
+           allowed: Tuple[str, ...] = ALLOWED) -> int:
+    """Imprime el informe; devuelve cuántas etapas superan el presupuesto (sin contar 'allowed')."""
+    exempt = f"; exentos: {', '.join(allowed)}" if allowed else ""
+    print(f"Arranque por etapa (imports de módulo, mejor de {runs}; presupuesto {budget_ms:.0f} ms{exempt})\n")
+    over = 0
+    for name in scripts:
+        path = ROOT / name
+        if not path.exists():
+            print(f"… (saltado) {name} no existe.")
+            continue
+        try:
+            total, mods = measure(path, runs)
+        except RuntimeError as e:
+            print(f"✖ {e}")
+            over += 1
+            continue
+        counted = total - sum(mods.get(m, 0.0) for m in allowed)
+        ok = counted <= budget_ms
+        over += not ok
+        extra = f"  ({counted:.1f} ms sin exentos)" if counted < total else ""
+        print(f"{'[OK]  ' if ok else '[WARN]'} {name:<36} {total:8.1f} ms{extra}")
+        for mod, ms in sorted(mods.items(), key=lambda x: -x[1])[:top]:
+            if ms >= 1.0:
+                print(f"         {mod:<34} {ms:8.1f} ms")
+    print(f"\n{over} etapa(s) por encima de {budget_ms:.0f} ms.")
+    return over
+
+def pipeline_stages() -> List[str]:
+    import run_pipeline
+    return run_pipeline.build_order(with_patches=True, mode_apply=False) + TOOLS
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Tiempo de import por etapa del pipeline.")
+    ap.add_argument("scripts", nargs="*", help="Scripts a medir (por defecto: etapas de run_pipeline.py)")
+    ap.add_argument("--runs", type=int, default=3, help="Repeticiones por script (se toma la mejor)")
+    ap.add_argument("--top", type=int, default=5, help="Módulos más pesados a listar por etapa")
+    ap.add_argument("--budget", type=float, default=BUDGET_MS, help="Presupuesto en ms por etapa")
+    ap.add_argument("--allow", default=",".join(ALLOWED),
+                    help="Módulos de primer nivel que no cuentan contra el presupuesto (coma; '' = ninguno)")
+    args = ap.parse_args()
+    allowed = tuple(m.strip() for m in args.allow.split(",") if m.strip())
+    over = report(args.scripts or pipeline_stages(), args.runs, args.top, args.budget, allowed)
+    return 1 if over else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
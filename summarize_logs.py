@@ -11,6 +11,7 @@ Entrada esperada en out/:
 - Zamacona_unique_surnames.txt
 - Zamacona_normalized_enhanced.{xlsx,csv} (opcional)
 - Zamacona_normalized_patched.{xlsx,csv}  (opcional)
+- pipeline_metrics.jsonl (opcional; métricas por etapa de run_pipeline.py → tendencia entre ejecuciones)
 
 Salida:
 - out/report_logs.md
@@ -21,7 +22,8 @@ from __future__ import annotations
 from pathlib import Path
 import argparse, json, os, sys, datetime
 from typing import Dict, Any, List, Tuple
-import pandas as pd
+
+import stage_metrics
 
 ROOT = Path(__file__).resolve().parent
 OUT_DIR = ROOT / "out"
@@ -58,6 +60,7 @@ def file_meta(p: Path) -> Dict[str, Any]:
 def read_infer(examples_per_action: int) -> Dict[str, Any]:
     if not INFER_TSV.exists():
         return {"exists": False, "meta": file_meta(INFER_TSV)}
+    import pandas as pd  # diferido: el resto del informe no lo necesita
     df = pd.read_csv(INFER_TSV, sep="\t", dtype=str).fillna("")
     meta = file_meta(INFER_TSV)
     # Conteos por acción
@@ -130,6 +133,7 @@ def read_unique_kv(p: Path) -> List[Tuple[str,int]]:
 def read_applied(df_path: Path) -> Dict[str, Any]:
     """Lee normalized_enhanced/patched y resume surnameInferenceApplied si existe."""
     if not df_path.exists(): return {"exists": False, "meta": file_meta(df_path)}
+    import pandas as pd
     try:
         if df_path.suffix.lower() == ".xlsx":
             df = pd.read_excel(df_path, dtype=str).fillna("")
@@ -147,6 +151,42 @@ def read_applied(df_path: Path) -> Dict[str, Any]:
     by_type = {k: int(v) for k, v in non_empty[col].value_counts().to_dict().items()}
     return {"exists": True, "meta": file_meta(df_path), "applied_total": total, "by_type": by_type}
 
+SLOWER_FACTOR = 1.5  # una etapa "empeora" si su wall supera 1.5x la mediana de las ejecuciones previas
+
+def _median(vals: List[float]) -> float:
+    v = sorted(vals)
+    n = len(v)
+    return (v[n // 2] if n % 2 else (v[n // 2 - 1] + v[n // 2]) / 2) if n else 0.0
+
+def read_pipeline_metrics(last_runs: int) -> Dict[str, Any]:
+    """Tendencia por etapa de las últimas 'last_runs' ejecuciones (out/pipeline_metrics.jsonl)."""
+    recs = stage_metrics.load_metrics()
+    if not recs:
+        return {"exists": False, "meta": file_meta(stage_metrics.METRICS_FILE)}
+    runs = list(dict.fromkeys(r["run_id"] for r in recs))
+    shown = runs[-last_runs:]
+    by_stage: Dict[str, Dict[str, dict]] = {}
+    for r in recs:
+        by_stage.setdefault(r["stage"], {})[r["run_id"]] = r  # si se repite en un run, vale la última
+    stages = []
+    for stage, per_run in by_stage.items():
+        hist = [per_run[rid] for rid in runs if rid in per_run]
+        last = hist[-1]
+        prev = [h["wall_s"] for h in hist[:-1] if h.get("rc") == 0]
+        base = _median(prev[-last_runs:])
+        stages.append({
+            "stage": stage,
+            "wall": [per_run[rid]["wall_s"] if rid in per_run else None for rid in shown],
+            "last": last,
+            "baseline_wall_s": round(base, 3),
+            "regressed": bool(prev) and last.get("rc") == 0 and last["wall_s"] > SLOWER_FACTOR * base,
+        })
+    # orden de ejecución de la última ejecución en que aparece cada etapa
+    order = {r["stage"]: i for i, r in enumerate(recs)}
+    stages.sort(key=lambda x: (runs.index(x["last"]["run_id"]), order[x["stage"]]))
+    return {"exists": True, "meta": file_meta(stage_metrics.METRICS_FILE),
+            "runs": shown, "runs_total": len(runs), "stages": stages}
+
 def build_report_md(data: Dict[str, Any], examples_per_action: int) -> str:
     md = []
     md.append(f"# Informe de logs (generado {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')})\n")
@@ -224,8 +264,34 @@ def build_report_md(data: Dict[str, Any], examples_per_action: int) -> str:
         meta = file_meta(p)
         md.append(f"- {meta['name']}: exists={meta['exists']} size={meta['size']} mtime={meta['mtime']}")
 
+    # Métricas por etapa
+    pm = data["pipeline_metrics"]
+    md.append("\n## 6) Métricas del pipeline por etapa (pipeline_metrics.jsonl)")
+    if not pm["exists"]:
+        md.append(f"- No existe `{stage_metrics.METRICS_FILE.name}` (se genera con `run_pipeline.py`).")
+    else:
+        md.append(f"- Ejecuciones registradas: **{pm['runs_total']}** | se muestran: {', '.join(pm['runs'])}")
+        md.append("\n| etapa | wall (s) por ejecución | último: cpu user+sys (s) | RSS pico | entrada | salida | filas |")
+        md.append("|---|---|---|---|---|---|---|")
+        for st in pm["stages"]:
+            last = st["last"]
+            trend = " → ".join("·" if w is None else f"{w:.1f}" for w in st["wall"])
+            if st["regressed"]:
+                trend += f" ⚠ (>{SLOWER_FACTOR}x mediana {st['baseline_wall_s']:.1f})"
+            cpu = f"{last['user_s']:.1f}+{last['sys_s']:.1f}" if "user_s" in last else "-"
+            rss = f"{last['max_rss_mb']:.0f} MB" if "max_rss_mb" in last else "-"
+            rows = f"{last.get('rows_in') if last.get('rows_in') is not None else '-'}→" \
+                   f"{last.get('rows_out') if last.get('rows_out') is not None else '-'}"
+            rc = "" if last.get("rc") == 0 else f" ✖ rc={last.get('rc')}"
+            md.append(f"| {st['stage']}{rc} | {trend} | {cpu} | {rss} | "
+                      f"{stage_metrics.fmt_bytes(last.get('in_bytes', 0))} | "
+                      f"{stage_metrics.fmt_bytes(last.get('out_bytes', 0))} ({last.get('out_files', 0)} fich.) | {rows} |")
+        slow = [st["stage"] for st in pm["stages"] if st["regressed"]]
+        if slow:
+            md.append(f"\n- ⚠ Etapas más lentas que su mediana histórica: {', '.join(slow)}")
+
     # Siguientes pasos
-    md.append("\n## 6) Siguientes pasos sugeridos")
+    md.append("\n## 7) Siguientes pasos sugeridos")
     md.append("- Si `swap` y `fill` lucen correctos → ejecutar `run_pipeline.py --apply`.")
     md.append("- Si hay muchos `mismatch`, prioriza revisar los que compartan la misma `proposed_reason` (atacar causas raíz).")
     md.append("- Cuando confirmes la calidad, habilita la promoción automática enhanced→patched en tu pipeline.")
@@ -237,6 +303,7 @@ def main():
     ap.add_argument("--out", default=str(DEF_MD), help="Ruta del informe Markdown")
     ap.add_argument("--json", default=str(DEF_JSON), help="Ruta del informe JSON")
     ap.add_argument("--examples", type=int, default=5, help="Ejemplos por acción")
+    ap.add_argument("--runs", type=int, default=8, help="Ejecuciones del pipeline a mostrar en la tendencia")
     args = ap.parse_args()
 
     OUT_DIR.mkdir(exist_ok=True)
@@ -279,7 +346,10 @@ def main():
     data["enhanced"] = read_applied(enh_path)
     data["patched"]  = read_applied(pat_path)
 
-    # 5) Escribir salidas
+    # 5) Métricas por etapa (tendencia entre ejecuciones)
+    data["pipeline_metrics"] = read_pipeline_metrics(args.runs)
+
+    # 6) Escribir salidas
     md = build_report_md(data, args.examples)
     Path(args.out).write_text(md, encoding="utf-8")
     Path(args.json).write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+token_index.py
+
+Índice invertido persistente token → filas (y arkIds) de un artefacto (xlsx/csv),
+compartido por los scripts de análisis (find_zamacona_in_non_green, drop_rejects;
+sus tokenizadores los reutiliza name_stats.py) para responder "¿qué filas contienen
+alguno de estos tokens?" con búsquedas en vez de recorrer todas las celdas.
+
+- Se construye una vez por artefacto: va sellado con el sha1 del fichero y la
+  versión de los tokenizadores; si el artefacto cambia, se reconstruye solo.
+- Formato compacto basado en arrays (numpy .npz), por campo:
+    <campo>.tokens    tokens en orden de primera aparición
+    <campo>.offsets   offsets[i]:offsets[i+1] = tramo de postings del token i
+    <campo>.postings  ids de fila (int32, ordenados y sin repetir por token)
+    <campo>.counts    ocurrencias totales del token (no filas)
+  más 'arkIds' (arkId por fila) y 'meta' (JSON).
+- Ids de fila = posición 0-based en el DataFrame leído del artefacto
+  (fila de Excel = id + 2).
+
+Campos (tokenizador + columnas):
+  - surnames : columnas __surn1/__surn2, partes separadas por ';' (norm_token, como audit_surnames)
+  - fullname : fullName__work → palabras de norm() (minúsculas, sin acentos, solo a-z)
+  - words    : fullName__work/__surn1/__surn2 → palabras tal cual, separadas por espacios
+
+API:
+  - open_index(path, fields, df=None)     → TokenIndex (carga o construye + guarda)
+  - idx.rows_any(field, tokens, fold=False) → array ordenado de ids de fila
+  - idx.frequencies(field)                  → Series token → ocurrencias (desc)
+  - idx.vocabulary(field)                   → lista de tokens
+  - idx.arks(rows)                          → arkIds de esas filas
+  - idx.rows_for_arks(arks)                 → ids de fila con esos arkIds
+
+Salida: out/index/<artefacto>.tokidx.npz
+"""
+
+from __future__ import annotations
+import re
+import json
+import hashlib
+import unicodedata
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent
+INDEX_DIR = ROOT / "out" / "index"
+
+INDEX_VERSION = 1  # súbelo si cambia algún tokenizador
+
+# ---------------------------
+# Tokenizadores
+# ---------------------------
+
+def strip_accents(s: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFD", s or "") if unicodedata.category(c) != "Mn")
+
+def norm_token(s: str) -> str:
+    """Igual que audit_surnames.norm_token (conserva mayúsculas)."""
+    s = strip_accents((s or "").strip())
+    s = re.sub(r"[^\w\s\-']", " ", s)
+    s = re.sub(r"\s+", " ", s).strip()
+    return s
+
+def norm_words(s: str) -> str:
+    """Igual que find_zamacona_in_non_green.norm: minúsculas, sin acentos, solo a-z y espacios."""
+    s = "".join(c for c in unicodedata.normalize("NFD", s.lower()) if unicodedata.category(c) != "Mn")
+    s = re.sub(r"[^a-z\s]", " ", s)
+    return re.sub(r"\s+", " ", s).strip()
+
+def _surname_tokens(cell: str) -> List[str]:
+    return [t for t in (norm_token(p) for p in cell.split(";")) if t]
+
+def _fullname_tokens(cell: str) -> List[str]:
+    return norm_words(cell).split()
+
+def _words_tokens(cell: str) -> List[str]:
+    return cell.split()
+
+def _surname_cols(df: pd.DataFrame) -> List[str]:
+    return [c for c in df.columns if c.endswith("__surn1") or c.endswith("__surn2")]
+
+def _fullname_cols(df: pd.DataFrame) -> List[str]:
+    return [c for c in ("fullName__work",) if c in df.columns]
+
+def _words_cols(df: pd.DataFrame) -> List[str]:
+    return [c for c in ("fullName__work", "fullName__surn1", "fullName__surn2") if c in df.columns]
+
+# campo → (columnas, tokenizador de celda)
+FIELDS: Dict[str, tuple] = {
+    "surnames": (_surname_cols, _surname_tokens),
+    "fullname": (_fullname_cols, _fullname_tokens),
+    "words":    (_words_cols, _words_tokens),
+}
+
+# ---------------------------
+# Construcción
+# ---------------------------
+
+def file_sha1(path: Path) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def read_artifact(path: Path) -> pd.DataFrame:
+    path = Path(path)
+    if path.suffix.lower() == ".xlsx":
+        return pd.read_excel(path, dtype=str)
+    return pd.read_csv(path, dtype=str)
+
+def build_field(df: pd.DataFrame, cols: List[str], tokenize: Callable[[str], List[str]]) -> Dict[str, np.ndarray]:
+    """Recorre columna a columna, fila a fila (mismo orden que los scripts originales)."""
+    ids: Dict[str, int] = {}
+    rows: List[List[int]] = []
+    counts: List[int] = []
+    for c in cols:
+        for r, cell in enumerate(df[c].fillna("").astype(str).tolist()):
+            if not cell:
+                continue
+            for t in tokenize(cell):
+                i = ids.get(t)
+                if i is None:
+                    i = ids[t] = len(counts)
+                    rows.append([])
+                    counts.append(0)
+                counts[i] += 1
+                rows[i].append(r)
+    postings = [np.unique(np.asarray(p, dtype=np.int32)) for p in rows]
+    offsets = np.zeros(len(postings) + 1, dtype=np.int64)
+    if postings:
+        offsets[1:] = np.cumsum([len(p) for p in postings])
+    return {
+        "tokens": np.asarray(list(ids), dtype=str),
+        "offsets": offsets,
+        "postings": np.concatenate(postings) if postings else np.zeros(0, dtype=np.int32),
+        "counts": np.asarray(counts, dtype=np.int64),
+    }
+
+class TokenIndex:
+    def __init__(self, arrays: Dict[str, np.ndarray], meta: dict):
+        self.arrays = arrays
+        self.meta = meta
+        self.n_rows = int(meta.get("rows", 0))
+        self._lookup: Dict[str, Dict[str, int]] = {}
+        self._folded: Dict[str, Dict[str, List[int]]] = {}
+
+    @property
+    def fields(self) -> List[str]:
+        return list(self.meta.get("fields", []))
+
+    def _field(self, field: str, name: str) -> np.ndarray:
+        key = f"{field}.{name}"
+        if key not in self.arrays:
+            raise KeyError(f"El índice no tiene el campo {field!r}")
+        return self.arrays[key]
+
+    def vocabulary(self, field: str) -> List[str]:
+        return self._field(field, "tokens").tolist()
+
+    def _token_ids(self, field: str, tokens: Iterable[str], fold: bool) -> List[int]:
+        if fold:
+            if field not in self._folded:
+                m: Dict[str, List[int]] = {}
+                for i, t in enumerate(self.vocabulary(field)):
+                    m.setdefault(t.lower(), []).append(i)
+                self._folded[field] = m
+            m = self._folded[field]
+            return [i for t in tokens for i in m.get(t.lower(), ())]
+        if field not in self._lookup:
+            self._lookup[field] = {t: i for i, t in enumerate(self.vocabulary(field))}
+        m = self._lookup[field]
+        return [m[t] for t in tokens if t in m]
+
+    def rows_any(self, field: str, tokens: Iterable[str], fold: bool = False) -> np.ndarray:
+        """Ids de fila (ordenados, únicos) que contienen alguno de los tokens.
+        fold=True compara sin distinguir mayúsculas."""
+        offsets, postings = self._field(field, "offsets"), self._field(field, "postings")
+        parts = [postings[offsets[i]:offsets[i + 1]] for i in self._token_ids(field, tokens, fold)]
+        if not parts:
+            return np.zeros(0, dtype=np.int32)
+        return np.unique(np.concatenate(parts))
+
+    def frequencies(self, field: str) -> pd.Series:
+        """Ocurrencias por token, de mayor a menor (empates en orden de aparición, como value_counts)."""
+        s = pd.Series(self._field(field, "counts"), index=self.vocabulary(field), dtype="int64")
+        return s.sort_values(ascending=False)
+
+    def arks(self, rows) -> List[str]:
+        ark = self.arrays.get("arkIds")
+        return [] if ark is None else ark[np.asarray(rows, dtype=np.int64)].tolist()
+
+    def rows_for_arks(self, arks: Iterable[str]) -> np.ndarray:
+        ark = self.arrays.get("arkIds")
+        if ark is None:
+            return np.zeros(0, dtype=np.int32)
+        return np.flatnonzero(np.isin(ark, np.asarray(list(arks), dtype=str))).astype(np.int32)
+
+    def save(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez_compressed(path, meta=np.asarray(json.dumps(self.meta)), **self.arrays)
+
+def build_index(df: pd.DataFrame, fields: Iterable[str], meta: Optional[dict] = None) -> TokenIndex:
+    arrays: Dict[str, np.ndarray] = {}
+    fields = list(fields)
+    for f in fields:
+        cols_fn, tok = FIELDS[f]
+        for name, arr in build_field(df, cols_fn(df), tok).items():
+            arrays[f"{f}.{name}"] = arr
+    if "arkId" in df.columns:
+        arrays["arkIds"] = np.asarray(df["arkId"].fillna("").astype(str).tolist(), dtype=str)
+    meta = dict(meta or {})
+    meta.update({"version": INDEX_VERSION, "rows": len(df), "fields": fields})
+    return TokenIndex(arrays, meta)
+
+def index_path(artifact: Path) -> Path:
+    return INDEX_DIR / f"{Path(artifact).name}.tokidx.npz"
+
+def load_index(path: Path) -> Optional[TokenIndex]:
+    if not path.exists():
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as z:
+            arrays = {k: z[k] for k in z.files if k != "meta"}
+            meta = json.loads(str(z["meta"]))
+    except Exception:
+        return None
+    return TokenIndex(arrays, meta)
+
+def open_index(artifact: Path, fields: Iterable[str], df: Optional[pd.DataFrame] = None) -> TokenIndex:
+    """
+    Índice del artefacto con (al menos) esos campos. Reutiliza el .npz si el sha1 del
+    artefacto y la versión coinciden; si no, lo construye (con df si ya está leído,
+    que debe ser el DataFrame de read_artifact) y lo guarda.
+    """
+    artifact = Path(artifact)
+    fields = list(fields)
+    sha = file_sha1(artifact)
+    path = index_path(artifact)
+    idx = load_index(path)
+    if idx is not None and idx.meta.get("sha1") == sha and idx.meta.get("version") == INDEX_VERSION \
+            and set(fields) <= set(idx.fields):
+        return idx
+    # campos previos del mismo artefacto se conservan para que otros scripts no reconstruyan
+    if idx is not None and idx.meta.get("sha1") == sha and idx.meta.get("version") == INDEX_VERSION:
+        fields = list(dict.fromkeys(idx.fields + fields))
+    if df is None:
+        df = read_artifact(artifact)
+    idx = build_index(df, fields, {"sha1": sha, "artifact": artifact.name})
+    idx.save(path)
+    return idx
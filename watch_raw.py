@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+watch_raw.py
+
+Modo vigilancia: ingiere de forma incremental los RAW nuevos según van llegando.
+
+- Sondea la carpeta RAW (la misma que detecta run_pipeline.detect_raw_args) con
+  instantáneas de os.stat (tamaño + mtime); sin dependencias tipo inotify.
+- Debounce: un fichero solo se procesa cuando su instantánea no ha cambiado entre
+  dos sondeos seguidos y lleva al menos --settle segundos sin tocarse. Si aun así
+  no se puede leer (zip a medio escribir), se reintenta en el siguiente sondeo.
+- Ignora temporales de Excel (~$*.xlsx).
+- Cada libro nuevo pasa por consolidación (consolidate_raw.read_one), preparación
+  (prepare_columns.prepare_frame) y normalización + flags + split
+  (normalize_names.normalize_frame). Solo se calculan sus filas; se fusionan con las
+  salidas actuales:
+    * out/Zamacona_all_raw.csv/.xlsx, out/consolidate_index.tsv, out/consolidate_log.txt
+    * out/Zamacona_normalized.csv/.xlsx (+ review log y únicos, vía normalize_names.write_outputs)
+- Orden seguro: primero se normaliza y fusiona todo en memoria; después se escribe el
+  normalized y por último el RAW, el índice y el log (ficheros temporales + os.replace).
+  Si algo falla, el error se registra, el fichero sigue pendiente y el watcher continúa;
+  al reintentar, las filas de ese fichero que ya estuvieran en el normalized se sustituyen
+  (por __source_file), así que no se duplican.
+- Estado en out/watch_state.json, completado siempre con out/consolidate_index.tsv
+  (ficheros ya ingeridos por una ejecución completa del pipeline).
+- Como el resto de scripts, se ejecuta desde la raíz del proyecto (rutas out/ relativas).
+
+Uso:
+  python3 watch_raw.py                         # carpeta autodetectada, sondeo cada 5 s
+  python3 watch_raw.py --dir raw --glob "zamacona_*.xlsx" --interval 10
+  python3 watch_raw.py --once                  # un único barrido (útil en cron)
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+import traceback
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+import consolidate_raw
+import normalize_names
+from prepare_columns import prepare_frame
+from run_pipeline import detect_raw_args
+
+ROOT = Path(__file__).resolve().parent
+OUT = ROOT / "out"
+STATE_FILE = OUT / "watch_state.json"
+
+RAW_CSV = consolidate_raw.OUT_CSV
+RAW_XLSX = consolidate_raw.OUT_XLSX
+INDEX_TSV = consolidate_raw.INDEX_TSV
+LOG_FILE = consolidate_raw.LOG_FILE
+
+Snapshot = Tuple[int, int]  # (st_size, st_mtime_ns)
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Vigila la carpeta RAW e ingiere incrementalmente los exports nuevos.")
+    p.add_argument("--dir", default=None, help="Carpeta RAW (por defecto, la autodetectada por run_pipeline).")
+    p.add_argument("--glob", default=None, help="Patrón glob (por defecto, el autodetectado).")
+    p.add_argument("--include-tsv", action="store_true", help="Vigilar también .csv/.tsv.")
+    p.add_argument("--interval", type=float, default=5.0, help="Segundos entre sondeos (defecto: 5).")
+    p.add_argument("--settle", type=float, default=None,
+                   help="Segundos mínimos sin cambios antes de leer un fichero (defecto: 2×interval).")
+    p.add_argument("--once", action="store_true", help="Un único barrido y salir.")
+    return p.parse_args()
+
+# ---------------------------
+# Estado
+# ---------------------------
+
+def load_state() -> Dict[str, dict]:
+    state: Dict[str, dict] = {}
+    if STATE_FILE.exists():
+        try:
+            state = json.loads(STATE_FILE.read_text(encoding="utf-8"))
+        except Exception as e:
+            print(f"[WARN] No se pudo leer {STATE_FILE.name}: {e}. Se siembra de nuevo.", file=sys.stderr)
+    # lo que haya ingerido una ejecución completa (consolidate_raw.py) también cuenta como procesado
+    if INDEX_TSV.exists():
+        idx = pd.read_csv(INDEX_TSV, sep="\t", dtype=str).fillna("")
+        for _, r in idx.iterrows():
+            state.setdefault(r["file"], {"size": None, "mtime_ns": None, "rows": int(r["rows"] or 0), "seeded": True})
+    return state
+
+def save_state(state: Dict[str, dict]):
+    OUT.mkdir(exist_ok=True)
+    tmp = STATE_FILE.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state, ensure_ascii=False, indent=2), encoding="utf-8")
+    tmp.replace(STATE_FILE)
+
+# ---------------------------
+# Sondeo
+# ---------------------------
+
+def list_candidates(in_dir: Path, pattern: str, include_tsv: bool) -> List[Path]:
+    files = [p for p in in_dir.glob(pattern) if not p.name.startswith("~$")]
+    if include_tsv:
+        files += list(in_dir.glob("*.csv")) + list(in_dir.glob("*.tsv"))
+    return sorted(p for p in set(files) if p.suffix.lower() in consolidate_raw.SUPPORTED_EXT)
+
+def snapshot(files: List[Path]) -> Dict[str, Snapshot]:
+    snap: Dict[str, Snapshot] = {}
+    for p in files:
+        try:
+            st = p.stat()
+        except FileNotFoundError:
+            continue  # desapareció entre glob y stat
+        snap[p.name] = (st.st_size, st.st_mtime_ns)
+    return snap
+
+def ready_files(prev: Dict[str, Snapshot], curr: Dict[str, Snapshot],
+                state: Dict[str, dict], settle: float) -> List[str]:
+    now_ns = time.time_ns()
+    ready = []
+    for name, snap in curr.items():
+        if name in state:
+            st = state[name]
+            if not st.get("seeded") and (st.get("size"), st.get("mtime_ns")) != snap and not st.get("warned"):
+                print(f"[WARN] {name} cambió tras ingerirse; no se reingiere (ejecuta el pipeline completo).")
+                st["warned"] = True
+            continue
+        if prev.get(name) != snap:
+            continue  # aún cambiando (o visto por primera vez)
+        if snap[0] == 0 or (now_ns - snap[1]) / 1e9 < settle:
+            continue
+        ready.append(name)
+    return ready
+
+# ---------------------------
+# Ingesta incremental
+# ---------------------------
+
+def canonical_cols_from_outputs() -> Optional[List[str]]:
+    if not RAW_CSV.exists():
+        return None
+    cols = list(pd.read_csv(RAW_CSV, dtype=str, nrows=0).columns)
+    return [c for c in cols if c != "__source_file"] + ["__source_file"]
+
+def _tmp_path(path: Path) -> Path:
+    return path.with_name(f"{path.stem}.tmp{path.suffix}")
+
+def _appended(path: Path, write_new: Callable[[Path, bool], None]) -> Path:
+    """Copia de 'path' con lo nuevo añadido al final, en un temporal (el original no se toca)."""
+    tmp = _tmp_path(path)
+    existed = path.exists()
+    if existed:
+        shutil.copyfile(path, tmp)
+    write_new(tmp, existed)
+    return tmp
+
+def _write_raw(new_raw: pd.DataFrame, done: List[Tuple[Path, int]]):
+    """RAW consolidado (CSV + XLSX), índice y log: se escriben a temporales y se sustituyen al final."""
+    RAW_CSV.parent.mkdir(exist_ok=True)
+    tmps: List[Tuple[Path, Path]] = []
+    try:
+        csv_tmp = _appended(RAW_CSV, lambda t, existed: new_raw.to_csv(
+            t, mode="a", header=not existed, index=False, encoding="utf-8"))
+        tmps.append((csv_tmp, RAW_CSV))
+        xlsx_tmp = _tmp_path(RAW_XLSX)
+        pd.read_csv(csv_tmp, dtype=str).to_excel(xlsx_tmp, index=False)
+        tmps.append((xlsx_tmp, RAW_XLSX))
+        idx_rows = pd.DataFrame([{"file": p.name, "rows": n} for p, n in done])
+        tmps.append((_appended(INDEX_TSV, lambda t, existed: idx_rows.to_csv(
+            t, sep="\t", mode="a", header=not existed, index=False, encoding="utf-8")), INDEX_TSV))
+
+        def log_lines(t: Path, _existed: bool):
+            with open(t, "a", encoding="utf-8") as log:
+                for p, n in done:
+                    log.write(f"{p.name:<35} {n:>6} registros\n")
+        tmps.append((_appended(LOG_FILE, log_lines), LOG_FILE))
+    except Exception:
+        for tmp, _ in tmps:
+            tmp.unlink(missing_ok=True)
+        raise
+    for tmp, final in tmps:
+        os.replace(tmp, final)
+
+def ingest(paths: List[Path]) -> Tuple[List[Tuple[Path, int]], List[Path]]:
+    """
+    Consolida + prepara + normaliza SOLO los ficheros nuevos y los fusiona con las salidas.
+    Todo se calcula antes de escribir nada; el RAW y el índice (lo que marca un fichero
+    como ingerido) se escriben al final. Una excepción deja esos ficheros pendientes.
+    """
+    canonical_cols = canonical_cols_from_outputs()
+    frames, done, failed = [], [], []
+    for p in paths:
+        try:
+            df, _ = consolidate_raw.read_one(p, None, canonical_cols)
+        except Exception as e:
+            print(f"[WARN] {p.name}: aún no legible ({e}); se reintenta.", file=sys.stderr)
+            failed.append(p)
+            continue
+        if canonical_cols is None:
+            canonical_cols = [c for c in df.columns if c != "__source_file"] + ["__source_file"]
+            df = df[canonical_cols]
+        frames.append(df)
+        done.append((p, len(df)))
+    if not frames:
+        return done, failed
+
+    new_raw = pd.concat(frames, ignore_index=True)
+
+    # 1) preparación + normalización de las filas nuevas únicamente
+    prepared = prepare_frame(new_raw.copy())
+    work_cols = normalize_names.find_work_cols(prepared)
+    if not work_cols:
+        print("[WARN] Las filas nuevas no tienen columnas __work; solo se actualiza el RAW.", file=sys.stderr)
+        _write_raw(new_raw, done)
+        return done, failed
+    normalized, created = normalize_names.normalize_frame(prepared, work_cols)
+
+    # 2) fusión con el normalized actual (sin recalcular lo ya procesado); si un intento
+    #    anterior llegó a escribir filas de estos ficheros, se sustituyen
+    if normalize_names.OUT_CSV.exists():
+        old = pd.read_csv(normalize_names.OUT_CSV, dtype=str)
+        if "__source_file" in old.columns:
+            old = old[~old["__source_file"].isin({p.name for p, _ in done})]
+        for c in ("blacklistFlag", "reviewFlag"):
+            if c in old.columns:
+                old[c] = old[c].fillna("0").astype(int)
+        merged = pd.concat([old, normalized], ignore_index=True)
+        merged = merged[list(old.columns) + [c for c in normalized.columns if c not in old.columns]]
+    else:
+        merged = normalized.reset_index(drop=True)
+
+    # 3) escritura: normalized, y por último RAW + índice + log
+    normalize_names.write_outputs(merged, normalize_names.find_work_cols(merged),
+                                  [c for c in merged.columns if c.endswith(("__given", "__surn1", "__surn2"))])
+    _write_raw(new_raw, done)
+    print(f"[OK] Ingeridas {len(normalized)} filas nuevas de {len(done)} fichero(s); total normalized: {len(merged)}")
+    return done, failed
+
+# ---------------------------
+# Main
+# ---------------------------
+
+def main() -> int:
+    args = parse_args()
+    in_dir, pattern, include_tsv = args.dir, args.glob, args.include_tsv
+    if in_dir is None or pattern is None:
+        detected = detect_raw_args()
+        if not detected and in_dir is None:
+            print("✖ No se encontraron RAW en (., raw/, data/, data/raw/, inputs/).", file=sys.stderr)
+            return 1
+        if detected:
+            in_dir = in_dir or detected[1]
+            pattern = pattern or detected[3]
+            include_tsv = include_tsv or "--include-tsv" in detected
+    pattern = pattern or consolidate_raw.DEFAULT_GLOB
+    in_dir = Path(in_dir).resolve()
+    settle = args.settle if args.settle is not None else 2 * args.interval
+
+    normalize_names.load_surname_whitelist()
+    state = load_state()
+    print(f"[INFO] Vigilando {in_dir} ({pattern}) cada {args.interval:g}s; {len(state)} fichero(s) ya ingeridos.")
+
+    prev: Dict[str, Snapshot] = {}
+    if args.once:
+        # en un único barrido no hay sondeo previo: se exige solo el tiempo de asentamiento
+        prev = snapshot(list_candidates(in_dir, pattern, include_tsv))
+    try:
+        while True:
+            curr = snapshot(list_candidates(in_dir, pattern, include_tsv))
+            names = ready_files(prev, curr, state, settle)
+            if names:
+                print(f"[INFO] Nuevos: {', '.join(names)}")
+                try:
+                    done, _failed = ingest([in_dir / n for n in names])
+                except Exception as e:
+                    # las salidas del RAW/índice no se han tocado: quedan pendientes y se reintentan
+                    print(f"[ERROR] Falló la ingesta de {', '.join(names)}: {e}; quedan pendientes.", file=sys.stderr)
+                    traceback.print_exc()
+                    done = []
+                for p, n in done:
+                    size, mtime_ns = curr[p.name]
+                    state[p.name] = {"size": size, "mtime_ns": mtime_ns, "rows": n}
+                save_state(state)
+            prev = curr
+            if args.once:
+                break
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print("\n[INFO] Vigilancia detenida.")
+    return 0
+
+if __name__ == "__main__":
+    pd.options.mode.chained_assignment = None
+    sys.exit(main())
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+xlsx_stream.py
+
+Lectura en streaming de las hojas de un .xlsx directamente desde el zip,
+sin pasar por el modelo de objetos de openpyxl (ni por pandas).
+
+Pensado para los exports RAW de FamilySearch (zamacona_*.xlsx):
+  - strings compartidos (xl/sharedStrings.xml), sin fórmulas,
+  - una hoja de datos con ~5 filas de preámbulo antes de la cabecera.
+
+API:
+  - sheet_member(zf, name=None)   → ruta interna de la hoja (por defecto la primera,
+                                    p.ej. 'xl/worksheets/sheet1.xml')
+  - load_shared_strings(zf)       → lista de strings compartidos (índice → texto)
+  - iter_sheet_rows(zf, member, shared, strict=False)
+                                  → genera (fila_0based, {col_0based: texto}) solo con celdas no vacías
+  - read_sheet_columns(path, sheet=None, fill=None)
+                                  → (n_filas, [columna_0, columna_1, ...]) con la hoja entera
+                                    en arrays por columna (equivale a header=None, dtype=str:
+                                    textos de NA_VALUES → fill, números como los deja pandas)
+  - col_index("AB12")             → 27
+
+Si algo no encaja (hoja inexistente, XML raro) se lanza la excepción tal cual:
+el llamador decide si cae a pandas/openpyxl. En modo estricto, cualquier celda
+que openpyxl interpretaría distinto (fórmulas, fechas/estilos numéricos, booleanos,
+errores) lanza UnsupportedSheet.
+"""
+
+from __future__ import annotations
+import math
+import re
+import zipfile
+import posixpath
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterator, List, Optional, Tuple
+
+NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+NS_REL_DOC = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+NS_REL_PKG = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+TAG_ROW = NS_MAIN + "row"
+TAG_C   = NS_MAIN + "c"
+TAG_V   = NS_MAIN + "v"
+TAG_T   = NS_MAIN + "t"
+TAG_IS  = NS_MAIN + "is"
+TAG_SI  = NS_MAIN + "si"
+TAG_R   = NS_MAIN + "r"
+TAG_F   = NS_MAIN + "f"
+TAG_SHEETDATA = NS_MAIN + "sheetData"
+
+DEFAULT_SHEET = "xl/worksheets/sheet1.xml"
+
+# na_values por defecto de pandas (pandas._libs.parsers.STR_NA_VALUES): read_excel los
+# convierte en NaN también con dtype=str
+NA_VALUES = frozenset({
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+})
+
+_COL_RE = re.compile(r"^([A-Za-z]+)")
+
+def col_index(ref: str) -> int:
+    """'A1' → 0, 'AB12' → 27."""
+    m = _COL_RE.match(ref or "")
+    if not m:
+        raise ValueError(f"Referencia de celda no válida: {ref!r}")
+    n = 0
+    for ch in m.group(1).upper():
+        n = n * 26 + (ord(ch) - 64)
+    return n - 1
+
+class UnsupportedSheet(ValueError):
+    """La hoja tiene algo que la lectura rápida no reproduce igual que openpyxl."""
+
+def sheet_member(zf: zipfile.ZipFile, name: Optional[str] = None) -> str:
+    """
+    Resuelve la hoja vía workbook.xml + rels (la primera, o la de nombre 'name').
+    Sin nombre y sin poder resolver, usa sheet1.xml.
+    """
+    names = set(zf.namelist())
+    try:
+        wb = ET.fromstring(zf.read("xl/workbook.xml"))
+        sheets = wb.find(NS_MAIN + "sheets")
+        sheets = list(sheets) if sheets is not None else []
+        if name is None:
+            target_sheet = sheets[0] if sheets else None
+        else:
+            target_sheet = next((sh for sh in sheets if sh.get("name") == name), None)
+            if target_sheet is None:
+                raise KeyError(f"Hoja no encontrada: {name!r}")
+        rid = target_sheet.get(NS_REL_DOC + "id") if target_sheet is not None else None
+        if rid:
+            rels = ET.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+            for rel in rels.iter(NS_REL_PKG + "Relationship"):
+                if rel.get("Id") != rid:
+                    continue
+                target = rel.get("Target", "")
+                member = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+                if member in names:
+                    return member
+    except ET.ParseError:
+        pass
+    except KeyError:
+        if name is not None:
+            raise
+    if name is None and DEFAULT_SHEET in names:
+        return DEFAULT_SHEET
+    raise KeyError("No se encontró ninguna hoja en el libro")
+
+def _si_text(si) -> str:
+    # <si><t>..</t></si>  o texto enriquecido <si><r><t>..</t></r>...</si>
+    # (los <rPh> de guías fonéticas no forman parte del texto)
+    t = si.find(TAG_T)
+    if t is not None:
+        return t.text or ""
+    return "".join(t.text or "" for r in si.findall(TAG_R) for t in r.findall(TAG_T))
+
+def load_shared_strings(zf: zipfile.ZipFile) -> List[str]:
+    """Lee xl/sharedStrings.xml una sola vez (streaming). Libros sin strings → []."""
+    try:
+        fh = zf.open("xl/sharedStrings.xml")
+    except KeyError:
+        return []
+    out: List[str] = []
+    root = None
+    with fh:
+        for ev, elem in ET.iterparse(fh, events=("start", "end")):
+            if ev == "start":
+                if root is None:
+                    root = elem
+                continue
+            if elem.tag == TAG_SI:
+                out.append(_si_text(elem))
+                root.clear()  # no acumula <si> ya leídos
+    return out
+
+def _number_text(txt: str) -> str:
+    # openpyxl: int si no hay '.'/'E', si no float; pandas (OpenpyxlReader._convert_cell)
+    # pasa a int los float enteros (1.0 → "1", 1e20 → "100000000000000000000"); luego str()
+    if "." in txt or "E" in txt or "e" in txt:
+        f = float(txt)
+        return str(int(f)) if math.isfinite(f) and f == int(f) else str(f)
+    return str(int(txt))
+
+def _cell_text(c, shared: List[str], strict: bool = False) -> str:
+    t = c.get("t")
+    if strict and c.find(TAG_F) is not None:
+        raise UnsupportedSheet(f"fórmula en {c.get('r')}")
+    if t == "inlineStr":
+        is_ = c.find(TAG_IS)
+        return _si_text(is_) if is_ is not None else ""
+    v = c.find(TAG_V)
+    if v is None or v.text is None:
+        return ""
+    if t == "s":
+        return shared[int(v.text)]
+    if not strict or t == "str":
+        return v.text
+    if t in (None, "n") and c.get("s", "0") == "0":
+        return _number_text(v.text)
+    raise UnsupportedSheet(f"celda tipo {t or 'n'} (estilo {c.get('s', '0')}) en {c.get('r')}")
+
+def iter_sheet_rows(zf: zipfile.ZipFile, member: str,
+                    shared: Optional[List[str]],
+                    strict: bool = False) -> Iterator[Tuple[int, Dict[int, str]]]:
+    """
+    Recorre la hoja fila a fila. Devuelve (fila_0based, {col_0based: texto}).
+    Solo incluye celdas con texto no vacío; las filas sin celdas con valor se omiten.
+    strict=True: lanza UnsupportedSheet ante celdas que no sean texto o número sin estilo.
+    """
+    shared = shared or []
+    implicit_row = -1
+    sheet_data = None
+    with zf.open(member) as fh:
+        for ev, elem in ET.iterparse(fh, events=("start", "end")):
+            if ev == "start":
+                if elem.tag == TAG_SHEETDATA:
+                    sheet_data = elem
+                continue
+            if elem.tag != TAG_ROW:
+                continue
+            r = elem.get("r")
+            implicit_row = int(r) - 1 if r else implicit_row + 1
+            vals: Dict[int, str] = {}
+            implicit_col = -1
+            for c in elem.iter(TAG_C):
+                ref = c.get("r")
+                implicit_col = col_index(ref) if ref else implicit_col + 1
+                txt = _cell_text(c, shared, strict)
+                if txt != "":
+                    vals[implicit_col] = txt
+            if sheet_data is not None:
+                sheet_data.clear()  # libera filas ya procesadas
+            if vals:
+                yield implicit_row, vals
+
+def read_sheet_columns(path, sheet: Optional[str] = None, fill=None) -> Tuple[int, List[list]]:
+    """
+    Lee la hoja completa (modo estricto) a arrays por columna, con las filas en su
+    posición real (las filas vacías intermedias se conservan como 'fill').
+    Equivale a pandas read_excel(header=None, dtype=str) sobre exports sencillos: los
+    textos de NA_VALUES ("NA", "None", "null"…) quedan como 'fill' y los números se
+    formatean como pandas (_number_text).
+    """
+    with zipfile.ZipFile(path) as zf:
+        member = sheet_member(zf, sheet)
+        shared = load_shared_strings(zf)
+        cols: List[list] = []
+        n_rows = 0
+        for r, vals in iter_sheet_rows(zf, member, shared, strict=True):
+            width = max(vals) + 1
+            if width > len(cols):
+                cols.extend([fill] * n_rows for _ in range(width - len(cols)))
+            for col in cols:
+                col.extend([fill] * (r + 1 - len(col)))
+            for ci, v in vals.items():
+                cols[ci][r] = fill if v in NA_VALUES else v
+            n_rows = r + 1
+    return n_rows, cols